@@ -0,0 +1,221 @@
+# Berisi pabrik agent per proses: klien LLM, daftar tools, dan agent ReAct dibuat sekali,
+# sedangkan setiap sesi hanya mendapat executor ringan dengan memory-nya sendiri.
+
+import importlib
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from langchain.agents import AgentExecutor, AgentType, Tool, initialize_agent
+
+from answer_cache import get_answer_cache
+from cache_utils import LRUCache
+from callback_handler import GeminiCallbackHandler
+from intent_router import get_intent_router
+from llm_clients import get_chat_llm
+from parallel_tools import (PARALLEL_TOOL_DESCRIPTION, PARALLEL_TOOL_NAME, PARALLEL_TOOLS_ENABLED, ParallelToolRunner,
+                            turn_retrieval_scope, turn_retriever)
+from telemetry import get_telemetry
+from tools.medical_info_tool import get_medical_info
+from tools.recommendation_tool import recommend_actions
+from tools.statistics_tool import analyze_cause_trend, find_extremes_in_year
+from tools.translator_tool import translate_medical_terms
+
+AGENT_TEMPERATURE = 0.2
+HANDLE_PARSING_ERRORS = "Maaf, terjadi sedikit kendala."
+
+BASE_SYSTEM_PROMPT = "Anda adalah AMIA (Asisten Medis AI), asisten AI yang cerdas, teliti, dan komunikatif. Jawab pertanyaan pengguna menggunakan alat yang tersedia atau informasi yang diberikan."
+DOCUMENT_MODE_PROMPT = "\n\nPERHATIAN: Anda sekarang dalam 'Mode Dokumen'. Fokus utama Anda adalah menjawab pertanyaan HANYA berdasarkan 'KONTEKS DOKUMEN' di bawah ini. Jangan gunakan tools lain kecuali diminta secara eksplisit oleh pengguna. Selalu sebutkan nama pasien jika relevan.\n--- KONTEKS DOKUMEN ---\n{context}\n--- AKHIR KONTEKS ---"
+SOURCE_PROMPT = "\nPENTING: Jika observasi dari tool mengandung penanda '<<SOURCE:xyz>>', Anda WAJIB menyertakan penanda tersebut persis apa adanya di akhir jawaban final Anda."
+
+
+def build_system_prompt(document_context: Optional[str] = None) -> str:
+    system_prompt = BASE_SYSTEM_PROMPT
+    # Logika mode dokumen eksklusif
+    if document_context:
+        system_prompt += DOCUMENT_MODE_PROMPT.format(context=document_context)
+    return system_prompt + SOURCE_PROMPT
+
+
+def build_final_input(user_input: str, document_context: Optional[str] = None) -> str:
+    return f"{build_system_prompt(document_context)}\n\nPertanyaan: {user_input}"
+
+
+def lazy_tool(module_name: str, function_name: str) -> Callable[[str], str]:
+    """Fungsi tool yang baru mengimpor modulnya saat pertama dipanggil (dependensi berat tidak ikut dimuat saat startup)."""
+    def run(query: str) -> str:
+        return getattr(importlib.import_module(module_name), function_name)(query)
+    return run
+
+
+def build_tools(retriever) -> list:
+    # Tool database memakai cache retrieval giliran (jika aktif) agar sub-query yang sama dicari sekali
+    tools = [
+        Tool(name='pencarian_dan_rangkuman_internet', func=lazy_tool('tools.web_search_tool', 'search_and_summarize_web'), description="Gunakan untuk pertanyaan pengetahuan umum kesehatan, TIPS (seperti 'tips kesehatan kulit'), cara mengobati penyakit, atau berita kesehatan terbaru yang TIDAK ADA di database statistik."),
+        Tool(name='cari_info_dari_database_kesehatan', func=lambda q: get_medical_info(q, turn_retriever(retriever)), description="Gunakan untuk mencari informasi spesifik tentang PENYEBAB KEMATIAN dari database statistik."),
+        Tool(name='analisis_tren_statistik_penyakit', func=lambda q: analyze_cause_trend(q, turn_retriever(retriever)), description="Gunakan untuk menganalisis tren statistik dari satu jenis PENYEBAB KEMATIAN."),
+        Tool(name='cari_penyebab_kematian_tertinggi_atau_terendah_per_tahun', func=find_extremes_in_year, description="Gunakan untuk mencari penyebab kematian TERTINGGI atau TERENDAH pada SATU TAHUN spesifik."),
+        Tool(name='beri_rekomendasi_terkait_penyebab_kematian', func=lambda q: recommend_actions(q, turn_retriever(retriever)), description="Gunakan untuk memberikan rekomendasi kesehatan terkait JENIS PENYEBAB KEMATIAN atau BENCANA dari database."),
+        Tool(name='terjemah_istilah_medis', func=translate_medical_terms, description="Gunakan untuk menerjemahkan istilah medis. Format: 'teks to bahasa_tujuan'. Beberapa istilah sekaligus dipisah titik koma: 'demam; batuk to en'."),
+    ]
+    if PARALLEL_TOOLS_ENABLED:
+        runner = ParallelToolRunner({tool.name: tool.func for tool in tools})
+        tools.append(Tool(name=PARALLEL_TOOL_NAME, func=runner, description=PARALLEL_TOOL_DESCRIPTION))
+    return tools
+
+
+class AgentFactory:
+    """
+    Menyimpan registry tools dan agent ReAct (prompt + LLMChain) yang dibangun sekali
+    untuk satu retriever, lalu membuat executor per sesi yang hanya berbeda di memory.
+    """
+
+    def __init__(self, retriever, max_sessions: int = 256) -> None:
+        self.retriever = retriever
+        self.tools = build_tools(retriever)
+        # Klien streaming: token jawaban diteruskan ke StreamingChatHandler; tanpa handler hasilnya sama
+        llm = get_chat_llm(temperature=AGENT_TEMPERATURE, streaming=True)
+        # Executor dasar tanpa memory; yang dipakai ulang hanya objek agent-nya.
+        self.agent = initialize_agent(self.tools, llm, agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION, handle_parsing_errors=HANDLE_PARSING_ERRORS).agent
+        self._executors = LRUCache(max_size=max_sessions)
+
+    def executor_for(self, memory) -> AgentExecutor:
+        """Executor milik sesi, dibuat ulang hanya jika objek memory sesi berganti."""
+        executor = self._executors.get(id(memory))
+        if executor is None or executor.memory is not memory:
+            executor = AgentExecutor.from_agent_and_tools(
+                agent=self.agent, tools=self.tools, memory=memory,
+                verbose=True, handle_parsing_errors=HANDLE_PARSING_ERRORS,
+            )
+            self._executors.put(id(memory), executor)
+        return executor
+
+
+_factories: Dict[int, AgentFactory] = {}
+_factories_lock = threading.Lock()
+
+
+def get_agent_factory(retriever) -> AgentFactory:
+    """Mengembalikan AgentFactory bersama untuk retriever ini (satu per proses)."""
+    factory = _factories.get(id(retriever))
+    if factory is not None and factory.retriever is retriever:
+        return factory
+    with _factories_lock:
+        factory = _factories.get(id(retriever))
+        if factory is None or factory.retriever is not retriever:
+            factory = AgentFactory(retriever)
+            _factories[id(retriever)] = factory
+        return factory
+
+
+def run_agent_turn(user_input: str, retriever, memory, pdf_content: str = None, callbacks: list = None,
+                   document_index=None) -> Tuple[str, dict]:
+    """
+    Menjalankan satu giliran agent dan mengembalikan (jawaban, timings) dengan
+    timings berisi waktu setup (ms) dan waktu eksekusi agent/model (ms).
+    `callbacks` diteruskan ke executor, misalnya StreamingChatHandler untuk mode streaming.
+    Jika `document_index` diberikan, hanya potongan dokumen yang relevan yang disisipkan
+    ke prompt (bukan `pdf_content` utuh).
+    Di luar Mode Dokumen, pertanyaan statistik terstruktur dijawab langsung oleh router intent
+    (lihat intent_router.py) dan pertanyaan yang hampir sama dengan pertanyaan sebelumnya dijawab dari
+    cache jawaban semantik (lihat answer_cache.py); keduanya tanpa menjalankan agent.
+    """
+    started = time.perf_counter()
+    general_mode = pdf_content is None and document_index is None
+    router = get_intent_router(retriever) if general_mode else None
+    if router is not None:
+        decision = router.route(user_input)
+        if decision.routed:
+            return _routed_turn(user_input, decision, memory, started)
+    answer_cache = get_answer_cache(retriever) if general_mode else None
+    if answer_cache is not None:
+        cached = answer_cache.lookup(user_input)
+        if cached is not None:
+            return _cached_turn(user_input, cached, memory, started)
+    document_metrics = None
+    document_context = pdf_content
+    if document_index is not None:
+        document_context, document_metrics = document_index.build_context(user_input)
+        print(f"[AMIA] konteks dokumen {document_metrics['context_tokens']} token "
+              f"(teks lengkap {document_metrics['full_text_tokens']} token, hemat {document_metrics['saved_pct']:.0f}%)")
+    final_input = build_final_input(user_input, document_context)
+    executor = get_agent_factory(retriever).executor_for(memory)
+    # Span LLM/tool dikumpulkan per giliran lalu diekspor sekaligus di akhir giliran
+    usage_handler = GeminiCallbackHandler()
+    turn_callbacks = list(callbacks or []) + [usage_handler]
+    if hasattr(memory, 'observation_handler'):
+        # TokenBudgetMemory menyematkan observasi tool yang membawa penanda <<SOURCE:...>>
+        turn_callbacks.append(memory.observation_handler())
+    setup_done = time.perf_counter()
+    try:
+        with turn_retrieval_scope(retriever) as retrieval_cache:
+            response = executor.run(final_input, callbacks=turn_callbacks)
+    except Exception as e:
+        _record_turn(usage_handler, started, setup_done, error=repr(e))
+        raise
+    finished = time.perf_counter()
+    timings = {
+        'setup_ms': (setup_done - started) * 1000,
+        'agent_ms': (finished - setup_done) * 1000,
+        'total_ms': (finished - started) * 1000,
+    }
+    if document_metrics:
+        timings['document'] = document_metrics
+    if retrieval_cache.stats['shared']:
+        timings['retrieval_cache'] = dict(retrieval_cache.stats)
+    memory_report = getattr(memory, 'last_report', None)
+    if memory_report:
+        timings['memory'] = dict(memory_report)
+        print(f"[AMIA] riwayat {memory_report['history_tokens']} token (buffer penuh {memory_report['full_history_tokens']} token, "
+              f"hemat {memory_report['saved_pct']:.0f}%, {memory_report['summarized_turns']} giliran diringkas)")
+    timings['telemetry'] = _record_turn(usage_handler, started, setup_done, document_tokens=(document_metrics or {}).get('context_tokens', 0))
+    print(f"[AMIA] setup {timings['setup_ms']:.1f} ms, agent {timings['agent_ms']:.1f} ms, total {timings['total_ms']:.1f} ms")
+    # Jawaban dari giliran dengan tool yang gagal tidak dibagikan lewat cache ke sesi lain
+    if answer_cache is not None and response != HANDLE_PARSING_ERRORS and not usage_handler.tool_errors():
+        answer_cache.store(user_input, response, timings['total_ms'])
+    return response, timings
+
+
+def _direct_turn(user_input: str, answer: str, memory, started: float, **telemetry_fields) -> dict:
+    """Giliran tanpa agent (router/cache): riwayat sesi dan telemetri tetap dicatat seperti giliran biasa."""
+    memory.save_context({"input": build_final_input(user_input)}, {"output": answer})
+    finished = time.perf_counter()
+    timings = {
+        'setup_ms': (finished - started) * 1000,
+        'agent_ms': 0.0,
+        'total_ms': (finished - started) * 1000,
+    }
+    memory_report = getattr(memory, 'last_report', None)
+    if memory_report:
+        timings['memory'] = dict(memory_report)
+    timings['telemetry'] = _record_turn(GeminiCallbackHandler(), started, finished, **telemetry_fields)
+    return timings
+
+
+def _routed_turn(user_input: str, decision, memory, started: float) -> Tuple[str, dict]:
+    timings = _direct_turn(user_input, decision.answer, memory, started, routed_intent=decision.intent)
+    timings['router'] = {'intent': decision.intent, 'confidence': round(decision.confidence, 3), 'slots': decision.slots}
+    print(f"[AMIA] dijawab router intent '{decision.intent}' (keyakinan {decision.confidence:.2f}) tanpa LLM, "
+          f"total {timings['total_ms']:.1f} ms")
+    return decision.answer, timings
+
+
+def _cached_turn(user_input: str, cached: dict, memory, started: float) -> Tuple[str, dict]:
+    timings = _direct_turn(user_input, cached['answer'], memory, started, cache_hit=True)
+    timings['cache'] = {'hit': True, 'similarity': round(cached['similarity'], 4), 'matched_question': cached['question'],
+                        'lookup_ms': round(cached['lookup_ms'], 2), 'saved_ms': round(max(0.0, cached['latency_ms'] - cached['lookup_ms']), 2)}
+    print(f"[AMIA] jawaban dari cache (kemiripan {cached['similarity']:.3f} dengan \"{cached['question']}\"), "
+          f"total {timings['total_ms']:.1f} ms, hemat ~{timings['cache']['saved_ms']:.0f} ms")
+    return cached['answer'], timings
+
+
+def _record_turn(usage_handler: GeminiCallbackHandler, started: float, setup_done: float, **fields) -> dict:
+    """Menutup span giliran dan mengirim semua span ke telemetri (jika aktif)."""
+    usage_handler.started_at = started
+    turn = usage_handler.turn_span(setup_ms=round((setup_done - started) * 1000, 2), **fields)
+    telemetry = get_telemetry()
+    if telemetry is not None:
+        telemetry.record(usage_handler.spans + [turn])
+    print(f"[AMIA] token {turn['input_tokens']} masuk / {turn['output_tokens']} keluar, "
+          f"biaya ${turn['cost_usd']:.6f}, {turn['llm_calls']} panggilan LLM, {turn['tool_calls']} tool")
+    return turn
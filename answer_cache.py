@@ -0,0 +1,226 @@
+# Berisi cache jawaban semantik: jawaban final agent (beserta penanda <<SOURCE:...>>) disimpan per
+# embedding pertanyaan, dan pertanyaan yang hampir sama (cosine >= ambang) dijawab langsung dari cache
+# lewat index FAISS kecil. Dipakai hanya untuk percakapan umum (bukan Mode Dokumen).
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from callback_handler import TOOL_ERROR_PATTERN
+from embedding_cache import normalize_query
+
+ANSWER_CACHE_ENABLED = os.getenv("AMIA_ANSWER_CACHE", "1") != "0"
+DEFAULT_THRESHOLD = float(os.getenv("AMIA_ANSWER_CACHE_THRESHOLD", "0.92"))
+DEFAULT_TTL_SECONDS = float(os.getenv("AMIA_ANSWER_CACHE_TTL", str(6 * 3600)))
+DEFAULT_MAX_ENTRIES = 1000
+# Kandidat terdekat yang diperiksa; kandidat pertama bisa gugur karena kata kunci berbeda atau kedaluwarsa
+SEARCH_CANDIDATES = 4
+
+# Kata yang membalik makna pertanyaan statistik walau embedding-nya hampir sama
+POLARITY_TERMS = {'tertinggi', 'terendah', 'terbanyak', 'tersedikit', 'terbesar', 'terkecil', 'naik', 'turun',
+                  'meningkat', 'menurun', 'highest', 'lowest'}
+# Pertanyaan lanjutan bergantung pada giliran sebelumnya, sehingga jawabannya tidak boleh dipakai ulang
+FOLLOW_UP_TERMS = {'itu', 'tersebut', 'tadi', 'sebelumnya', 'barusan', 'tadinya'}
+MIN_QUESTION_WORDS = 2
+
+
+def file_fingerprint(paths: List[str]) -> tuple:
+    """Sidik file dari (path, mtime, ukuran); berubah setiap kali CSV atau index ditulis ulang."""
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+
+def key_terms(question: str) -> frozenset:
+    """Angka (tahun, jumlah) dan kata polaritas harus sama persis agar jawaban boleh dipakai ulang."""
+    words = re.findall(r'[a-z0-9]+', normalize_query(question))
+    return frozenset(word for word in words if word.isdigit() or word in POLARITY_TERMS)
+
+
+def is_cacheable_question(question: str) -> bool:
+    words = re.findall(r'[a-z0-9]+', normalize_query(question))
+    return len(words) >= MIN_QUESTION_WORDS and not FOLLOW_UP_TERMS.intersection(words)
+
+
+def is_cacheable_answer(answer: str) -> bool:
+    """Jawaban kosong atau yang memuat teks kegagalan tool tidak boleh dibagikan ke sesi lain."""
+    return bool(answer) and not TOOL_ERROR_PATTERN.search(answer)
+
+
+class SemanticAnswerCache:
+    """
+    Cache pertanyaan -> jawaban dengan pencocokan cosine (IndexFlatIP atas embedding ternormalisasi).
+    - Pertanyaan yang sama persis (setelah normalisasi) dicocokkan tanpa embedding.
+    - Entri kedaluwarsa setelah `ttl_seconds`; jika penuh, entri yang paling lama tidak dipakai dibuang.
+    - Seluruh isi dikosongkan saat sidik file sumber (CSV & index FAISS) berubah.
+    `stats` mencatat hit rate dan estimasi waktu yang dihemat (latensi giliran asli - waktu lookup).
+    """
+
+    def __init__(self, embed_query: Callable[[str], List[float]], source_paths: List[str] = (),
+                 threshold: float = DEFAULT_THRESHOLD, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, clock: Callable[[], float] = time.monotonic) -> None:
+        self.embed_query = embed_query
+        self.source_paths = list(source_paths)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._fingerprint = file_fingerprint(self.source_paths)
+        self._index = None
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._by_text: Dict[str, int] = {}
+        self._next_id = 0
+        self.stats = {"lookups": 0, "hits": 0, "exact_hits": 0, "misses": 0, "stores": 0,
+                      "evictions": 0, "invalidations": 0, "saved_ms": 0.0, "lookup_ms": 0.0}
+
+    # --- Pemeliharaan ---
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+            self._entries.clear()
+            self._by_text.clear()
+
+    def _check_sources(self) -> None:
+        fingerprint = file_fingerprint(self.source_paths)
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                print(f"[AMIA] data sumber berubah, {len(self._entries)} jawaban di cache dibuang.")
+            self.clear()
+            self._fingerprint = fingerprint
+            self.stats["invalidations"] += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            self._by_text.pop(entry["key"], None)
+            self._index.remove_ids(np.array([entry_id], dtype="int64"))
+
+    def _expired(self, entry: Dict) -> bool:
+        return self.clock() - entry["created_at"] > self.ttl_seconds
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.array([self.embed_query(question)], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    # --- API ---
+    def lookup(self, question: str) -> Optional[Dict]:
+        """Mengembalikan entri {answer, question, similarity, ...} jika ada jawaban yang cukup mirip."""
+        if not is_cacheable_question(question):
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            self.stats["lookups"] += 1
+            self._check_sources()
+            entry = self._find_exact(normalize_query(question))
+            similarity = 1.0 if entry is not None else None
+            needs_search = entry is None and self._index is not None and bool(self._entries)
+        if needs_search:
+            # Embedding (panggilan jaringan saat cache embedding miss) dihitung di luar lock agar
+            # lookup dari sesi lain tidak ikut menunggu; lock hanya untuk pencarian index
+            vector = self._embed(question)
+            with self._lock:
+                entry, similarity = self._search(vector, key_terms(question))
+        with self._lock:
+            lookup_ms = (time.perf_counter() - started) * 1000
+            self.stats["lookup_ms"] += lookup_ms
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry["id"] in self._entries:
+                self._entries.move_to_end(entry["id"])
+            entry["hits"] += 1
+            self.stats["hits"] += 1
+            self.stats["saved_ms"] += max(0.0, entry["latency_ms"] - lookup_ms)
+            return dict(entry, similarity=similarity, lookup_ms=lookup_ms)
+
+    def _find_exact(self, key: str) -> Optional[Dict]:
+        entry_id = self._by_text.get(key)
+        if entry_id is None:
+            return None
+        entry = self._entries[entry_id]
+        if self._expired(entry):
+            self._remove(entry_id)
+            return None
+        self.stats["exact_hits"] += 1
+        return entry
+
+    def _search(self, vector: np.ndarray, terms: frozenset):
+        # Dipanggil di bawah lock; index bisa sudah dikosongkan sejak embedding dihitung
+        if self._index is None or not self._entries:
+            return None, None
+        scores, ids = self._index.search(vector, min(SEARCH_CANDIDATES, len(self._entries)))
+        for score, entry_id in zip(scores[0], ids[0]):
+            if entry_id < 0 or score < self.threshold:
+                break
+            entry = self._entries.get(int(entry_id))
+            if entry is None:
+                continue
+            if self._expired(entry):
+                self._remove(int(entry_id))
+                continue
+            if entry["terms"] == terms:
+                return entry, float(score)
+        return None, None
+
+    def store(self, question: str, answer: str, latency_ms: float) -> bool:
+        """Menyimpan jawaban final; pertanyaan lanjutan/terlalu pendek dan jawaban kosong/gagal diabaikan."""
+        if not is_cacheable_answer(answer) or not is_cacheable_question(question):
+            return False
+        vector = self._embed(question)
+        with self._lock:
+            self._check_sources()
+            key = normalize_query(question)
+            if key in self._by_text:
+                self._remove(self._by_text[key])
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = {"id": entry_id, "key": key, "question": question, "answer": answer,
+                                       "terms": key_terms(question), "latency_ms": latency_ms,
+                                       "created_at": self.clock(), "hits": 0}
+            self._by_text[key] = entry_id
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            return True
+
+    def summary(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["lookups"]
+            return dict(self.stats, entries=len(self._entries),
+                        hit_rate=self.stats["hits"] / lookups if lookups else 0.0,
+                        avg_lookup_ms=self.stats["lookup_ms"] / lookups if lookups else 0.0)
+
+
+_caches: Dict[int, SemanticAnswerCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_answer_cache(retriever) -> Optional[SemanticAnswerCache]:
+    """Cache jawaban bersama untuk retriever ini (satu per proses); None jika AMIA_ANSWER_CACHE=0."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    cache = _caches.get(id(retriever))
+    if cache is not None:
+        return cache
+    with _caches_lock:
+        if id(retriever) not in _caches:
+            paths = [path for path in (getattr(retriever, 'csv_path', None), getattr(retriever, 'index_path', None)) if path]
+            _caches[id(retriever)] = SemanticAnswerCache(retriever.embed_query, source_paths=paths)
+        return _caches[id(retriever)]
@@ -0,0 +1 @@
+# Berisi skrip benchmark untuk mengukur performa komponen AMIA (jalankan dengan `python -m benchmarks.<nama>`).
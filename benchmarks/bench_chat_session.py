@@ -0,0 +1,123 @@
+# Berisi benchmark rerun aplikasi Streamlit (main.py) pada sesi panjang, dijalankan dengan
+# streamlit.testing (AppTest) dan layanan palsu. Membandingkan rerun yang merender jendela pesan
+# terakhir dengan rerun yang merender seluruh riwayat (perilaku lama), dan mengukur memori per sesi.
+#
+# Contoh: python -m benchmarks.bench_chat_session --messages 50 200 500 --reruns 5
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+from benchmarks.fakes import FakeHashEmbeddings, FakeTranslateClient, FakeWebServer, ScriptedChatModel, install_fake_services
+from benchmarks.run_benchmarks import DATA_CSV, base_vectors, make_retriever, summarize_samples
+
+ANSWER_TEXT = ("Berikut analisis tren untuk 'Tuberkulosis' periode 2004 - 2021:\n- Laporan Tahunan: 5 data.\n"
+               "- Rata-rata Kematian: 9,038 jiwa/tahun.\n- Puncak Kematian: 14,100 jiwa (2004).\n") * 2
+
+_retriever = None
+
+
+def shared_retriever():
+    return _retriever
+
+
+def _app():
+    # Skrip AppTest: main.py dengan retriever palsu milik proses benchmark
+    import main
+    from benchmarks import bench_chat_session
+    main.init_retriever = bench_chat_session.shared_retriever
+    main.main()
+
+
+def fill_session(session, messages: int) -> None:
+    for number in range(messages // 2):
+        question = f"pertanyaan nomor {number} tentang tren penyakit menular"
+        session.add_message({"role": "user", "content": question})
+        session.add_message({"role": "assistant", "content": ANSWER_TEXT, "source": "AI Generative"})
+        session.memory.save_context({"input": question}, {"output": ANSWER_TEXT})
+
+
+def time_reruns(session_id: str, reruns: int, full_history: bool, session) -> List[float]:
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_function(_app, default_timeout=120)
+    app.session_state["session_id"] = session_id
+    samples = []
+    for _ in range(reruns + 1):
+        if full_history:
+            session.history_limit = len(session.messages)
+        started = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    if app.exception:
+        raise RuntimeError(app.exception)
+    # Run pertama memuat modul dan cache; tidak dihitung
+    return samples[1:]
+
+
+def time_turn(session_id: str, full_history: bool, session) -> float:
+    """Satu giliran: rerun dengan input chat (+ rerun kedua seperti perilaku lama jika full_history)."""
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_function(_app, default_timeout=120)
+    app.session_state["session_id"] = session_id
+    if full_history:
+        session.history_limit = len(session.messages) + 2
+    app.run()
+    started = time.perf_counter()
+    app.chat_input[0].set_value("halo").run()
+    if full_history:
+        app.run()
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    global _retriever
+    parser = argparse.ArgumentParser(description="Benchmark rerun Streamlit & memori per sesi pada sesi panjang.")
+    parser.add_argument("--messages", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="amia-chat-")
+    os.environ.setdefault("AMIA_TELEMETRY_DIR", os.path.join(workdir, "telemetry"))
+    # Retriever palsu disuntikkan lewat init_retriever; pemanasan latar akan membangun retriever asli
+    os.environ.setdefault("AMIA_WARMUP", "0")
+    embeddings = FakeHashEmbeddings()
+    _retriever = make_retriever(workdir, DATA_CSV, base_vectors(pd.read_csv(DATA_CSV).fillna(""), embeddings), embeddings)
+
+    import main as app_module
+    # Modul agent biasanya sudah dimuat oleh pemanasan latar; diimpor di sini agar giliran pertama tidak menanggungnya
+    import agent_factory, streaming  # noqa: F401
+    from session_store import MAX_MESSAGES, approx_size_bytes
+    store = app_module.get_session_store()
+    results: Dict[str, Dict] = {}
+    with FakeWebServer() as web_server, contextlib.redirect_stdout(io.StringIO()):
+        install_fake_services(ScriptedChatModel(), web_server, FakeTranslateClient())
+        for count in args.messages:
+            row = {}
+            for mode in ("window", "full"):
+                session_id = f"bench-{count}-{mode}"
+                session = store.get(session_id)
+                fill_session(session, count)
+                row[f"{mode}_rerun"] = summarize_samples(time_reruns(session_id, args.reruns, mode == "full", session))
+                row[f"{mode}_turn_ms"] = round(time_turn(session_id, mode == "full", session), 2)
+            row["stored_messages"] = len(session.messages)
+            row["session_kb"] = round(approx_size_bytes(session) / 1024, 1)
+            row["messages_kb"] = round(approx_size_bytes(session.messages) / 1024, 1)
+            row["memory_kb"] = round(approx_size_bytes(session.memory) / 1024, 1)
+            results[str(count)] = row
+    output = {"max_messages": MAX_MESSAGES, "history_window": app_module.HISTORY_WINDOW, "results": results}
+    print(json.dumps(output, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
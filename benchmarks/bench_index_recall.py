@@ -0,0 +1,161 @@
+# Berisi benchmark pemilihan tipe index FAISS: recall@k vs latensi per query vs ukuran/memori,
+# untuk flat, flat_fp16, ivf_flat (sweep nprobe), hnsw (sweep ef_search), dan ivf_pq (sweep nprobe).
+# Data sintetis berdimensi sama dengan Cohere, berkelompok dan berdimensi intrinsik rendah
+# (mirip sebaran embedding teks), sehingga tetangga terdekatnya bermakna.
+#
+# Contoh: python -m benchmarks.bench_index_recall --sizes 20000 100000 --metric ip --output recall.json
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from index_factory import apply_search_params, build_index, load_index, make_spec, prepare_vectors, resolve_params
+
+SWEEPS = {
+    "flat": [{}],
+    "flat_fp16": [{}],
+    "ivf_flat": [{"nprobe": n} for n in (1, 4, 8, 16, 32, 64)],
+    "hnsw": [{"ef_search": n} for n in (16, 32, 64, 128)],
+    "ivf_pq": [{"nprobe": n} for n in (1, 4, 8, 16, 32, 64)],
+}
+
+
+def make_clustered_vectors(num_vectors: int, dim: int, num_clusters: int = 200, latent_dim: int = 64,
+                           seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    projection = rng.standard_normal((latent_dim, dim), dtype="float32") / np.sqrt(latent_dim)
+    centers = rng.standard_normal((num_clusters, latent_dim), dtype="float32")
+    vectors = np.empty((num_vectors, dim), dtype="float32")
+    for start in range(0, num_vectors, 50000):
+        end = min(start + 50000, num_vectors)
+        labels = rng.integers(0, num_clusters, end - start)
+        latent = centers[labels] + 0.5 * rng.standard_normal((end - start, latent_dim), dtype="float32")
+        vectors[start:end] = latent @ projection + 0.05 * rng.standard_normal((end - start, dim), dtype="float32")
+    return vectors
+
+
+def memory_mb() -> Optional[Dict[str, float]]:
+    """Memori privat (RssAnon) dan halaman file yang dapat dibagi antar proses (RssFile); Linux saja."""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if line.startswith(("RssAnon", "RssFile")))
+        return {key: int(value.split()[0]) / 1024 for key, value in fields.items()}
+    except (OSError, ValueError):
+        return None
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f[:k]) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def measure_search(index, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict:
+    # Satu query per panggilan, seperti retriever melayani satu pertanyaan
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(ids[0])
+    latencies = np.array(latencies)
+    return {
+        "recall_at_k": round(recall_at_k(np.array(found), truth), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "qps": round(1000 * len(latencies) / latencies.sum(), 1),
+    }
+
+
+def measure_load(index_path: str, spec: Dict, queries: np.ndarray, k: int) -> Dict:
+    """
+    Waktu muat dan pertambahan memori setelah 100 query, untuk muat penuh vs memory-map.
+    `private_mb` dimiliki satu proses; `shared_mb` berupa page cache yang dipakai bersama oleh semua worker.
+    """
+    results = {}
+    for mode, mmap in (("full", False), ("mmap", True)):
+        before = memory_mb()
+        started = time.perf_counter()
+        index = load_index(index_path, spec, mmap=mmap)
+        load_ms = (time.perf_counter() - started) * 1000
+        index.search(queries[:100], k)
+        after = memory_mb()
+        results[mode] = {"load_ms": round(load_ms, 2)}
+        if before and after:
+            results[mode]["private_mb"] = round(after["RssAnon"] - before["RssAnon"], 1)
+            results[mode]["shared_mb"] = round(after["RssFile"] - before["RssFile"], 1)
+        del index
+    return results
+
+
+def run(sizes: List[int], dim: int, metric: str, k: int, num_queries: int, types: List[str]) -> Dict:
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="amia-recall-")
+    for size in sizes:
+        data = make_clustered_vectors(size + num_queries, dim)
+        base_spec = make_spec("flat", metric)
+        vectors = prepare_vectors(data[:size], base_spec)
+        queries = prepare_vectors(data[size:], base_spec)
+        del data
+        ids = np.arange(size, dtype="int64")
+
+        exact = build_index(vectors, ids, base_spec)
+        _, truth = exact.search(queries, k)
+        del exact
+
+        size_results = {}
+        for index_type in types:
+            spec = resolve_params(make_spec(index_type, metric), size, dim)
+            started = time.perf_counter()
+            index = build_index(vectors, ids, spec)
+            build_s = time.perf_counter() - started
+            index_path = os.path.join(workdir, f"{index_type}_{size}.idx")
+            faiss.write_index(index, index_path)
+
+            sweep = []
+            for search_params in SWEEPS[index_type]:
+                sweep_spec = make_spec(index_type, metric, **{**spec["params"], **search_params})
+                apply_search_params(index, sweep_spec)
+                row = dict(search_params, **measure_search(index, queries, truth, k))
+                sweep.append(row)
+                print(f"  {size:>8} {index_type:<10} {str(search_params):<18} recall@{k} {row['recall_at_k']:.3f}  "
+                      f"p50 {row['p50_ms']:.3f} ms")
+            del index
+            size_results[index_type] = {
+                "params": spec["params"],
+                "build_s": round(build_s, 2),
+                "file_mb": round(os.path.getsize(index_path) / 2 ** 20, 1),
+                "load": measure_load(index_path, spec, queries, k),
+                "sweep": sweep,
+            }
+            os.remove(index_path)
+        results[str(size)] = size_results
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark recall@k vs latensi vs memori per tipe index FAISS.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--metric", choices=["l2", "ip"], default="ip")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--types", nargs="+", default=list(SWEEPS), choices=list(SWEEPS))
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    print(f"Benchmark index: dim {args.dim}, metrik {args.metric}, k {args.k}, {args.queries} query")
+    results = run(args.sizes, args.dim, args.metric, args.k, args.queries, args.types)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
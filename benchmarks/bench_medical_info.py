@@ -0,0 +1,83 @@
+# Berisi micro-benchmark ekstraksi info medis: implementasi lama (enam pola, dikompilasi ulang per
+# panggilan) vs pemindai judul satu sapuan, sekaligus pemeriksaan bahwa hasil keduanya identik.
+
+import argparse
+import random
+import re
+import time
+from typing import Any, Dict
+
+import medical_document_processor as mdp
+from benchmarks.bench_pdf_extraction import SAMPLE_LINES
+
+FILLER = "pasien datang dengan keluhan lemas sejak tiga hari, nafsu makan menurun, tidur terganggu. "
+RANDOM_WORDS = ['Diagnosa:', 'diagnosis', 'riwayat penyakit:', 'Obat-obatan:', 'obat', 'obatanda vital', 'hasil lab:',
+                'tanda vital', 'vital signs:', 'TD 120/80', 'Rekomendasi:', 'saran:', 'demam', '(2x1)', '.', ',',
+                '\n', '  ', ':', '<5', '=', '°', 'Nama:', ' : ']
+
+
+def reference_extract(text: str) -> Dict[str, Any]:
+    """Salinan implementasi sebelumnya sebagai acuan kebenaran."""
+    medical_info = {key: [] for key in mdp.MEDICAL_INFO_PATTERNS}
+    for key, pattern in mdp.MEDICAL_INFO_PATTERNS.items():
+        for match in re.finditer(pattern, text):
+            found_group = match.group(1)
+            if found_group:
+                clean_text = found_group.strip().replace('\n', ' ').strip()
+                if clean_text:
+                    medical_info[key].append(clean_text)
+    return medical_info
+
+
+def make_record(num_lines: int) -> str:
+    lines = []
+    for i in range(num_lines):
+        lines.append(SAMPLE_LINES[i % len(SAMPLE_LINES)].format(page=i // len(SAMPLE_LINES) + 1))
+        lines.append(FILLER)
+    return "\n".join(lines)
+
+
+def check_correctness(trials: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for _ in range(trials):
+        text = "".join(rng.choice(RANDOM_WORDS) + rng.choice(['', ' ', '\n']) for _ in range(rng.randint(0, 60)))
+        expected = reference_extract(text)
+        assert mdp.extract_medical_info_from_text(text) == expected, text
+        extractor = mdp.StreamingMedicalInfoExtractor()
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 25)
+            extractor.feed(text[pos:pos + size])
+            pos += size
+        assert extractor.finish() == expected, text
+    print(f"Kebenaran: {trials} teks acak identik dengan implementasi lama (batch dan streaming).")
+
+
+def _time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(sizes, repeat: int, trials: int) -> None:
+    check_correctness(trials)
+    print(f"{'baris':>8} {'KB':>8} {'lama ms':>9} {'baru ms':>9} {'offset ms':>10} {'speedup':>8}")
+    for num_lines in sizes:
+        text = make_record(num_lines)
+        assert mdp.extract_medical_info_from_text(text) == reference_extract(text)
+        old_ms = _time(lambda: reference_extract(text), repeat)
+        new_ms = _time(lambda: mdp.extract_medical_info_from_text(text), repeat)
+        offsets_ms = _time(lambda: mdp.extract_medical_info_with_offsets(text), repeat)
+        print(f"{num_lines:>8} {len(text) / 1024:>8.0f} {old_ms:>9.2f} {new_ms:>9.2f} {offsets_ms:>10.2f} {old_ms / new_ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark ekstraksi info medis.")
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--trials", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.lines, args.repeat, args.trials)
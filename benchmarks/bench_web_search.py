@@ -0,0 +1,43 @@
+# Berisi benchmark pipeline pencarian web memakai server HTTP lokal dan fungsi pencarian palsu:
+# membandingkan latensi (termasuk halaman lambat) dan token rangkuman, lalu efek cache query/URL.
+
+import argparse
+import time
+
+from langchain_community.llms.fake import FakeListLLM
+
+from benchmarks.fakes import FakeWebServer, make_fake_search, make_html_page
+from token_utils import count_tokens
+from tools.web_search_tool import WebSearchPipeline, html_to_text
+
+
+def run(paragraphs: int, slow_seconds: float) -> None:
+    pages = {"/big": make_html_page(paragraphs), "/small": make_html_page(5), "/slow": make_html_page(5)}
+    with FakeWebServer(pages, delays={"/slow": slow_seconds}) as server:
+        search = make_fake_search({
+            "dbd": [server.url("/big"), server.url("/small")],
+            "hilang": [server.url("/missing"), server.url("/small")],
+            "lambat": [server.url("/slow"), server.url("/small")],
+        })
+        llm = FakeListLLM(responses=["Rangkuman uji."] * 1000)
+        pipeline = WebSearchPipeline(search_fn=search, llm=llm, fetch_timeout=(1, slow_seconds / 2))
+
+        raw_tokens = count_tokens(pages["/big"].decode("utf-8"))
+        trimmed_tokens = count_tokens(html_to_text(pages["/big"].decode("utf-8")))
+        print(f"Token halaman besar: HTML mentah {raw_tokens}, setelah dipangkas {trimmed_tokens}")
+
+        for query in ["dbd gejala", "hilang", "lambat", "dbd gejala", "DBD  Gejala"]:
+            started = time.perf_counter()
+            answer = pipeline.run(query)
+            elapsed = (time.perf_counter() - started) * 1000
+            source = answer.rsplit("<<SOURCE:", 1)[-1].rstrip(">")
+            print(f"{query!r:>16}: {elapsed:8.1f} ms  sumber={source}")
+        print(f"Statistik: {pipeline.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline pencarian web dengan server lokal.")
+    parser.add_argument("--paragraphs", type=int, default=600)
+    parser.add_argument("--slow-seconds", type=float, default=4.0)
+    args = parser.parse_args()
+    run(args.paragraphs, args.slow_seconds)
@@ -0,0 +1,200 @@
+# Berisi pengganti layanan eksternal untuk benchmark: embedding deterministik (1024 dimensi),
+# chat model berskrip yang menjalankan loop ReAct, server web lokal + fungsi pencarian, dan klien terjemahan.
+
+import hashlib
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+EMBEDDING_DIM = 1024
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+class FakeHashEmbeddings(Embeddings):
+    """
+    Embedding deterministik berdimensi sama dengan Cohere embed-multilingual-v3.0.
+    Vektor teks = jumlah vektor acak per token (seed dari hash token), dinormalisasi,
+    sehingga teks dengan kata yang sama tetap berdekatan. `latency_ms` meniru waktu panggilan API.
+    """
+
+    model = "fake-hash-1024"
+
+    def __init__(self, dim: int = EMBEDDING_DIM, latency_ms: float = 0.0) -> None:
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            vector = np.random.default_rng(_seed(token)).standard_normal(self.dim).astype("float32")
+            self._token_vectors[token] = vector
+        return vector
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = re.findall(r"\w+", text.lower()) or [""]
+        vector = np.sum([self._token_vector(token) for token in tokens], axis=0)
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+# Skenario default: pertanyaan -> (tool, input) yang akan dipilih model berskrip
+DEFAULT_SCRIPT = {
+    "info demam berdarah": ("cari_info_dari_database_kesehatan", "Demam Berdarah Dengue"),
+    "tren tbc": ("analisis_tren_statistik_penyakit", "tbc"),
+    "penyebab tertinggi 2010": ("cari_penyebab_kematian_tertinggi_atau_terendah_per_tahun", "tertinggi 2010"),
+    "rekomendasi banjir": ("beri_rekomendasi_terkait_penyebab_kematian", "banjir"),
+    "terjemahkan demam": ("terjemah_istilah_medis", "demam; nyeri sendi to en"),
+    "tips kulit sehat": ("pencarian_dan_rangkuman_internet", "tips kesehatan kulit"),
+    "halo": (None, None),
+}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model palsu untuk agent CONVERSATIONAL_REACT_DESCRIPTION: untuk pertanyaan yang ada di
+    `script` model memanggil tool tersebut sekali, lalu menjawab dengan baris pertama observasinya.
+    Prompt lain (mis. rangkuman web/riwayat) dijawab dengan teks tetap.
+    """
+
+    script: Dict[str, Tuple[Optional[str], Optional[str]]] = DEFAULT_SCRIPT
+    latency_ms: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat"
+
+    def _respond(self, prompt: str) -> str:
+        if "New input:" not in prompt:
+            return "Ringkasan palsu dari model berskrip."
+        new_input = prompt.rsplit("New input:", 1)[1]
+        question = new_input.rsplit("Pertanyaan:", 1)[-1].split("\n", 1)[0].strip().lower()
+        observations = re.findall(r"Observation: (.*)", new_input)
+        tool, tool_input = self.script.get(question, (None, None))
+        if tool and not observations:
+            return f"Thought: Do I need to use a tool? Yes\nAction: {tool}\nAction Input: {tool_input}"
+        answer = observations[-1].strip() if observations else f"Jawaban berskrip untuk '{question}'."
+        return f"Thought: Do I need to use a tool? No\nAI: {answer}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        prompt = "\n".join(str(message.content) for message in messages)
+        text = self._respond(prompt)
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4, "total_tokens": (len(prompt) + len(text)) // 4}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+
+# --- Server web lokal ---
+ARTICLE = "<p>Demam berdarah dengue ditularkan oleh nyamuk Aedes aegypti. Pencegahan dilakukan dengan 3M plus.</p>"
+PAGE_NOISE = "<script>var tracking = '" + "x" * 2000 + "';</script><nav>" + "<a href='#'>Menu</a>" * 50 + "</nav>"
+
+
+def make_html_page(paragraphs: int) -> bytes:
+    body = PAGE_NOISE + "<article>" + ARTICLE * paragraphs + "</article><footer>Hak cipta</footer>"
+    return f"<html><head><title>Uji</title></head><body>{body}</body></html>".encode("utf-8")
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.delays.get(self.path, 0))
+        body = self.server.pages.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeWebServer:
+    """Server HTTP lokal berisi halaman statis (dengan jeda opsional per path)."""
+
+    def __init__(self, pages: Dict[str, bytes] = None, delays: Dict[str, float] = None) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        self.server.daemon_threads = True
+        self.server.pages = pages if pages is not None else {"/artikel": make_html_page(20), "/besar": make_html_page(600)}
+        self.server.delays = delays or {}
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakeWebServer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def make_fake_search(results: Dict[str, List[str]], default: List[str] = None):
+    """Fungsi pencarian palsu: kata pertama query (huruf kecil) -> daftar URL."""
+    def search(query: str, num_results: int) -> List[str]:
+        words = query.lower().split()
+        return list(results.get(words[0] if words else "", default or []))[:num_results]
+    return search
+
+
+class FakeTranslateClient:
+    """Meniru google.cloud.translate_v2.Client.translate (menerima satu teks atau daftar)."""
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+    def translate(self, values, target_language: str, **kwargs):
+        self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        items = [values] if isinstance(values, str) else list(values)
+        results = [{"input": value, "translatedText": f"[{target_language}] {value}"} for value in items]
+        return results[0] if isinstance(values, str) else results
+
+
+def install_fake_services(chat_model: BaseChatModel, web_server: FakeWebServer,
+                          translate_client: FakeTranslateClient = None) -> None:
+    """Mengganti klien LLM bersama, pipeline web, dan penerjemah bersama dengan versi palsu."""
+    import llm_clients
+    from tools import translator_tool, web_search_tool
+
+    for temperature in (0, 0.2):
+        for streaming in (False, True):
+            llm_clients._clients[(llm_clients.DEFAULT_MODEL, temperature, streaming)] = chat_model
+    search = make_fake_search({}, default=[web_server.url("/artikel"), web_server.url("/besar")])
+    web_search_tool._pipeline = web_search_tool.WebSearchPipeline(search_fn=search, llm=chat_model)
+    translator_tool._translator = translator_tool.MedicalTranslator(
+        client=translate_client or FakeTranslateClient(), cache=translator_tool.TranslationCache(path=None))
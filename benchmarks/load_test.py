@@ -0,0 +1,125 @@
+# Berisi uji beban untuk service.py: sejumlah klien konkuren mengirim POST /ask secara bergantian
+# (closed loop), lalu melaporkan throughput, latensi p50/p95/p99, dan jumlah status per jenis.
+# Tanpa --url, service dijalankan di proses ini dengan layanan palsu (benchmarks/fakes.py).
+#
+# Contoh: python -m benchmarks.load_test --clients 16 --requests 400 --concurrency 4 --llm-latency-ms 50
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.fakes import DEFAULT_SCRIPT
+
+
+async def post_json(host: str, port: int, path: str, payload: Dict) -> tuple:
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), json.loads(body or b"{}")
+
+
+async def run_clients(host: str, port: int, clients: int, total_requests: int, timeout: float) -> Dict:
+    questions = list(DEFAULT_SCRIPT)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(total_requests))
+
+    async def client(client_id: int) -> None:
+        for number in counter:
+            started = time.perf_counter()
+            try:
+                status, _ = await post_json(host, port, "/ask", {
+                    "question": questions[number % len(questions)],
+                    "session_id": f"klien-{client_id}",
+                    "timeout": timeout,
+                })
+            except (OSError, ValueError, IndexError):
+                status = 0
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    values = np.array(latencies)
+    return {
+        "requests": len(latencies),
+        "clients": clients,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def run_local(args) -> Dict:
+    """Menjalankan service dengan retriever, LLM, web, dan penerjemah palsu di port acak."""
+    import pandas as pd
+
+    from benchmarks.fakes import FakeHashEmbeddings, FakeTranslateClient, FakeWebServer, ScriptedChatModel, install_fake_services
+    from benchmarks.run_benchmarks import DATA_CSV, base_vectors, make_retriever
+    from service import AgentService, start_server
+
+    workdir = tempfile.mkdtemp(prefix="amia-load-")
+    os.environ.setdefault("AMIA_TELEMETRY_DIR", os.path.join(workdir, "telemetry"))
+    embeddings = FakeHashEmbeddings(latency_ms=args.embedding_latency_ms)
+    retriever = make_retriever(workdir, DATA_CSV, base_vectors(pd.read_csv(DATA_CSV).fillna(""), embeddings), embeddings)
+    with FakeWebServer() as web_server:
+        install_fake_services(ScriptedChatModel(latency_ms=args.llm_latency_ms), web_server, FakeTranslateClient())
+        service = AgentService(retriever, concurrency=args.concurrency, max_queue=args.max_queue, timeout=args.timeout)
+        server = await start_server(service, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            # Keluaran verbose agent dari thread pool dibuang selama pengukuran
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = await run_clients("127.0.0.1", port, args.clients, args.requests, args.timeout)
+        finally:
+            server.close()
+            service.close()
+        result["service_stats"] = dict(service.stats)
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Uji beban service AMIA (POST /ask).")
+    parser.add_argument("--url", default=None, help="Service yang sudah berjalan, mis. http://127.0.0.1:8080. "
+                                                    "Tanpa ini service dijalankan lokal dengan layanan palsu.")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=4, help="Ukuran thread pool service lokal.")
+    parser.add_argument("--max-queue", type=int, default=64, help="Batas antrean service lokal.")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    if args.url:
+        target = urlparse(args.url)
+        result = asyncio.run(run_clients(target.hostname, target.port or 80, args.clients, args.requests, args.timeout))
+    else:
+        result = asyncio.run(run_local(args))
+    result["args"] = vars(args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
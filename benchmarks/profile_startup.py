@@ -0,0 +1,152 @@
+# Berisi profil startup AMIA: waktu impor per modul (python -X importtime di proses baru) dibandingkan
+# anggaran impor, dan waktu hingga jawaban pertama dengan/tanpa pemanasan latar (warmup.py).
+# Jawaban pertama diukur di proses baru dengan layanan palsu (benchmarks/fakes.py); impor modul-modulnya
+# tetap terhitung, hanya panggilan jaringan yang diganti.
+#
+# Contoh: python -m benchmarks.profile_startup --think-ms 3000 --output startup.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Anggaran waktu impor main.py (UI Streamlit); Streamlit sendiri memakai ~400 ms di mesin 1 CPU
+IMPORT_BUDGET_MS = float(os.getenv("AMIA_IMPORT_BUDGET_MS", "800"))
+FIRST_QUESTION = "info demam berdarah"
+
+
+def parse_importtime(stderr: str, module: str) -> List[tuple]:
+    """Baris (self_us, cumulative_us, nama) milik subtree impor `module` dari keluaran -X importtime."""
+    subtree: List[tuple] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # baris judul
+        raw_name = parts[2].rstrip()
+        name = raw_name.strip()
+        subtree.append((self_us, cumulative_us, name))
+        # Modul tingkat atas (tanpa indentasi) menutup subtree-nya; modul lain sebelumnya milik startup Python
+        if len(raw_name) - len(raw_name.lstrip()) <= 1:
+            if name == module:
+                return subtree
+            subtree = []
+    raise RuntimeError(f"Modul {module} tidak ditemukan di keluaran importtime.")
+
+
+def import_profile(module: str, top: int) -> Dict:
+    """Waktu impor `module` di proses baru, dikelompokkan per paket tingkat atas (jumlah waktu self)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            capture_output=True, text=True, env=dict(os.environ, AMIA_WARMUP="0"))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    subtree = parse_importtime(result.stderr, module)
+    by_package: Dict[str, int] = {}
+    for self_us, _, name in subtree:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    local = sorted(name for _, _, name in subtree
+                   if os.path.exists(os.path.join(ROOT, name.replace(".", os.sep) + ".py")))
+    total_ms = subtree[-1][1] / 1000
+    return {
+        'total_ms': round(total_ms, 1),
+        'budget_ms': IMPORT_BUDGET_MS,
+        'within_budget': total_ms <= IMPORT_BUDGET_MS,
+        'modules': len(subtree),
+        'per_package_ms': {package: round(us / 1000, 1)
+                           for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]},
+        'local_modules': local,
+    }
+
+
+def first_answer(warmup_enabled: bool, think_ms: float, question: str) -> Dict:
+    """
+    Dijalankan di proses anak: impor main.py (UI siap), jeda "pengguna mengetik" selama `think_ms`,
+    lalu satu pertanyaan ke agent. Langkah pemanasan sama dengan aplikasi, kecuali retriever & klien palsu.
+    """
+    started = time.perf_counter()
+    import main  # noqa: F401  (biaya impor yang dibayar sebelum render pertama)
+    ui_ready_ms = (time.perf_counter() - started) * 1000
+
+    from warmup import DEFAULT_STEPS, Warmup
+    workdir = tempfile.mkdtemp(prefix="amia-startup-")
+    os.environ.setdefault("AMIA_TELEMETRY_DIR", os.path.join(workdir, "telemetry"))
+
+    def fake_retriever(_warmup):
+        import pandas as pd
+        from benchmarks.fakes import FakeHashEmbeddings, FakeTranslateClient, FakeWebServer, ScriptedChatModel, install_fake_services
+        from benchmarks.run_benchmarks import DATA_CSV, base_vectors, make_retriever
+        web_server = FakeWebServer()
+        install_fake_services(ScriptedChatModel(), web_server, FakeTranslateClient())
+        embeddings = FakeHashEmbeddings()
+        csv_path = os.path.join(ROOT, DATA_CSV)
+        return make_retriever(workdir, csv_path, base_vectors(pd.read_csv(csv_path).fillna(""), embeddings), embeddings)
+
+    warmup = Warmup([("retriever", fake_retriever)] + [step for step in DEFAULT_STEPS if step[0] != "retriever"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        if warmup_enabled:
+            warmup.start()
+        time.sleep(think_ms / 1000)
+        asked = time.perf_counter()
+        retriever = warmup.result("retriever")
+        from agent_factory import run_agent_turn
+        from token_budget_memory import create_session_memory
+        response, _ = run_agent_turn(question, retriever, create_session_memory())
+    answered = time.perf_counter()
+    return {
+        'ui_ready_ms': round(ui_ready_ms, 1),
+        'first_answer_ms': round((answered - asked) * 1000, 1),
+        'time_to_first_answer_ms': round((answered - started) * 1000, 1),
+        'warmup_ready_when_asked': warmup.status()['steps'] if warmup_enabled else None,
+        'answered': bool(response),
+    }
+
+
+def run_first_answer(warmup_enabled: bool, think_ms: float, question: str) -> Dict:
+    command = [sys.executable, "-m", "benchmarks.profile_startup", "--child", "--think-ms", str(think_ms),
+               "--question", question] + (["--warmup"] if warmup_enabled else [])
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profil startup AMIA: waktu impor per modul dan waktu jawaban pertama.")
+    parser.add_argument("--modules", nargs="+", default=["main"], help="Modul yang diprofil waktu impornya.")
+    parser.add_argument("--top", type=int, default=15, help="Jumlah paket terbesar yang ditampilkan.")
+    parser.add_argument("--think-ms", type=float, default=3000, help="Jeda antara UI siap dan pertanyaan pertama.")
+    parser.add_argument("--question", default=FIRST_QUESTION)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--warmup", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(first_answer(args.warmup, args.think_ms, args.question)))
+        return
+
+    output = {'imports': {module: import_profile(module, args.top) for module in args.modules}}
+    output['first_answer'] = {mode: run_first_answer(mode == "warmup", args.think_ms, args.question)
+                              for mode in ("cold", "warmup")}
+    print(json.dumps(output, indent=2))
+    for module, profile in output['imports'].items():
+        verdict = "dalam anggaran" if profile['within_budget'] else "MELEBIHI anggaran"
+        print(f"Impor {module}: {profile['total_ms']:.0f} ms ({verdict} {profile['budget_ms']:.0f} ms)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+# Berisi harness benchmark utama tanpa layanan eksternal (embedding, LLM, web, dan terjemahan palsu).
+# Skenario: latensi per tool, throughput retrieval pada dataset sintetis 10k-1M baris,
+# throughput ekstraksi PDF, latensi end-to-end satu giliran agent, hit rate cache jawaban, router intent,
+# dan eksekusi tool paralel. Hasil ditulis ke JSON.
+#
+# Contoh: python -m benchmarks.run_benchmarks --sizes 10000 100000 --output hasil.json --compare sebelumnya.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import faiss
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_pdf_extraction import make_synthetic_pdf
+from benchmarks.fakes import (DEFAULT_SCRIPT, FakeHashEmbeddings, FakeTranslateClient, FakeWebServer,
+                              ScriptedChatModel, install_fake_services)
+from index_manifest import build_combined_texts
+
+DATA_CSV = os.path.join("data", "Penyebab Kematian di Indonesia yang Dilaporkan - Clean.csv")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+TOOL_INPUTS = {
+    'pencarian_dan_rangkuman_internet': ["tips kesehatan kulit", "cara mencegah demam berdarah", "gejala tifus"],
+    'cari_info_dari_database_kesehatan': ["Demam Berdarah Dengue", "kecelakaan di jalan raya", "penyakit paru menular"],
+    'analisis_tren_statistik_penyakit': ["tbc", "Banjir", "demam berdarah"],
+    'cari_penyebab_kematian_tertinggi_atau_terendah_per_tahun': ["tertinggi 2010", "terendah 2015", "tertinggi 2021"],
+    'beri_rekomendasi_terkait_penyebab_kematian': ["banjir", "penyakit menular", "konflik sosial"],
+    'terjemah_istilah_medis': ["demam to en", "nyeri sendi; kaku leher to en", "headache to indonesia"],
+}
+EXACT_QUERIES = ["Banjir", "Demam Berdarah Dengue", "Tuberkulosis", "Gempa Bumi", "Malaria"]
+# Pertanyaan berlabel untuk skenario router: intent yang diharapkan (None = harus diteruskan ke agent)
+ROUTER_QUESTIONS = {
+    "penyebab kematian tertinggi tahun 2015": "extreme",
+    "apa penyebab kematian paling sedikit di 2010?": "extreme",
+    "kematian terbanyak 2021": "extreme",
+    "penyebab tertinggi 2010": "extreme",
+    "analisis tren AIDS": "trend",
+    "tren tbc": "trend",
+    "tren demam berdarah": "trend",
+    "perkembangan kematian akibat malaria": "trend",
+    "tren tuberkulosiss": "trend",
+    "kematian tertinggi akibat banjir 2010": None,
+    "tren banjir 2010 sampai 2015": None,
+    "bagaimana cara mencegah tbc": None,
+    "rekomendasi banjir": None,
+    "penyebab kematian tertinggi tahun 2015 di jawa barat": None,
+    "info demam berdarah": None,
+    "tips kulit sehat": None,
+    "halo": None,
+}
+FREE_QUERIES = ["penyakit menular di daerah tropis", "kecelakaan di jalan raya", "bencana karena cuaca ekstrem",
+                "infeksi saluran pernapasan pada anak", "kematian ibu saat melahirkan"]
+
+
+def summarize_samples(samples_ms: List[float]) -> Dict[str, float]:
+    values = np.array(samples_ms, dtype="float64")
+    if not values.size:
+        # Mis. kelompok "hit" skenario cache pada --rounds 1 (putaran pertama selalu miss)
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p90_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'count': int(values.size),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p90_ms': round(float(np.percentile(values, 90)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def timed(fn: Callable, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def build_index(vectors: np.ndarray, index_path: str, batch_size: int = 50000) -> None:
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    for start in range(0, len(vectors), batch_size):
+        index.add(np.ascontiguousarray(vectors[start:start + batch_size], dtype="float32"))
+    faiss.write_index(index, index_path)
+
+
+def make_retriever(workdir: str, csv_path: str, vectors: np.ndarray, embeddings: FakeHashEmbeddings):
+    from retriever import FaissRetriever
+    index_path = os.path.join(workdir, os.path.basename(csv_path) + ".idx")
+    build_index(vectors, index_path)
+    return FaissRetriever(csv_path=csv_path, index_path=index_path, cache_dir=os.path.join(workdir, "embedding_cache"),
+                          embedding_model=embeddings)
+
+
+def base_vectors(df: pd.DataFrame, embeddings: FakeHashEmbeddings) -> np.ndarray:
+    return np.array(embeddings.embed_documents(build_combined_texts(df)), dtype="float32")
+
+
+def synthesize_dataset(df: pd.DataFrame, vectors: np.ndarray, size: int, seed: int = 0):
+    """Memperbanyak baris asli menjadi `size` baris (nama wilayah & tahun acak) beserta vektor berderau."""
+    rng = np.random.default_rng(seed)
+    source_rows = rng.integers(0, len(df), size)
+    synthetic = df.iloc[source_rows].reset_index(drop=True)
+    synthetic['Cause'] = synthetic['Cause'].astype(str) + " Wilayah " + (np.arange(size) % 500).astype(str)
+    synthetic['Year'] = rng.integers(2000, 2023, size)
+    synthetic['Total Deaths'] = rng.integers(0, 5000, size)
+    synthetic_vectors = np.empty((size, vectors.shape[1]), dtype="float32")
+    for start in range(0, size, 50000):
+        end = min(start + 50000, size)
+        block = vectors[source_rows[start:end]] + 0.05 * rng.standard_normal((end - start, vectors.shape[1]), dtype="float32")
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        synthetic_vectors[start:end] = block
+    return synthetic, synthetic_vectors
+
+
+# --- Skenario ---
+def scenario_tools(retriever, iterations: int) -> Dict:
+    from agent_factory import build_tools
+    results = {}
+    for tool in build_tools(retriever):
+        inputs = TOOL_INPUTS.get(tool.name, ["uji"])
+        first_ms = timed(tool.func, inputs[0])
+        samples = [timed(tool.func, inputs[i % len(inputs)]) for i in range(iterations)]
+        results[tool.name] = dict(summarize_samples(samples), first_ms=round(first_ms, 3))
+    return results
+
+
+def scenario_retrieval(df: pd.DataFrame, vectors: np.ndarray, embeddings: FakeHashEmbeddings, sizes: List[int],
+                       queries: int, workdir: str) -> Dict:
+    results = {}
+    for size in sizes:
+        synthetic, synthetic_vectors = synthesize_dataset(df, vectors, size)
+        csv_path = os.path.join(workdir, f"synthetic_{size}.csv")
+        synthetic.to_csv(csv_path, index=False)
+        started = time.perf_counter()
+        retriever = make_retriever(workdir, csv_path, synthetic_vectors, embeddings)
+        load_ms = (time.perf_counter() - started) * 1000
+        del synthetic_vectors
+
+        exact = [timed(retriever.get_relevant, EXACT_QUERIES[i % len(EXACT_QUERIES)]) for i in range(queries)]
+        # Query unik agar cache embedding tidak terpakai (jalur vektor/hibrida penuh)
+        free = [timed(retriever.get_relevant, f"{FREE_QUERIES[i % len(FREE_QUERIES)]} varian{i}") for i in range(queries)]
+        filtered = [timed(lambda q: retriever.get_relevant(q, year_range=(2010, 2012), types=["Bencana Alam"]),
+                          f"{FREE_QUERIES[i % len(FREE_QUERIES)]} saring{i}") for i in range(queries)]
+        results[str(size)] = {
+            'rows': size,
+            'build_and_load_ms': round(load_ms, 1),
+            'exact': dict(summarize_samples(exact), qps=round(1000 * len(exact) / sum(exact), 1)),
+            'free_text': dict(summarize_samples(free), qps=round(1000 * len(free) / sum(free), 1)),
+            'filtered': dict(summarize_samples(filtered), qps=round(1000 * len(filtered) / sum(filtered), 1)),
+            'record_store_mb': round(retriever.records.memory_bytes() / 2 ** 20, 2),
+            'dataframe_mb': round(synthetic.memory_usage(deep=True).sum() / 2 ** 20, 2),
+        }
+        print(f"  retrieval {size} baris: exact p50 {results[str(size)]['exact']['p50_ms']} ms, "
+              f"teks bebas p50 {results[str(size)]['free_text']['p50_ms']} ms, "
+              f"terfilter p50 {results[str(size)]['filtered']['p50_ms']} ms")
+        del retriever
+    return results
+
+
+def scenario_pdf(page_counts: List[int]) -> Dict:
+    import medical_document_processor as mdp
+    results = {}
+    for pages in page_counts:
+        pdf_bytes = make_synthetic_pdf(pages)
+        serial_ms = timed(lambda: mdp.extract_medical_document(pdf_bytes, parallel=False, use_cache=False))
+        parallel_ms = timed(lambda: mdp.extract_medical_document(pdf_bytes, parallel=True, use_cache=False))
+        mdp.extract_medical_document(pdf_bytes)
+        cached_ms = timed(lambda: mdp.extract_medical_document(pdf_bytes))
+        results[str(pages)] = {
+            'pages': pages,
+            'serial_ms': round(serial_ms, 1),
+            'parallel_ms': round(parallel_ms, 1),
+            'cached_ms': round(cached_ms, 3),
+            'serial_pages_per_s': round(pages * 1000 / serial_ms, 1),
+            'parallel_pages_per_s': round(pages * 1000 / parallel_ms, 1),
+        }
+    return results
+
+
+def scenario_turns(retriever, rounds: int) -> Dict:
+    from agent_factory import run_agent_turn
+    from answer_cache import get_answer_cache
+    from token_budget_memory import TokenBudgetMemory
+    answer_cache = get_answer_cache(retriever)
+    samples: Dict[str, List[float]] = {question: [] for question in DEFAULT_SCRIPT}
+    for _ in range(rounds):
+        memory = TokenBudgetMemory()
+        for question in DEFAULT_SCRIPT:
+            # Skenario ini mengukur giliran agent penuh; cache jawaban diukur di skenario "cache"
+            if answer_cache is not None:
+                answer_cache.clear()
+            # Keluaran verbose agent tidak relevan untuk pengukuran
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples[question].append(timed(run_agent_turn, question, retriever, memory))
+    all_samples = [sample for values in samples.values() for sample in values]
+    return {'all': summarize_samples(all_samples), 'per_question': {q: summarize_samples(v) for q, v in samples.items()}}
+
+
+def scenario_cache(retriever, rounds: int) -> Dict:
+    """
+    Pertanyaan berskrip diulang beberapa putaran dengan variasi penulisan (huruf besar, tanda baca,
+    urutan kata) seperti pengguna berbeda menanyakan hal yang sama. Melaporkan hit rate cache jawaban
+    serta latensi giliran yang dijawab cache dibanding yang menjalankan agent.
+    """
+    from agent_factory import run_agent_turn
+    from answer_cache import get_answer_cache
+    from token_budget_memory import TokenBudgetMemory
+    answer_cache = get_answer_cache(retriever)
+    if answer_cache is None:
+        return {}
+    answer_cache.clear()
+    saved_before = answer_cache.stats['saved_ms']
+    variants = [lambda q: q, lambda q: q.upper() + "?", lambda q: " ".join(reversed(q.split())), lambda q: f"{q}!!"]
+    hits: List[float] = []
+    misses: List[float] = []
+    for round_number in range(rounds):
+        memory = TokenBudgetMemory()
+        for question in DEFAULT_SCRIPT:
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                _, timings = run_agent_turn(variants[round_number % len(variants)](question), retriever, memory)
+            (hits if 'cache' in timings else misses).append((time.perf_counter() - started) * 1000)
+    return {'hit': summarize_samples(hits), 'miss': summarize_samples(misses),
+            'hit_rate': round(len(hits) / (len(hits) + len(misses)), 3),
+            'saved_ms': round(answer_cache.stats['saved_ms'] - saved_before, 2), 'entries': answer_cache.summary()['entries']}
+
+
+
+def scenario_router(retriever, rounds: int) -> Dict:
+    """
+    Ketepatan router intent pada pertanyaan berlabel (routing salah lebih buruk daripada fallback),
+    porsi pertanyaan yang dijawab tanpa LLM, dan latensi giliran yang di-routing dibanding lewat agent.
+    """
+    from agent_factory import run_agent_turn
+    from answer_cache import get_answer_cache
+    from intent_router import IntentRouter
+    from token_budget_memory import TokenBudgetMemory
+    router = IntentRouter(retriever)
+    decisions = {question: router.classify(question) for question in ROUTER_QUESTIONS}
+    wrong = [question for question, decision in decisions.items()
+             if decision.routed and decision.intent != ROUTER_QUESTIONS[question]]
+    missed = [question for question, decision in decisions.items()
+              if not decision.routed and ROUTER_QUESTIONS[question] is not None]
+    answer_cache = get_answer_cache(retriever)
+    routed: List[float] = []
+    agent: List[float] = []
+    for _ in range(rounds):
+        memory = TokenBudgetMemory()
+        for question in ROUTER_QUESTIONS:
+            if answer_cache is not None:
+                answer_cache.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                _, timings = run_agent_turn(question, retriever, memory)
+            (routed if 'router' in timings else agent).append((time.perf_counter() - started) * 1000)
+    return {'routed_share': round(sum(d.routed for d in decisions.values()) / len(decisions), 3),
+            'wrong_intent': wrong, 'missed': missed, 'routed': summarize_samples(routed), 'agent': summarize_samples(agent)}
+
+
+
+def scenario_parallel(retriever, rounds: int) -> Dict:
+    """
+    Pertanyaan multi-bagian (info + rekomendasi untuk sub-query yang sama, tren, dan pencarian web):
+    jalur lama menjalankan tool satu per satu tanpa berbagi retrieval, jalur baru menjalankannya
+    bersamaan dengan cache retrieval giliran. Query diberi penanda putaran agar cache lintas putaran
+    (embedding, web) tidak ikut menghemat waktu.
+    """
+    from agent_factory import build_tools
+    from parallel_tools import run_tool_calls, turn_retrieval_scope
+    tools = {tool.name: tool.func for tool in build_tools(retriever)}
+    samples: Dict[str, List[float]] = {'sequential': [], 'parallel': []}
+    shared = 0
+    for round_number in range(rounds):
+        for mode in ('sequential', 'parallel'):
+            tag = f"{mode} {round_number}"
+            calls = [('cari_info_dari_database_kesehatan', f"penyakit paru menular {tag}"),
+                     ('beri_rekomendasi_terkait_penyebab_kematian', f"penyakit paru menular {tag}"),
+                     ('analisis_tren_statistik_penyakit', "tbc"),
+                     ('pencarian_dan_rangkuman_internet', f"tips kesehatan paru {tag}")]
+            with contextlib.redirect_stdout(io.StringIO()):
+                if mode == 'sequential':
+                    _, report = run_tool_calls(calls, tools, parallel=False)
+                else:
+                    with turn_retrieval_scope(retriever) as retrieval_cache:
+                        _, report = run_tool_calls(calls, tools, parallel=True)
+                    shared += retrieval_cache.stats['shared']
+            samples[mode].append(report['wall_ms'])
+    sequential, parallel = summarize_samples(samples['sequential']), summarize_samples(samples['parallel'])
+    return {'sequential': sequential, 'parallel': parallel, 'shared_retrievals': shared,
+            'saved_p50_ms': round(sequential['p50_ms'] - parallel['p50_ms'], 3)}
+
+
+# --- Hasil ---
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and key.endswith(('p50_ms', 'p99_ms', 'qps', 'pages_per_s')):
+            flat[path] = value
+    return flat
+
+
+def compare(current: Dict, previous_path: str) -> None:
+    with open(previous_path, encoding="utf-8") as f:
+        previous = flatten(json.load(f)['scenarios'])
+    print(f"\nPerbandingan dengan {previous_path}:")
+    for path, value in flatten(current).items():
+        if path in previous and previous[path]:
+            change = 100.0 * (value - previous[path]) / previous[path]
+            print(f"  {path:<90} {previous[path]:>10} -> {value:>10} ({change:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Harness benchmark AMIA dengan layanan palsu.")
+    parser.add_argument("--scenarios", nargs="+", default=["tools", "retrieval", "pdf", "turns", "cache", "router", "parallel"],
+                        choices=["tools", "retrieval", "pdf", "turns", "cache", "router", "parallel"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000],
+                        help="Ukuran dataset sintetis untuk skenario retrieval (hingga 1000000; butuh ~4 GB RAM).")
+    parser.add_argument("--iterations", type=int, default=50, help="Panggilan per tool.")
+    parser.add_argument("--queries", type=int, default=200, help="Query per jenis per ukuran dataset.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300])
+    parser.add_argument("--rounds", type=int, default=5, help="Putaran percakapan untuk skenario turns.")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="File JSON hasil sebelumnya untuk dibandingkan.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="amia-bench-")
+    os.environ.setdefault("AMIA_TELEMETRY_DIR", os.path.join(workdir, "telemetry"))
+    embeddings = FakeHashEmbeddings(latency_ms=args.embedding_latency_ms)
+    chat_model = ScriptedChatModel(latency_ms=args.llm_latency_ms)
+    df = pd.read_csv(DATA_CSV).fillna("")
+    vectors = base_vectors(df, embeddings)
+
+    scenarios = {}
+    with FakeWebServer() as web_server:
+        install_fake_services(chat_model, web_server, FakeTranslateClient())
+        retriever = None
+        if {"tools", "turns", "cache", "router", "parallel"} & set(args.scenarios):
+            retriever = make_retriever(workdir, DATA_CSV, vectors, embeddings)
+        if "tools" in args.scenarios:
+            print("Skenario: latensi per tool")
+            with contextlib.redirect_stdout(io.StringIO()):
+                scenarios['tools'] = scenario_tools(retriever, args.iterations)
+        if "retrieval" in args.scenarios:
+            print("Skenario: throughput retrieval")
+            scenarios['retrieval'] = scenario_retrieval(df, vectors, embeddings, args.sizes, args.queries, workdir)
+        if "pdf" in args.scenarios:
+            print("Skenario: ekstraksi PDF")
+            scenarios['pdf'] = scenario_pdf(args.pages)
+        if "turns" in args.scenarios:
+            print("Skenario: giliran agent end-to-end")
+            scenarios['turns'] = scenario_turns(retriever, args.rounds)
+        if "cache" in args.scenarios:
+            print("Skenario: cache jawaban semantik")
+            scenarios['cache'] = scenario_cache(retriever, args.rounds)
+        if "router" in args.scenarios:
+            print("Skenario: router intent")
+            scenarios['router'] = scenario_router(retriever, args.rounds)
+        if "parallel" in args.scenarios:
+            print("Skenario: tool paralel")
+            scenarios['parallel'] = scenario_parallel(retriever, args.rounds)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args),
+        },
+        'scenarios': scenarios,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(json.dumps(flatten(scenarios), indent=2))
+    print(f"Hasil disimpan ke {output}")
+    if args.compare:
+        compare(scenarios, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Berisi struktur cache in-process sederhana yang dipakai bersama oleh beberapa modul.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    Cache LRU (Least Recently Used) yang aman dipakai dari banyak thread.
+    Entri yang paling lama tidak diakses akan dibuang saat kapasitas penuh.
+    """
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> list:
+        """Salinan isi cache, dari yang paling lama tidak diakses."""
+        with self._lock:
+            return list(self._data.items())
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """
+    Cache LRU yang entrinya kedaluwarsa setelah `ttl_seconds`. Entri kedaluwarsa
+    dianggap tidak ada dan dibuang saat diakses.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600, clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(max_size)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        super().put(key, (self.clock() + self.ttl_seconds, value))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = super().pop(key, None)
+        return default if entry is None or entry[0] <= self.clock() else entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+_MISSING = object()
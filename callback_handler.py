@@ -1,34 +1,158 @@
-# berisi fungsi untuk menghitung token dan biaya penggunaan LLM Gemini.
+# berisi callback handler untuk menghitung token, biaya, dan latensi penggunaan LLM Gemini
+# serta tool agent, dalam bentuk span telemetri per giliran (lihat telemetry.py).
+
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from uuid import UUID
 
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.outputs import LLMResult
-from typing import Any, Dict, List
-import tiktoken
-import streamlit as st
+
+from telemetry import new_span
+from token_utils import count_tokens
+
+# Tool AMIA melaporkan kegagalan sebagai teks observasi (bukan exception). Hanya penanda eksplisit dan awalan
+# pesan galat persis milik tool yang dikenali (di awal baris, karena observasi paralel digabung per baris),
+# agar jawaban biasa yang kebetulan memuat frasa seperti "tidak valid" tidak dianggap galat.
+TOOL_ERROR_PREFIXES = (
+    "Error:",
+    "Terjadi kesalahan saat mencari dan merangkum dari internet:",
+    "Gagal menerjemahkan:",
+    "Format tidak valid. Gunakan format:",
+    "Query tidak valid. Gunakan tool ini",
+    "Input jalankan_beberapa_tool_paralel tidak valid:",
+)
+TOOL_ERROR_PATTERN = re.compile(r"<<SOURCE:Error>>|^[ \t]*(?:" + "|".join(map(re.escape, TOOL_ERROR_PREFIXES)) + ")",
+                                re.MULTILINE)
+
+
+def _usage_from_response(response: LLMResult) -> Optional[Dict[str, int]]:
+    """Mengambil jumlah token dari metadata penggunaan yang dikirim provider, jika ada."""
+    input_tokens = output_tokens = 0
+    found = False
+    for generation_list in response.generations:
+        for generation in generation_list:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+                found = True
+    if not found:
+        token_usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage_metadata")
+        if token_usage:
+            input_tokens = token_usage.get("prompt_tokens", token_usage.get("input_tokens", 0))
+            output_tokens = token_usage.get("completion_tokens", token_usage.get("output_tokens", 0))
+            found = True
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens} if found else None
+
 
 class GeminiCallbackHandler(BaseCallbackHandler):
-    def __init__(self) -> None:
+    """
+    Mencatat satu giliran agent sebagai kumpulan span: satu span per panggilan LLM dan per tool.
+    Token diambil dari usage metadata respons Gemini; jika tidak ada, diestimasi dengan encoder
+    tiktoken yang di-cache (token_utils). `total_tokens` dan `total_cost` tetap tersedia.
+    """
+
+    def __init__(self, turn_id: str = None, input_price_per_million_tokens: float = 0.35,
+                 output_price_per_million_tokens: float = 1.05) -> None:
         super().__init__()
+        self.turn_id = turn_id or uuid.uuid4().hex[:12]
+        self.input_price_per_million_tokens = input_price_per_million_tokens
+        self.output_price_per_million_tokens = output_price_per_million_tokens
         self.total_tokens = 0
-        self.total_cost = 0
-        self.input_price_per_million_tokens = 0.35 
-        self.output_price_per_million_tokens = 1.05
-    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
-        try:
-            encoding = tiktoken.get_encoding("cl100k_base")
-            for prompt in prompts:
-                tokens = len(encoding.encode(prompt))
-                self.total_tokens += tokens
-                self.total_cost += (tokens / 1_000_000) * self.input_price_per_million_tokens
-        except Exception:
-            pass
-    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
-        try:
-            encoding = tiktoken.get_encoding("cl100k_base")
-            for generation_list in response.generations:
-                for generation in generation_list:
-                    tokens = len(encoding.encode(generation.text))
-                    self.total_tokens += tokens
-                    self.total_cost += (tokens / 1_000_000) * self.output_price_per_million_tokens
-        except Exception:
-            pass
\ No newline at end of file
+        self.total_cost = 0.0
+        self.spans: List[Dict] = []
+        self.started_at = time.perf_counter()
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+
+    # --- Panggilan LLM ---
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, prompts)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs: Any) -> None:
+        prompts = ["\n".join(str(message.content) for message in batch) for batch in messages]
+        self._start_llm(serialized, run_id, prompts)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, chunk=None, **kwargs: Any) -> None:
+        # Saat streaming, setiap potongan membawa usage kumulatif; yang terakhir dipakai.
+        usage = getattr(getattr(chunk, "message", None), "usage_metadata", None)
+        if usage and run_id in self._runs:
+            self._runs[run_id]["stream_usage"] = usage
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        usage = run.get("stream_usage") or _usage_from_response(response)
+        if usage:
+            input_tokens, output_tokens, token_source = usage.get("input_tokens", 0), usage.get("output_tokens", 0), "usage"
+        else:
+            # Estimasi hanya dilakukan jika provider tidak mengirim usage metadata
+            input_tokens = sum(count_tokens(prompt) for prompt in run["prompts"])
+            output_tokens = sum(count_tokens(g.text) for generations in response.generations for g in generations)
+            token_source = "estimate"
+        self._finish_llm(run, input_tokens, output_tokens, token_source)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            self._finish_llm(run, 0, 0, "none", error=repr(error))
+
+    # --- Tool ---
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._runs[run_id] = {"name": (serialized or {}).get("name") or kwargs.get("name") or "tool",
+                              "started_at": time.perf_counter(), "input_chars": len(input_str or "")}
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            fields = {"input_chars": run["input_chars"], "output_chars": len(str(output))}
+            if TOOL_ERROR_PATTERN.search(str(output)):
+                fields["error"] = "tool_output"
+            self._add_span("tool", run["name"], run["started_at"], **fields)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            self._add_span("tool", run["name"], run["started_at"], input_chars=run["input_chars"], error=repr(error))
+
+    # --- Span ---
+    def _start_llm(self, serialized: Dict[str, Any], run_id: UUID, prompts: List[str]) -> None:
+        kwargs = (serialized or {}).get("kwargs", {})
+        name = kwargs.get("model") or kwargs.get("model_name") or (serialized or {}).get("name") or "llm"
+        self._runs[run_id] = {"name": str(name).replace("models/", ""), "started_at": time.perf_counter(), "prompts": prompts}
+
+    def _finish_llm(self, run: Dict[str, Any], input_tokens: int, output_tokens: int, token_source: str, error: str = None) -> None:
+        cost = (input_tokens / 1_000_000) * self.input_price_per_million_tokens \
+            + (output_tokens / 1_000_000) * self.output_price_per_million_tokens
+        self.total_tokens += input_tokens + output_tokens
+        self.total_cost += cost
+        fields = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                  "cost_usd": round(cost, 8), "token_source": token_source}
+        if error:
+            fields["error"] = error
+        self._add_span("llm", run["name"], run["started_at"], **fields)
+
+    def _add_span(self, kind: str, name: str, started_at: float, **fields) -> None:
+        self.spans.append(new_span(kind, name, self.turn_id, started_at, **fields))
+
+    def tool_errors(self) -> int:
+        """Jumlah panggilan tool yang gagal (exception atau teks kegagalan) di giliran ini."""
+        return sum(1 for span in self.spans if span["kind"] == "tool" and span.get("error"))
+
+    def turn_span(self, name: str = "agent_turn", **fields) -> Dict:
+        """Span ringkasan satu giliran: total token, biaya, dan jumlah panggilan LLM/tool."""
+        llm_spans = [span for span in self.spans if span["kind"] == "llm"]
+        return new_span(
+            "turn", name, self.turn_id, self.started_at,
+            input_tokens=sum(span["input_tokens"] for span in llm_spans),
+            output_tokens=sum(span["output_tokens"] for span in llm_spans),
+            cost_usd=round(self.total_cost, 8),
+            llm_calls=len(llm_spans),
+            tool_calls=sum(1 for span in self.spans if span["kind"] == "tool"),
+            llm_ms=round(sum(span["duration_ms"] for span in llm_spans), 2),
+            tool_ms=round(sum(span["duration_ms"] for span in self.spans if span["kind"] == "tool"), 2),
+            **fields,
+        )
@@ -0,0 +1,23 @@
+# Berisi fungsi bantu untuk membaca konfigurasi/API key dari Streamlit Secrets atau file .env.
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def get_secret(name: str, default: str = None) -> str:
+    """
+    Mengambil nilai rahasia dari st.secrets (Streamlit Cloud) jika tersedia,
+    lalu dari environment variable / file .env (lokal).
+    """
+    try:
+        import streamlit as st
+        value = st.secrets.get(name)
+        if value:
+            return value
+    except Exception:
+        # st.secrets melempar error jika tidak ada secrets.toml (misal saat berjalan lokal)
+        pass
+    return os.getenv(name, default)
@@ -1,46 +1,220 @@
-# File ini digunakan untuk membuat indeks FAISS dari dataset lokal
+# File ini digunakan untuk membuat (dan memperbarui secara inkremental) indeks FAISS dari dataset lokal.
+# Tipe index (flat, flat_fp16, ivf_flat, hnsw, ivf_pq) dan metrik (l2/ip) dapat dipilih, lihat index_factory.py.
+import argparse
 import os
+import time
 import pandas as pd
 import numpy as np
 import faiss
 from dotenv import load_dotenv
 from langchain_community.embeddings import CohereEmbeddings
 
+from index_factory import (INDEX_TYPES, METRICS, TRAINED_TYPES, convert_index, create_empty_index, describe_index,
+                           describe_index_spec, make_spec, manifest_index_spec, prepare_vectors, remove_vectors, resolve_params,
+                           same_structure, stored_ids)
+from index_manifest import (build_combined_texts, load_manifest, manifest_path_for,
+                            new_manifest, row_hash, save_manifest)
 
-def create_faiss_index():
+CSV_PATH = 'data/Penyebab Kematian di Indonesia yang Dilaporkan - Clean.csv'
+INDEX_PATH = 'data/faiss_index.idx'
+EMBEDDING_MODEL_NAME = "embed-multilingual-v3.0"
+# Batas jumlah teks per panggilan embed Cohere
+DEFAULT_BATCH_SIZE = 96
+
+
+def write_index_atomic(index, index_path: str) -> None:
+    tmp_path = index_path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+
+
+def load_or_migrate_index(index_path: str, manifest: dict, texts: list):
+    """
+    Memuat index ber-ID (IndexIDMap2 atau IVF). Index lama (IndexFlatL2 tanpa manifest) dimigrasikan
+    dengan ID = posisi baris, tanpa embedding ulang, selama jumlah vektornya sama dengan CSV.
+    """
+    if not os.path.exists(index_path):
+        return None, new_manifest(manifest["model"]), False
+    index = faiss.read_index(index_path)
+    has_ids = isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF))
+    if has_ids and manifest["rows"]:
+        return index, manifest, False
+    if has_ids:
+        print("Index ber-ID ditemukan tanpa manifest, index dibangun ulang.")
+        return None, new_manifest(manifest["model"]), False
+
+    if index.ntotal != len(texts):
+        print(f"Index lama berisi {index.ntotal} vektor, CSV berisi {len(texts)} baris. Index dibangun ulang.")
+        return None, new_manifest(manifest["model"]), False
+    print("Migrasi index lama ke index ber-ID (tanpa embedding ulang)...")
+    vectors = index.reconstruct_n(0, index.ntotal)
+    id_index = faiss.IndexIDMap2(faiss.IndexFlatL2(index.d))
+    manifest = new_manifest(manifest["model"], index.d)
+    ids = []
+    for position, text in enumerate(texts):
+        h = row_hash(text)
+        if h not in manifest["rows"]:
+            manifest["rows"][h] = position
+            ids.append(position)
+    id_index.add_with_ids(vectors[ids], np.array(ids, dtype='int64'))
+    manifest["next_id"] = len(texts)
+    return id_index, manifest, True
+
+
+def requested_spec(current: dict, index_type: str = None, metric: str = None, **params) -> dict:
+    """Spesifikasi tujuan: argumen yang diberikan menimpa spesifikasi index yang sudah ada."""
+    index_type = index_type or current["index_type"]
+    if index_type == current["index_type"]:
+        params = {**current["params"], **{key: value for key, value in params.items() if value is not None}}
+    return make_spec(index_type, metric or current["metric"], **params)
+
+
+def create_faiss_index(csv_path: str = CSV_PATH, index_path: str = INDEX_PATH, batch_size: int = DEFAULT_BATCH_SIZE,
+                       index_type: str = None, metric: str = None, **index_params):
+    """
+    `index_type`/`metric`/`index_params` (nlist, nprobe, hnsw_m, ef_construction, ef_search, pq_m, pq_nbits)
+    yang kosong mengikuti spesifikasi di manifest. Jika spesifikasi berubah, index dikonversi tanpa embedding ulang.
+    """
     load_dotenv()
-    csv_path = 'data/Penyebab Kematian di Indonesia yang Dilaporkan - Clean.csv'
-    index_path = 'data/faiss_index.idx'
-    
-    if os.path.exists(index_path):
-        print(f"Index sudah ada. Hapus file {index_path} jika ingin membuat ulang.")
-        return
-    
+    manifest_path = manifest_path_for(index_path)
+
     df = pd.read_csv(csv_path).fillna("")
-    df['combined'] = df.astype(str).agg(' '.join, axis=1)
-    texts = df['combined'].tolist()
-    
+    texts = build_combined_texts(df)
+
+    manifest = load_manifest(manifest_path)
+    if manifest is None or manifest.get("model") != EMBEDDING_MODEL_NAME:
+        manifest = new_manifest(EMBEDDING_MODEL_NAME)
+    index, manifest, dirty = load_or_migrate_index(index_path, manifest, texts)
+
+    # Spesifikasi index yang ada di disk saat ini dan spesifikasi yang diminta
+    current_spec = manifest_index_spec(manifest)
+    if index is not None and describe_index(index) != (current_spec["index_type"], current_spec["metric"]):
+        # Manifest tidak cocok dengan index di disk: parameter (hnsw_m, nlist, pq_m, ...) dibaca dari index
+        current_spec = describe_index_spec(index)
+    target_spec = requested_spec(current_spec, index_type, metric, **index_params)
+
+    # Teks unik yang dibutuhkan CSV saat ini, dalam urutan baris
+    wanted = {}
+    for text in texts:
+        wanted.setdefault(row_hash(text), text)
+
+    # Sinkronkan index dengan manifest: buang vektor yatim (checkpoint yang terputus) dan baris yang sudah dihapus dari CSV
+    removed_hashes = [h for h in manifest["rows"] if h not in wanted]
+    remove_ids = [manifest["rows"].pop(h) for h in removed_hashes]
+    if index is not None:
+        known_ids = set(manifest["rows"].values()) | set(remove_ids)
+        remove_ids += [int(i) for i in stored_ids(index) if int(i) not in known_ids]
+        if remove_ids:
+            index = remove_vectors(index, remove_ids, current_spec)
+            dirty = True
+
+    started_at = time.perf_counter()
+    pending = [(h, text) for h, text in wanted.items() if h not in manifest["rows"]]
+    reused = len(wanted) - len(pending)
+    print(f"{len(texts)} baris: {reused} dipakai ulang, {len(pending)} perlu di-embed, {len(removed_hashes)} dihapus.")
+
+    if pending:
+        index, n_batches, embed_seconds = embed_pending(pending, index, manifest, index_path, batch_size, current_spec, target_spec)
+        current_spec = manifest["index"]
+        dirty = False
+
+    # Konversi jika struktur index berbeda dari yang diminta; parameter pencarian cukup dicatat di manifest
+    if index is not None and not same_structure(current_spec, target_spec):
+        started = time.perf_counter()
+        index, current_spec = convert_index(index, current_spec, target_spec)
+        print(f"Index dikonversi ke {current_spec['index_type']} ({current_spec['metric']}) "
+              f"dalam {time.perf_counter() - started:.1f} detik, parameter: {current_spec['params']}")
+        dirty = True
+    elif index is not None:
+        current_spec = make_spec(current_spec["index_type"], current_spec["metric"],
+                                 **{**current_spec["params"], **target_spec["params"]})
+    if index is not None and manifest.get("index") != current_spec:
+        manifest["index"] = current_spec
+        dirty = True
+
+    if index is not None and dirty:
+        write_index_atomic(index, index_path)
+        save_manifest(manifest_path, manifest)
+    if not pending:
+        print(f"Index sudah up-to-date di {index_path}")
+        return
+
+    elapsed = time.perf_counter() - started_at
+    print(f"Index berhasil diperbarui di {index_path}")
+    print(f"Ringkasan: {len(pending)} baris baru di-embed dalam {n_batches} batch, {reused} dipakai ulang, "
+          f"{len(removed_hashes)} dihapus, total {index.ntotal} vektor. "
+          f"Throughput {len(pending) / max(embed_seconds, 1e-9):.1f} baris/detik, waktu total {elapsed:.1f} detik.")
+
+
+def embed_pending(pending: list, index, manifest: dict, index_path: str, batch_size: int, current_spec: dict, target_spec: dict):
+    """
+    Meng-embed baris baru per batch dengan checkpoint setelah setiap batch. Index baru untuk tipe yang
+    perlu dilatih (IVF) ditampung dulu di index flat lalu dikonversi setelah semua vektor tersedia.
+    Spesifikasi index yang ditulis dicatat di manifest["index"].
+    """
     # Hanya gunakan os.getenv karena file ini dijalankan lokal
     cohere_api_key = os.getenv('COHERE_API_KEY')
     if not cohere_api_key:
         raise ValueError("COHERE_API_KEY harus diset di file .env")
-    
+
     embedding_model = CohereEmbeddings(
         cohere_api_key=cohere_api_key,
-        model="embed-multilingual-v3.0",
+        model=EMBEDDING_MODEL_NAME,
         user_agent="medical-chatbot-agent"
     )
-    
+
     print("Membuat embeddings...")
-    vectors = embedding_model.embed_documents(texts)
-    
-    print("Membuat FAISS index...")
-    vector_dimension = len(vectors[0])
-    index = faiss.IndexFlatL2(vector_dimension)
-    index.add(np.array(vectors, dtype='float32'))
-    
-    faiss.write_index(index, index_path)
-    print(f"Index berhasil dibuat di {index_path}")
+    embed_seconds = 0.0
+    n_batches = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        t0 = time.perf_counter()
+        try:
+            vectors = np.array(embedding_model.embed_documents([text for _, text in batch]), dtype='float32')
+        except Exception:
+            print(f"Embedding gagal pada batch {n_batches + 1}. Progres sudah disimpan, jalankan ulang untuk melanjutkan.")
+            raise
+        embed_seconds += time.perf_counter() - t0
+
+        if index is None:
+            if target_spec["index_type"] in TRAINED_TYPES:
+                current_spec = make_spec("flat", target_spec["metric"])
+            else:
+                current_spec = resolve_params(target_spec, len(pending), vectors.shape[1])
+            index = create_empty_index(current_spec, vectors.shape[1])
+            manifest["dim"] = int(vectors.shape[1])
+        ids = np.arange(manifest["next_id"], manifest["next_id"] + len(batch), dtype='int64')
+        index.add_with_ids(prepare_vectors(vectors, current_spec), ids)
+        for (h, _), vector_id in zip(batch, ids):
+            manifest["rows"][h] = int(vector_id)
+        manifest["next_id"] += len(batch)
+        manifest["index"] = current_spec
+
+        # Checkpoint: index ditulis lebih dulu, lalu manifest, sehingga build yang terputus bisa dilanjutkan
+        write_index_atomic(index, index_path)
+        save_manifest(manifest_path_for(index_path), manifest)
+        n_batches += 1
+        done = min(start + batch_size, len(pending))
+        print(f"  Batch {n_batches}: {done}/{len(pending)} baris ({done / max(embed_seconds, 1e-9):.1f} baris/detik)")
+    return index, n_batches, embed_seconds
+
 
 if __name__ == '__main__':
-    create_faiss_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Membuat atau memperbarui index FAISS secara inkremental.")
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--index', default=INDEX_PATH)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default=None,
+                        help="Tipe index (default: sesuai manifest, atau flat untuk index baru).")
+    parser.add_argument('--metric', choices=list(METRICS), default=None, help="l2, atau ip untuk cosine.")
+    parser.add_argument('--nlist', type=int, default=None)
+    parser.add_argument('--nprobe', type=int, default=None)
+    parser.add_argument('--hnsw-m', type=int, default=None)
+    parser.add_argument('--ef-construction', type=int, default=None)
+    parser.add_argument('--ef-search', type=int, default=None)
+    parser.add_argument('--pq-m', type=int, default=None)
+    parser.add_argument('--pq-nbits', type=int, default=None)
+    args = parser.parse_args()
+    create_faiss_index(args.csv, args.index, args.batch_size, index_type=args.index_type, metric=args.metric,
+                       nlist=args.nlist, nprobe=args.nprobe, hnsw_m=args.hnsw_m, ef_construction=args.ef_construction,
+                       ef_search=args.ef_search, pq_m=args.pq_m, pq_nbits=args.pq_nbits)
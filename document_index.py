@@ -0,0 +1,197 @@
+# Berisi pemecahan dokumen PDF menjadi potongan (chunk) per halaman/bagian dan indeks vektor
+# in-memory per sesi, agar Mode Dokumen hanya menyisipkan potongan yang relevan ke prompt.
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from token_utils import count_tokens
+
+CHUNK_MAX_CHARS = 1200
+CHUNK_OVERLAP_CHARS = 150
+EMBED_BATCH_SIZE = 96
+DEFAULT_TOP_K = 8
+# Anggaran token untuk konteks dokumen per giliran (ringkasan + potongan)
+DEFAULT_TOKEN_BUDGET = 1500
+
+# Baris yang dianggap judul bagian: kata kunci rekam medis umum, atau baris pendek diakhiri titik dua / huruf kapital semua.
+SECTION_HEADER = re.compile(
+    r'^\s*(?:(?:diagnos[ai]s?|riwayat penyakit|anamnesis|keluhan(?: utama)?|pemeriksaan(?: fisik)?|obat(?:-obatan)?|terapi|'
+    r'hasil lab(?:oratorium)?|tanda vital|vital signs|rekomendasi|saran|identitas pasien|kesimpulan)\b.*'
+    r'|[^\n:]{2,60}:\s*|(?-i:[A-Z][A-Z0-9 /&.-]{3,60}))$',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+MEDICAL_INFO_LABELS = {
+    'diagnosa': 'Diagnosa', 'riwayat_penyakit': 'Riwayat Penyakit', 'obat_obatan': 'Obat-obatan',
+    'hasil_lab': 'Hasil Lab', 'vital_signs': 'Tanda Vital', 'rekomendasi': 'Rekomendasi',
+}
+
+
+def _split_long(text: str, max_chars: int, overlap: int) -> List[str]:
+    """Memecah teks panjang di batas kalimat/spasi, dengan sedikit tumpang tindih antar potongan."""
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            cut = max(text.rfind('. ', start, end), text.rfind('\n', start, end))
+            if cut <= start + max_chars // 2:
+                cut = text.rfind(' ', start, end)
+            if cut > start + max_chars // 2:
+                end = cut + 1
+        pieces.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [piece for piece in pieces if piece]
+
+
+def _split_sections(page_text: str) -> List[Tuple[str, str]]:
+    """Membagi teks satu halaman menjadi (judul bagian, isi) berdasarkan baris judul."""
+    sections = []
+    title, start = "", 0
+    for match in SECTION_HEADER.finditer(page_text):
+        body = page_text[start:match.start()]
+        if body.strip():
+            sections.append((title, body))
+        title, start = match.group(0).strip().rstrip(':')[:60], match.start()
+    body = page_text[start:]
+    if body.strip():
+        sections.append((title, body))
+    return sections
+
+
+def chunk_document(pages: List[Dict], max_chars: int = CHUNK_MAX_CHARS, overlap: int = CHUNK_OVERLAP_CHARS) -> List[Dict]:
+    """
+    Membuat potongan yang tidak melewati batas halaman. Di dalam satu halaman, bagian-bagian
+    pendek digabung sampai `max_chars`, dan bagian yang terlalu panjang dipecah dengan overlap.
+    """
+    chunks = []
+    for page in pages:
+        buffer, buffer_sections = "", []
+        for title, body in _split_sections(page['text']):
+            body = body.strip()
+            if len(buffer) + len(body) + 1 <= max_chars:
+                buffer = f"{buffer}\n{body}" if buffer else body
+                buffer_sections.append(title)
+                continue
+            if buffer:
+                chunks.append({'page': page['page'], 'section': ', '.join(t for t in buffer_sections if t), 'text': buffer})
+                buffer, buffer_sections = "", []
+            if len(body) <= max_chars:
+                buffer, buffer_sections = body, [title]
+            else:
+                for piece in _split_long(body, max_chars, overlap):
+                    chunks.append({'page': page['page'], 'section': title, 'text': piece})
+        if buffer:
+            chunks.append({'page': page['page'], 'section': ', '.join(t for t in buffer_sections if t), 'text': buffer})
+    for chunk_id, chunk in enumerate(chunks):
+        chunk['chunk_id'] = chunk_id
+        chunk['tokens'] = count_tokens(chunk['text'])
+    return chunks
+
+
+def format_medical_info(medical_info: Optional[Dict], max_items: int = 5) -> str:
+    """Ringkasan singkat hasil extract_medical_info_from_text untuk disisipkan ke prompt."""
+    lines = []
+    for key, label in MEDICAL_INFO_LABELS.items():
+        values = (medical_info or {}).get(key) or []
+        if values:
+            lines.append(f"- {label}: " + "; ".join(values[:max_items]))
+    return "\n".join(lines)
+
+
+class DocumentIndex:
+    """
+    Indeks vektor in-memory untuk satu dokumen yang diunggah. Potongan di-embed sekali saat
+    dokumen diproses; setiap giliran hanya query pengguna yang di-embed.
+    """
+
+    def __init__(self, chunks: List[Dict], embed_documents: Callable[[List[str]], List[List[float]]],
+                 embed_query: Callable[[str], List[float]], medical_info: Optional[Dict] = None,
+                 full_text: str = "") -> None:
+        self.chunks = chunks
+        self.embed_documents = embed_documents
+        self.embed_query = embed_query
+        self.summary = format_medical_info(medical_info)
+        self.full_text = full_text
+        self.full_text_tokens = count_tokens(full_text)
+        self.index = None
+
+    def ensure_index(self) -> None:
+        """Meng-embed semua potongan (sekali saja) dalam batch dan membangun indeks inner-product."""
+        if self.index is not None or not self.chunks:
+            return
+        vectors = []
+        texts = [chunk['text'] for chunk in self.chunks]
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            vectors.extend(self.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+        matrix = np.array(vectors, dtype='float32')
+        faiss.normalize_L2(matrix)
+        index = faiss.IndexFlatIP(matrix.shape[1])
+        index.add(matrix)
+        self.index = index
+
+    @classmethod
+    def from_document(cls, doc_info: Dict, retriever) -> "DocumentIndex":
+        """Membangun indeks dari hasil extract_medical_document memakai model embedding retriever."""
+        pages = doc_info.get('pages') or [{'page': 1, 'text': doc_info.get('full_text', '')}]
+        document_index = cls(
+            chunk_document(pages),
+            embed_documents=retriever.embedding_model.embed_documents,
+            # Query Mode Dokumen tidak disimpan ke cache embedding di disk (berisi data pasien)
+            embed_query=retriever.embedding_model.embed_query,
+            medical_info=doc_info.get('medical_info'),
+            full_text=doc_info.get('full_text', ''),
+        )
+        # Dokumen kecil disisipkan utuh sehingga tidak perlu di-embed sama sekali
+        if document_index.full_text_tokens > DEFAULT_TOKEN_BUDGET:
+            document_index.ensure_index()
+        return document_index
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> List[Tuple[Dict, float]]:
+        self.ensure_index()
+        if self.index is None:
+            return []
+        q_vec = np.array([self.embed_query(query)], dtype='float32')
+        faiss.normalize_L2(q_vec)
+        scores, indices = self.index.search(q_vec, min(k, len(self.chunks)))
+        return [(self.chunks[idx], float(score)) for idx, score in zip(indices[0], scores[0]) if idx >= 0]
+
+    def build_context(self, query: str, k: int = DEFAULT_TOP_K, token_budget: int = DEFAULT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+        """
+        Menyusun konteks dokumen untuk satu giliran: ringkasan info medis + potongan paling relevan
+        selama masih muat dalam `token_budget`. Dokumen yang lebih kecil dari anggaran disisipkan utuh.
+        Mengembalikan (konteks, metrik ukuran prompt dibanding teks lengkap).
+        """
+        if self.full_text_tokens <= token_budget:
+            context, chunks_used = self.full_text, len(self.chunks)
+        else:
+            parts = [f"RINGKASAN INFO MEDIS:\n{self.summary}"] if self.summary else []
+            used_tokens = count_tokens(parts[0]) if parts else 0
+            selected = []
+            # Potongan pertama (biasanya identitas pasien/kop dokumen) selalu diikutkan bila muat
+            candidates = [self.chunks[0]] + [chunk for chunk, _ in self.search(query, k) if chunk['chunk_id'] != 0]
+            for chunk in candidates:
+                if used_tokens + chunk['tokens'] > token_budget:
+                    continue
+                selected.append(chunk)
+                used_tokens += chunk['tokens']
+            # Urutkan sesuai posisi di dokumen agar alurnya tetap terbaca
+            for chunk in sorted(selected, key=lambda c: c['chunk_id']):
+                label = f"[Halaman {chunk['page']}" + (f" - {chunk['section']}]" if chunk['section'] else "]")
+                parts.append(f"{label}\n{chunk['text']}")
+            context, chunks_used = "\n\n".join(parts), len(selected)
+
+        context_tokens = count_tokens(context)
+        metrics = {
+            'full_text_tokens': self.full_text_tokens,
+            'context_tokens': context_tokens,
+            'chunks_used': chunks_used,
+            'saved_tokens': self.full_text_tokens - context_tokens,
+            'saved_pct': 100.0 * (self.full_text_tokens - context_tokens) / self.full_text_tokens if self.full_text_tokens else 0.0,
+        }
+        return context, metrics
@@ -0,0 +1,237 @@
+# Berisi cache embedding query dua tingkat (LRU di memori + penyimpanan di disk)
+# agar pertanyaan yang sama tidak perlu di-embed ulang ke Cohere.
+
+import json
+import os
+import re
+import threading
+import unicodedata
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cache_utils import LRUCache
+
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.jsonl"
+LOCK_FILE = ".lock"
+# Batas baris vektor di disk; jika penuh, cache disk dikosongkan dan diisi ulang dari awal
+MAX_DISK_ROWS = int(os.getenv("AMIA_EMBEDDING_CACHE_MAX_ROWS", "50000"))
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya kunci antar-thread di dalam proses
+    fcntl = None
+
+
+def normalize_query(query: str) -> str:
+    """Menormalkan query (unicode, huruf kecil, spasi) sebagai kunci cache."""
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    Cache embedding query dengan dua tingkat:
+    1. LRU di memori proses untuk akses tercepat.
+    2. Penyimpanan di disk berupa file vektor float32 (append-only) dan log kunci JSONL
+       (append-only) sehingga cache bertahan setelah Streamlit restart.
+
+    Direktori cache boleh dipakai bersama oleh beberapa proses (worker Streamlit/service):
+    penulisan memakai kunci file eksklusif, pembacaan memakai kunci bersama, dan setiap proses
+    membaca rekaman kunci baru milik proses lain sebelum mencari/menambah. Baris pertama log kunci
+    berisi model dan ID generasi; jika model berubah atau jumlah baris mencapai `max_disk_rows`,
+    isi cache di disk dikosongkan dan generasi baru dimulai.
+    """
+
+    def __init__(self, model_name: str, cache_dir: Optional[str] = None, memory_size: int = 512,
+                 max_disk_rows: int = MAX_DISK_ROWS) -> None:
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_disk_rows = max_disk_rows
+        self.memory = LRUCache(max_size=memory_size)
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._keys: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._generation: Optional[str] = None
+        self._keys_offset = 0
+        if self.cache_dir:
+            self._load_disk_index()
+
+    # --- Penyimpanan disk ---
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Kunci antar-proses (flock) pada direktori cache."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(LOCK_FILE), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load_disk_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock, self._file_lock(exclusive=True):
+            header = self._sync_keys()
+            if header is None or header.get("model") != self.model_name:
+                if header:
+                    print(f"Model embedding berubah ({header.get('model')} -> {self.model_name}), cache query dikosongkan.")
+                self._reset_disk()
+
+    def _sync_keys(self) -> Optional[dict]:
+        """
+        Membaca rekaman kunci yang ditambahkan sejak pembacaan terakhir (dipanggil di bawah kunci file).
+        Jika generasi di disk berbeda (dikosongkan proses lain), indeks kunci dimuat ulang dari awal.
+        Mengembalikan header log kunci, atau None jika log belum ada/rusak/milik model lain.
+        """
+        try:
+            f = open(self._path(KEYS_FILE), "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            header_line = f.readline()
+            try:
+                header = json.loads(header_line)
+            except ValueError:
+                return None
+            if header.get("model") != self.model_name:
+                self._keys = {}
+                return header
+            if header.get("generation") != self._generation:
+                self._generation = header.get("generation")
+                self._keys = {}
+                self._dim = None
+                self._keys_offset = len(header_line)
+            f.seek(self._keys_offset)
+            for line in f:
+                # Baris terakhir yang belum lengkap (penulisan terputus) dilewati
+                if not line.endswith(b"\n"):
+                    break
+                self._keys_offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "dim" in record:
+                    self._dim = record["dim"]
+                elif "key" in record:
+                    self._keys[record["key"]] = record["row"]
+        return header
+
+    def _reset_disk(self) -> None:
+        # Dipanggil di bawah kunci file eksklusif
+        with open(self._path(VECTORS_FILE), "wb"):
+            pass
+        self._generation = uuid.uuid4().hex
+        header = (json.dumps({"model": self.model_name, "generation": self._generation}) + "\n").encode("utf-8")
+        tmp_path = self._path(KEYS_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+        os.replace(tmp_path, self._path(KEYS_FILE))
+        self._keys = {}
+        self._dim = None
+        self._keys_offset = len(header)
+
+    def _read_disk(self, row: int) -> Optional[List[float]]:
+        # Dibaca langsung (bukan memmap) karena file bisa dikosongkan proses lain
+        row_bytes = 4 * self._dim
+        try:
+            with open(self._path(VECTORS_FILE), "rb") as f:
+                f.seek(row * row_bytes)
+                data = f.read(row_bytes)
+        except FileNotFoundError:
+            return None
+        if len(data) < row_bytes:
+            return None
+        return np.frombuffer(data, dtype="float32").tolist()
+
+    def _append_disk(self, key: str, vector: List[float]) -> None:
+        # Dipanggil di bawah kunci file eksklusif setelah _sync_keys, sehingga posisi akhir file akurat
+        if key in self._keys:
+            return
+        vec = np.asarray(vector, dtype="float32")
+        if self._dim is not None and vec.shape[0] != self._dim:
+            return
+        row_bytes = 4 * int(vec.shape[0])
+        if os.path.getsize(self._path(VECTORS_FILE)) // row_bytes >= self.max_disk_rows:
+            print(f"Cache embedding di disk mencapai {self.max_disk_rows} baris, dikosongkan.")
+            self._reset_disk()
+        with open(self._path(VECTORS_FILE), "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            if offset % row_bytes:
+                # Sisa baris yang terpotong (proses berhenti di tengah penulisan)
+                offset -= offset % row_bytes
+                f.truncate(offset)
+            row = offset // row_bytes
+            f.write(vec.tobytes())
+        records = [] if self._dim is not None else [{"dim": int(vec.shape[0])}]
+        records.append({"key": key, "row": row})
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        with open(self._path(KEYS_FILE), "ab") as f:
+            f.write(data)
+        self._keys_offset += len(data)
+        self._dim = int(vec.shape[0])
+        self._keys[key] = row
+
+    # --- API publik ---
+    def get(self, query: str) -> Optional[List[float]]:
+        key = normalize_query(query)
+        vector = self.memory.get(key)
+        if vector is not None:
+            with self._lock:
+                self.stats["memory_hits"] += 1
+            return vector
+
+        if self.cache_dir:
+            with self._lock, self._file_lock(exclusive=False):
+                vector = None
+                if self._sync_keys() is not None:
+                    row = self._keys.get(key)
+                    vector = self._read_disk(row) if row is not None and self._dim else None
+                if vector is not None:
+                    self.stats["disk_hits"] += 1
+            if vector is not None:
+                self.memory.put(key, vector)
+                return vector
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, query: str, vector: List[float]) -> None:
+        key = normalize_query(query)
+        self.memory.put(key, vector)
+        if self.cache_dir:
+            with self._lock, self._file_lock(exclusive=True):
+                header = self._sync_keys()
+                if header is None or header.get("model") != self.model_name:
+                    self._reset_disk()
+                self._append_disk(key, vector)
+
+    def get_or_compute(self, query: str, embed_fn) -> List[float]:
+        """Mengambil embedding dari cache, atau memanggil `embed_fn` lalu menyimpannya."""
+        vector = self.get(query)
+        if vector is None:
+            vector = embed_fn(query)
+            self.put(query, vector)
+        return vector
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.cache_dir:
+            with self._lock, self._file_lock(exclusive=True):
+                self._reset_disk()
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
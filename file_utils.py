@@ -0,0 +1,70 @@
+# Berisi utilitas file yang dipakai bersama oleh beberapa proses (worker Streamlit/service):
+# kunci antar-proses (flock), log JSONL append-only dengan batas ukuran, dan penulisan file atomik.
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa kunci antar-proses
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str, exclusive: bool = True):
+    """Kunci antar-proses (flock) pada file `<path>.lock`."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def append_jsonl(path: str, records: Iterable[Dict], max_bytes: int = 0) -> None:
+    """
+    Menambahkan rekaman ke file JSONL di bawah kunci eksklusif, dalam satu kali tulis.
+    Jika ukuran file sudah mencapai `max_bytes`, file dirotasi ke `<path>.1` (menimpa rotasi sebelumnya).
+    """
+    data = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+    if not data:
+        return
+    with file_lock(path):
+        if max_bytes and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    """Membaca rekaman JSONL; baris terakhir yang belum lengkap atau baris rusak dilewati."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def write_atomic(path: str, text: str) -> None:
+    """Menulis file lewat file sementara unik per proses di direktori yang sama, lalu os.replace."""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
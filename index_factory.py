@@ -0,0 +1,264 @@
+# Berisi lapisan pembuatan & pemuatan index FAISS yang dapat dikonfigurasi:
+# flat, flat_fp16, ivf_flat, hnsw, dan ivf_pq, dengan metrik L2 atau cosine (inner product
+# pada vektor yang dinormalisasi). Spesifikasi index disimpan di manifest (lihat index_manifest.py),
+# dan index dapat dimuat dengan memory-map agar beberapa proses worker berbagi halaman memori yang sama.
+
+import math
+from typing import Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "flat_fp16", "ivf_flat", "hnsw", "ivf_pq")
+METRICS = {"l2": faiss.METRIC_L2, "ip": faiss.METRIC_INNER_PRODUCT}
+# Index lama (sebelum ada spesifikasi di manifest) selalu IndexFlatL2
+DEFAULT_SPEC = {"index_type": "flat", "metric": "l2", "params": {}}
+
+TRAINED_TYPES = ("ivf_flat", "ivf_pq")
+# HNSW tidak mendukung remove_ids; penghapusan dilakukan dengan membangun ulang index
+REMOVABLE_TYPES = ("flat", "flat_fp16", "ivf_flat", "ivf_pq")
+# Rekonstruksi vektor dari tipe ini tidak persis sama dengan embedding aslinya
+LOSSY_TYPES = ("flat_fp16", "ivf_pq")
+# Parameter yang menentukan struktur index (perubahan = build ulang) dan parameter saat pencarian saja
+BUILD_PARAMS = ("nlist", "hnsw_m", "ef_construction", "pq_m", "pq_nbits")
+SEARCH_PARAMS = {"nprobe": "nprobe", "ef_search": "efSearch"}
+# Filter dengan jumlah vektor sekecil ini (index ber-IndexIDMap2) dihitung persis dari vektor tersimpan
+EXACT_FILTER_MAX = 2048
+
+
+def make_spec(index_type: str = "flat", metric: str = "l2", **params) -> Dict:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Tipe index '{index_type}' tidak dikenal. Pilihan: {', '.join(INDEX_TYPES)}")
+    if metric not in METRICS:
+        raise ValueError(f"Metrik '{metric}' tidak dikenal. Pilihan: {', '.join(METRICS)}")
+    return {"index_type": index_type, "metric": metric,
+            "params": {key: value for key, value in params.items() if value is not None}}
+
+
+def manifest_index_spec(manifest: Optional[Dict]) -> Dict:
+    """Spesifikasi index yang tercatat di manifest (index lama tanpa catatan dianggap flat/L2)."""
+    spec = (manifest or {}).get("index") or DEFAULT_SPEC
+    return make_spec(spec["index_type"], spec["metric"], **spec.get("params", {}))
+
+
+def _largest_divisor(dim: int, limit: int) -> int:
+    return max(m for m in range(1, max(1, limit) + 1) if dim % m == 0)
+
+
+def resolve_params(spec: Dict, num_vectors: int, dim: int) -> Dict:
+    """Melengkapi parameter yang kosong dengan nilai default yang wajar untuk ukuran dataset."""
+    params = dict(spec["params"])
+    index_type = spec["index_type"]
+    if index_type in TRAINED_TYPES:
+        # ~4*sqrt(n) cluster, dengan minimal 39 titik latih per cluster
+        nlist = params.setdefault("nlist", max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39)))
+        params.setdefault("nprobe", min(nlist, max(8, nlist // 8)))
+    if index_type == "hnsw":
+        params.setdefault("hnsw_m", 32)
+        params.setdefault("ef_construction", 80)
+        params.setdefault("ef_search", 64)
+    if index_type == "ivf_pq":
+        params.setdefault("pq_m", _largest_divisor(dim, dim // 16))
+        # 8 bit butuh >= 256*39 titik latih; dataset kecil memakai kode yang lebih pendek
+        params.setdefault("pq_nbits", 8 if num_vectors >= 256 * 39 else max(4, int(math.log2(max(16, num_vectors // 39)))))
+    return make_spec(index_type, spec["metric"], **params)
+
+
+def same_structure(a: Dict, b: Dict) -> bool:
+    """True jika dua spesifikasi menghasilkan struktur index yang sama (parameter pencarian diabaikan)."""
+    if (a["index_type"], a["metric"]) != (b["index_type"], b["metric"]):
+        return False
+    return all(a["params"].get(key) == b["params"].get(key) for key in BUILD_PARAMS
+               if key in a["params"] and key in b["params"])
+
+
+def factory_string(spec: Dict) -> str:
+    params = spec["params"]
+    index_type = spec["index_type"]
+    if index_type == "flat":
+        return "IDMap2,Flat"
+    if index_type == "flat_fp16":
+        return "IDMap2,SQfp16"
+    if index_type == "hnsw":
+        return f"IDMap2,HNSW{params['hnsw_m']}"
+    if index_type == "ivf_flat":
+        return f"IVF{params['nlist']},Flat"
+    return f"IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_nbits']}"
+
+
+def create_empty_index(spec: Dict, dim: int):
+    """Index kosong sesuai spesifikasi; IVF menyimpan ID sendiri, tipe lain dibungkus IndexIDMap2."""
+    index = faiss.index_factory(dim, factory_string(spec), METRICS[spec["metric"]])
+    if spec["index_type"] == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efConstruction = spec["params"]["ef_construction"]
+    return index
+
+
+def apply_search_params(index, spec: Dict) -> None:
+    parameter_space = faiss.ParameterSpace()
+    for key, faiss_name in SEARCH_PARAMS.items():
+        if key in spec["params"]:
+            try:
+                parameter_space.set_index_parameter(index, faiss_name, spec["params"][key])
+            except RuntimeError:
+                # Parameter tidak berlaku untuk tipe index ini
+                pass
+
+
+def prepare_vectors(vectors, spec: Dict) -> np.ndarray:
+    """Mengubah ke float32 kontigu; untuk metrik cosine vektor dinormalisasi (salinan)."""
+    vectors = np.array(vectors, dtype="float32", copy=True, ndmin=2)
+    if spec["metric"] == "ip":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def similarity_to_distance(scores: np.ndarray, spec: Dict) -> np.ndarray:
+    """Skor cosine diubah ke jarak L2 kuadrat yang setara (2 - 2*cos) agar makna `distance` tetap sama."""
+    return 2.0 - 2.0 * scores if spec["metric"] == "ip" else scores
+
+
+def describe_index(index) -> Tuple[str, str]:
+    """Menebak (tipe, metrik) dari struktur index yang sudah ada."""
+    metric = "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw", metric
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq", metric
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat", metric
+    if isinstance(inner, faiss.IndexScalarQuantizer):
+        return "flat_fp16", metric
+    return "flat", metric
+
+
+def describe_index_spec(index) -> Dict:
+    """Spesifikasi lengkap (tipe, metrik, dan parameter struktur/pencarian) yang dibaca dari index itu sendiri."""
+    index_type, metric = describe_index(index)
+    params = {}
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else faiss.downcast_index(index)
+    if index_type == "hnsw":
+        params.update(hnsw_m=int(inner.hnsw.nb_neighbors(1)), ef_construction=int(inner.hnsw.efConstruction),
+                      ef_search=int(inner.hnsw.efSearch))
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        ivf = faiss.extract_index_ivf(index)
+        params.update(nlist=int(ivf.nlist), nprobe=int(ivf.nprobe))
+        if index_type == "ivf_pq":
+            pq = faiss.downcast_index(ivf).pq
+            params.update(pq_m=int(pq.M), pq_nbits=int(pq.nbits))
+    return make_spec(index_type, metric, **params)
+
+
+def stored_ids(index) -> np.ndarray:
+    """Semua ID vektor yang tersimpan di index."""
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.vector_to_array(index.id_map).astype("int64")
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    ids = [faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+           for list_no in range(ivf.nlist) if invlists.list_size(list_no)]
+    return np.concatenate(ids).astype("int64") if ids else np.empty(0, dtype="int64")
+
+
+def reconstruct_all(index) -> Tuple[np.ndarray, np.ndarray]:
+    """Mengembalikan (ids, vektor) dari seluruh isi index (lossy untuk flat_fp16 dan ivf_pq)."""
+    ids = stored_ids(index)
+    if not len(ids):
+        return ids, np.empty((0, index.d), dtype="float32")
+    if isinstance(index, faiss.IndexIDMap2):
+        return ids, index.index.reconstruct_n(0, index.ntotal)
+    ivf = faiss.extract_index_ivf(index)
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return ids, ivf.reconstruct_batch(ids)
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, spec: Dict):
+    """Membangun index lengkap dari vektor yang sudah disiapkan (lihat prepare_vectors)."""
+    index = create_empty_index(spec, vectors.shape[1])
+    if spec["index_type"] in TRAINED_TYPES:
+        index.train(vectors)
+    index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    apply_search_params(index, spec)
+    return index
+
+
+def remove_vectors(index, ids, spec: Dict):
+    """Menghapus ID dari index; tipe tanpa dukungan remove_ids (HNSW) dibangun ulang tanpa ID tersebut."""
+    ids = np.asarray(ids, dtype="int64")
+    if describe_index(index)[0] in REMOVABLE_TYPES:
+        index.remove_ids(ids)
+        return index
+    print(f"Index {describe_index(index)[0]} tidak mendukung penghapusan, index dibangun ulang tanpa {len(ids)} vektor.")
+    all_ids, vectors = reconstruct_all(index)
+    keep = ~np.isin(all_ids, ids)
+    # Parameter yang tidak tercatat di spesifikasi (mis. hnsw_m) dilengkapi agar factory_string tidak gagal
+    spec = resolve_params(spec, int(keep.sum()), index.d)
+    return build_index(vectors[keep], all_ids[keep], spec)
+
+
+def convert_index(index, from_spec: Dict, to_spec: Dict):
+    """Membangun ulang isi index dengan spesifikasi lain tanpa embedding ulang."""
+    if from_spec["index_type"] in LOSSY_TYPES:
+        print(f"Peringatan: vektor hasil rekonstruksi dari index {from_spec['index_type']} tidak persis sama dengan embedding asli.")
+    ids, vectors = reconstruct_all(index)
+    to_spec = resolve_params(to_spec, len(ids), index.d)
+    return build_index(prepare_vectors(vectors, to_spec), ids, to_spec), to_spec
+
+
+def _exact_search(index, spec: Dict, queries: np.ndarray, k: int, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    vectors = index.reconstruct_batch(ids)
+    if spec["metric"] == "ip":
+        scores = queries @ vectors.T
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    else:
+        scores = (queries ** 2).sum(1)[:, None] - 2 * queries @ vectors.T + (vectors ** 2).sum(1)[None, :]
+        order = np.argsort(scores, axis=1, kind="stable")[:, :k]
+    distances = np.full((len(queries), k), np.nan, dtype="float32")
+    labels = np.full((len(queries), k), -1, dtype="int64")
+    distances[:, :order.shape[1]] = np.take_along_axis(scores, order, axis=1)
+    labels[:, :order.shape[1]] = ids[order]
+    return distances, labels
+
+
+def filtered_search(index, spec: Dict, queries: np.ndarray, k: int, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pencarian top-k yang dibatasi ke vektor `ids`, dijalankan di dalam FAISS (IDSelectorBatch pada
+    SearchParameters). Filter kecil pada index ber-IndexIDMap2 dihitung persis; untuk IVF dan HNSW
+    jangkauan pencarian (nprobe/efSearch) diperlebar sebanding selektivitas filter agar top-k tetap lengkap.
+    """
+    ids = np.asarray(ids, dtype="int64")
+    if isinstance(index, faiss.IndexIDMap2) and len(ids) <= EXACT_FILTER_MAX:
+        return _exact_search(index, spec, queries, k, ids)
+    selector = faiss.IDSelectorBatch(ids)
+    widen = index.ntotal / max(len(ids), 1)
+    if spec["index_type"] in TRAINED_TYPES:
+        ivf = faiss.extract_index_ivf(index)
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=int(min(ivf.nlist, math.ceil(ivf.nprobe * widen))))
+    elif spec["index_type"] == "hnsw":
+        ef_search = faiss.downcast_index(index.index).hnsw.efSearch
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=int(min(index.ntotal, max(k, math.ceil(ef_search * widen)))))
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(queries, k, params=params)
+
+
+def load_index(index_path: str, spec: Dict = None, mmap: bool = True):
+    """
+    Memuat index untuk pencarian. Dengan `mmap`, data vektor dipetakan dari file (IO_FLAG_MMAP untuk
+    inverted list IVF, IO_FLAG_MMAP_IFC untuk tipe lain) sehingga halaman memori dibagi antar proses;
+    jika gagal, index dimuat penuh ke RAM seperti biasa.
+    """
+    spec = spec or DEFAULT_SPEC
+    index = None
+    if mmap:
+        flag = faiss.IO_FLAG_MMAP if spec["index_type"] in TRAINED_TYPES else faiss.IO_FLAG_MMAP_IFC
+        try:
+            index = faiss.read_index(index_path, flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            print(f"Memory-map index gagal, memuat penuh ke RAM: {str(e).splitlines()[0]}")
+    if index is None:
+        index = faiss.read_index(index_path)
+    apply_search_params(index, spec)
+    return index
+
@@ -0,0 +1,42 @@
+# Berisi fungsi bantu untuk manifest index FAISS: hash teks per baris dan
+# pemetaan hash -> ID vektor yang dipakai bersama oleh create_index.py dan retriever.py.
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+def manifest_path_for(index_path: str) -> str:
+    return os.path.splitext(index_path)[0] + ".manifest.json"
+
+
+def build_combined_texts(df: pd.DataFrame) -> List[str]:
+    """Menggabungkan semua kolom satu baris menjadi satu teks (sama seperti saat index dibuat)."""
+    return df.astype(str).agg(' '.join, axis=1).tolist()
+
+
+def row_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_manifest(path: str, manifest: Dict) -> None:
+    """Menulis manifest secara atomik (file sementara lalu os.replace)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def new_manifest(model: str, dim: Optional[int] = None) -> Dict:
+    return {"model": model, "dim": dim, "next_id": 0, "rows": {}}
@@ -0,0 +1,238 @@
+# Berisi router intent deterministik (aturan + leksikon) di depan agent: pertanyaan statistik terstruktur
+# seperti "penyebab kematian tertinggi tahun 2015" atau "analisis tren AIDS" langsung dijawab oleh tool
+# statistik tanpa loop ReAct/LLM. Pertanyaan yang tidak yakin dikenali diteruskan ke agent.
+# Setiap keputusan routing (intent, alasan, slot; tanpa teks pertanyaan) dicatat ke JSONL agar porsi trafik
+# tanpa panggilan LLM bisa diukur.
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from config import get_secret
+from file_utils import append_jsonl, read_jsonl
+from lexical_index import STOPWORDS, tokenize
+from telemetry import DEFAULT_TELEMETRY_DIR
+from tools.statistics_engine import DATA_PATH, get_statistics_engine
+from tools.statistics_tool import analyze_cause_trend, find_extremes_in_year
+
+ROUTER_ENABLED = os.getenv("AMIA_INTENT_ROUTER", "1") != "0"
+# Di bawah ambang ini pertanyaan diteruskan ke agent
+MIN_CONFIDENCE = float(os.getenv("AMIA_ROUTER_MIN_CONFIDENCE", "0.75"))
+ROUTING_LOG_FILE = "routing.jsonl"
+# Ukuran maksimum routing.jsonl sebelum dirotasi ke routing.jsonl.1
+MAX_ROUTING_LOG_BYTES = int(os.getenv("AMIA_ROUTING_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+DATABASE_SOURCE = "<<SOURCE:Database Penyebab Kematian di Indonesia>>"
+
+HIGHEST_TERMS = {'tertinggi', 'terbanyak', 'terbesar', 'highest'}
+LOWEST_TERMS = {'terendah', 'tersedikit', 'terkecil', 'lowest'}
+# Frasa dua kata yang setara dengan kata arah di atas
+DIRECTION_PHRASES = {'paling banyak': 'tertinggi', 'paling tinggi': 'tertinggi', 'paling sedikit': 'terendah',
+                     'paling rendah': 'terendah'}
+TREND_TERMS = {'tren', 'trend', 'perkembangan', 'riwayat', 'historis'}
+# Kata yang menandakan permintaan di luar kemampuan tool statistik (penjelasan, saran, terjemahan, dokumen)
+CONFLICT_TERMS = {'rekomendasi', 'saran', 'tips', 'cara', 'mengapa', 'kenapa', 'bagaimana', 'terjemah',
+                  'terjemahkan', 'translate', 'gejala', 'obat', 'mengobati', 'mencegah', 'pencegahan',
+                  'dokumen', 'pasien', 'bandingkan', 'dibandingkan', 'selain', 'prediksi'}
+# Kata pengisi yang tidak mengubah maksud pertanyaan
+FILLER_TERMS = {'dong', 'ya', 'sih', 'nya', 'adalah', 'ini', 'saya', 'mau', 'ingin', 'tahu', 'lihat',
+                'tampilkan', 'berikan', 'kasih', 'apakah', 'siapa', 'mana', 'paling', 'kematiannya',
+                'penyebabnya', 'menyebabkan', 'meninggal', 'korban', 'jiwa', 'th', 'thn', 'selama',
+                'ada', 'terjadi', 'sepanjang', 'sebab'}
+YEAR_PATTERN = re.compile(r'^(?:19|20)\d{2}$')
+# Pengurang keyakinan untuk setiap kata yang tidak dikenali / untuk kecocokan penyebab yang fuzzy
+UNKNOWN_TOKEN_PENALTY = 0.15
+FUZZY_CAUSE_PENALTY = 0.1
+# Nama pendek seperti "banjir" memang mencakup beberapa varian penyebab (digabung oleh tool tren)
+MAX_TREND_CAUSES = 8
+
+
+class RouteDecision(NamedTuple):
+    intent: Optional[str]           # "extreme", "trend", atau None
+    confidence: float
+    routed: bool
+    reason: str
+    slots: Dict
+    answer: Optional[str] = None
+
+
+class IntentRouter:
+    """
+    Mengenali dua intent statistik:
+    - "extreme": tahun + arah (tertinggi/terendah) tanpa nama penyebab -> find_extremes_in_year,
+    - "trend": kata tren + nama penyebab yang dikenali indeks leksikal -> analyze_cause_trend.
+    Keyakinan dimulai dari 1.0 dan dikurangi untuk kata yang tidak dikenali; kata yang menandakan
+    permintaan lain (rekomendasi, cara, terjemah, ...) langsung membuat pertanyaan diteruskan ke agent.
+    """
+
+    def __init__(self, retriever, min_confidence: float = MIN_CONFIDENCE, log_dir: Optional[str] = None,
+                 csv_path: str = DATA_PATH) -> None:
+        self.retriever = retriever
+        self.lexical = getattr(retriever, 'lexical', None)
+        self.min_confidence = min_confidence
+        self.csv_path = csv_path
+        self.log_path = os.path.join(log_dir, ROUTING_LOG_FILE) if log_dir else None
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"questions": 0, "routed": 0, "fallback": 0, "extreme": 0, "trend": 0, "route_ms": 0.0}
+
+    # --- Ekstraksi slot ---
+    def _tokens(self, question: str) -> List[str]:
+        text = ' '.join(tokenize(question))
+        for phrase, replacement in DIRECTION_PHRASES.items():
+            text = re.sub(rf'\b{phrase}\b', replacement, text)
+        return text.split()
+
+    def _leftover(self, tokens: List[str], used: set) -> List[str]:
+        return [token for token in tokens if token not in used and token not in STOPWORDS and token not in FILLER_TERMS]
+
+    def _cause_candidates(self, words: List[str]) -> tuple:
+        """(nama penyebab yang cocok, semua token cocok persis?) untuk kata-kata sisa."""
+        if self.lexical is None or not words:
+            return [], False
+        term = ' '.join(words)
+        exact = all(any(is_exact for _, _, is_exact in self.lexical.expand(word)) for word in words)
+        return self.lexical.match_causes(term), exact
+
+    def classify(self, question: str) -> RouteDecision:
+        """Menentukan intent dan slot tanpa memanggil tool."""
+        tokens = self._tokens(question)
+        if not tokens:
+            return RouteDecision(None, 0.0, False, "pertanyaan kosong", {})
+        conflicts = CONFLICT_TERMS.intersection(tokens)
+        if conflicts:
+            return RouteDecision(None, 0.0, False, f"permintaan di luar statistik: {', '.join(sorted(conflicts))}", {})
+
+        years = [int(token) for token in tokens if YEAR_PATTERN.match(token)]
+        highest, lowest = HIGHEST_TERMS.intersection(tokens), LOWEST_TERMS.intersection(tokens)
+        trend = TREND_TERMS.intersection(tokens)
+        if trend and (highest or lowest):
+            return RouteDecision(None, 0.0, False, "kata tren dan tertinggi/terendah muncul bersamaan", {})
+
+        if highest or lowest:
+            return self._classify_extreme(tokens, years, highest, lowest)
+        if trend or 'analisis' in tokens:
+            return self._classify_trend(tokens, years, trend)
+        return RouteDecision(None, 0.0, False, "tidak ada kata kunci intent statistik", {})
+
+    def _classify_extreme(self, tokens: List[str], years: List[int], highest: set, lowest: set) -> RouteDecision:
+        if highest and lowest:
+            return RouteDecision('extreme', 0.0, False, "arah tertinggi dan terendah sekaligus", {})
+        if len(set(years)) != 1:
+            return RouteDecision('extreme', 0.0, False, "butuh tepat satu tahun", {'years': years})
+        slots = {'year': years[0], 'direction': 'tertinggi' if highest else 'terendah'}
+        engine = get_statistics_engine(self.csv_path)
+        if slots['year'] not in engine.year_extremes:
+            return RouteDecision('extreme', 0.0, False, f"tahun tidak ada di data: {slots['year']}", slots)
+        leftover = self._leftover(tokens, highest | lowest | {str(slots['year'])})
+        causes, _ = self._cause_candidates(leftover)
+        if causes:
+            # "kematian tertinggi akibat banjir 2010" menanyakan satu penyebab, bukan peringkat tahunan
+            return RouteDecision('extreme', 0.0, False, "menyebut nama penyebab tertentu", dict(slots, causes=causes))
+        confidence = max(0.0, 1.0 - UNKNOWN_TOKEN_PENALTY * len(leftover))
+        return RouteDecision('extreme', confidence, confidence >= self.min_confidence,
+                             f"kata tidak dikenali: {leftover}" if leftover else "slot lengkap", dict(slots, unknown=leftover))
+
+    def _classify_trend(self, tokens: List[str], years: List[int], trend: set) -> RouteDecision:
+        if years:
+            # Tool tren selalu memakai seluruh periode; rentang tahun tertentu butuh agent
+            return RouteDecision('trend', 0.0, False, "menyebut tahun/rentang tahun", {'years': years})
+        words = self._leftover(tokens, trend)
+        causes, exact = self._cause_candidates(words)
+        if not causes:
+            return RouteDecision('trend', 0.0, False, f"penyebab tidak dikenali: {words}", {'term': ' '.join(words)})
+        slots = {'term': ' '.join(words), 'causes': causes}
+        if len(causes) > MAX_TREND_CAUSES:
+            return RouteDecision('trend', 0.0, False, f"penyebab terlalu umum: {len(causes)} cocok", slots)
+        series = get_statistics_engine(self.csv_path).trend_for_causes(causes)
+        if series is None or len(series['years']) < 2:
+            return RouteDecision('trend', 0.0, False, "data tidak cukup untuk tren", slots)
+        confidence = 1.0 if exact else 1.0 - FUZZY_CAUSE_PENALTY
+        # Tanpa kata "tren" (hanya "analisis X") maksudnya bisa info umum, bukan deret waktu
+        if not trend:
+            confidence -= UNKNOWN_TOKEN_PENALTY
+        return RouteDecision('trend', confidence, confidence >= self.min_confidence,
+                             "slot lengkap" if exact else "nama penyebab cocok secara fuzzy", slots)
+
+    # --- Eksekusi ---
+    def route(self, question: str) -> RouteDecision:
+        """Mengklasifikasi lalu, jika cukup yakin, menjalankan tool dan menyusun jawaban final bertanda sumber."""
+        started = time.perf_counter()
+        decision = self.classify(question)
+        if decision.routed:
+            if decision.intent == 'extreme':
+                result = find_extremes_in_year(f"{decision.slots['direction']} {decision.slots['year']}")
+            else:
+                result = analyze_cause_trend(decision.slots['term'], self.retriever)
+            decision = decision._replace(answer=f"{result}\n{DATABASE_SOURCE}")
+        self._log(decision, (time.perf_counter() - started) * 1000)
+        return decision
+
+    def _log(self, decision: RouteDecision, duration_ms: float) -> None:
+        with self._lock:
+            self.stats["questions"] += 1
+            self.stats["routed" if decision.routed else "fallback"] += 1
+            if decision.routed:
+                self.stats[decision.intent] += 1
+            self.stats["route_ms"] += duration_ms
+        if not self.log_path:
+            return
+        # Teks pertanyaan pengguna (bisa berisi data medis pribadi) sengaja tidak disimpan
+        entry = {"timestamp": round(time.time(), 3), "intent": decision.intent,
+                 "confidence": round(decision.confidence, 3), "routed": decision.routed, "reason": decision.reason,
+                 "slots": decision.slots, "duration_ms": round(duration_ms, 3)}
+        try:
+            append_jsonl(self.log_path, [entry], MAX_ROUTING_LOG_BYTES)
+        except OSError as e:
+            print(f"Gagal menulis log routing: {e}")
+
+    def summary(self) -> Dict:
+        with self._lock:
+            questions = self.stats["questions"]
+            return dict(self.stats, routed_share=self.stats["routed"] / questions if questions else 0.0)
+
+
+def routing_log_summary(log_path: str) -> Dict:
+    """Merangkum file routing.jsonl: porsi pertanyaan yang dijawab tanpa LLM, per intent dan alasan fallback."""
+    summary = {"questions": 0, "routed": 0, "by_intent": {}, "fallback_reasons": {}}
+    for entry in read_jsonl(log_path):
+        summary["questions"] += 1
+        if entry["routed"]:
+            summary["routed"] += 1
+            summary["by_intent"][entry["intent"]] = summary["by_intent"].get(entry["intent"], 0) + 1
+        else:
+            reason = entry["reason"].split(":")[0]
+            summary["fallback_reasons"][reason] = summary["fallback_reasons"].get(reason, 0) + 1
+    summary["routed_share"] = summary["routed"] / summary["questions"] if summary["questions"] else 0.0
+    return summary
+
+
+_routers: Dict[int, IntentRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_intent_router(retriever) -> Optional[IntentRouter]:
+    """Router bersama untuk retriever ini; None jika AMIA_INTENT_ROUTER=0. Log ikut direktori telemetri."""
+    if not ROUTER_ENABLED:
+        return None
+    router = _routers.get(id(retriever))
+    if router is not None:
+        return router
+    with _routers_lock:
+        if id(retriever) not in _routers:
+            log_dir = None
+            if get_secret("AMIA_TELEMETRY", "1") != "0":
+                log_dir = get_secret("AMIA_TELEMETRY_DIR", DEFAULT_TELEMETRY_DIR) or None
+            _routers[id(retriever)] = IntentRouter(retriever, log_dir=log_dir)
+        return _routers[id(retriever)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ringkasan log keputusan router intent.")
+    parser.add_argument("log", nargs="?", default=os.path.join(DEFAULT_TELEMETRY_DIR, ROUTING_LOG_FILE))
+    print(json.dumps(routing_log_summary(parser.parse_args().log), indent=2, ensure_ascii=False))
@@ -0,0 +1,199 @@
+# Berisi indeks leksikal (inverted index) atas kolom Cause/Type/Year untuk
+# menjawab query yang menyebut nama penyebab secara langsung tanpa panggilan embedding.
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import LRUCache
+
+# Kata umum dalam pertanyaan yang tidak membantu mencocokkan nama penyebab.
+STOPWORDS = {
+    'tahun', 'penyebab', 'kematian', 'penyakit', 'analisis', 'tren', 'data', 'jumlah', 'berapa',
+    'apa', 'yang', 'di', 'dan', 'atau', 'pada', 'untuk', 'dari', 'ke', 'akibat', 'karena', 'info',
+    'informasi', 'tentang', 'mengenai', 'statistik', 'kasus', 'tertinggi', 'terendah', 'indonesia',
+    'rekomendasi', 'bagaimana', 'cari', 'tolong', 'jelaskan', 'sebutkan', 'oleh', 'dengan',
+    'the', 'of', 'and', 'in', 'trend', 'deaths', 'death', 'cause',
+}
+
+# Singkatan/istilah populer yang tidak muncul persis di nama penyebab.
+SYNONYMS = {
+    'tbc': ['tuberkulosis', 'tb'],
+    'hiv': ['aids'],
+    'flu': ['influenza'],
+    'dbd': ['dbd', 'dengue'],
+    'corona': ['covid'],
+    'tifus': ['tifoid', 'thypoid', 'typus', 'tifus'],
+}
+
+FIELD_WEIGHTS = {'Cause': 3.0, 'Type': 1.0, 'Year': 1.0}
+
+# Konstanta k pada Reciprocal Rank Fusion
+RRF_K = 60
+# Jumlah token query yang hasil ekspansi fuzzy-nya disimpan (token dari pengguna tidak terbatas jenisnya)
+EXPAND_CACHE_SIZE = 4096
+
+
+def fold(text: str) -> str:
+    """Menghapus aksen dan mengubah ke huruf kecil."""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r'[a-z0-9]+', fold(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f'$${token}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Jarak Levenshtein dengan batas; mengembalikan max_distance + 1 jika terlampaui."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Menggabungkan beberapa daftar peringkat baris dengan Reciprocal Rank Fusion."""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            scores[row] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalResult(NamedTuple):
+    hits: List[Tuple[int, float]]
+    exact: bool
+
+
+class LexicalIndex:
+    """
+    Inverted index token -> baris untuk kolom Cause, Type, dan Year, dengan
+    case/accent folding dan pencarian fuzzy (trigram + edit distance) untuk salah ketik.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.cause_postings: Dict[str, Set[int]] = defaultdict(set)
+        self.cause_tokens: List[Set[str]] = []
+        self.causes: List[str] = []
+        self.years: List[int] = []
+        self.exact_names: Dict[str, List[int]] = defaultdict(list)
+
+        for row, record in enumerate(df[['Cause', 'Type', 'Year']].itertuples(index=False)):
+            cause, type_, year = record
+            self.causes.append(str(cause))
+            self.years.append(int(year) if str(year).isdigit() else 0)
+            for field, value in (('Cause', cause), ('Type', type_), ('Year', year)):
+                for token in tokenize(value):
+                    weight = FIELD_WEIGHTS[field]
+                    if weight > self.postings[token].get(row, 0.0):
+                        self.postings[token][row] = weight
+            tokens = {t for t in tokenize(cause) if t not in STOPWORDS}
+            self.cause_tokens.append(tokens)
+            for token in tokens:
+                self.cause_postings[token].add(row)
+            self.exact_names[' '.join(t for t in tokenize(cause) if t not in STOPWORDS)].append(row)
+
+        self.trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        for token in self.postings:
+            for gram in trigrams(token):
+                self.trigram_index[gram].add(token)
+        self._expand_cache = LRUCache(max_size=EXPAND_CACHE_SIZE)
+
+    def query_tokens(self, query: str) -> List[str]:
+        return [t for t in tokenize(query) if t not in STOPWORDS]
+
+    def expand(self, token: str) -> List[Tuple[str, float, bool]]:
+        """Daftar (token indeks, kemiripan, exact) yang cocok dengan token query."""
+        cached = self._expand_cache.get(token)
+        if cached is not None:
+            return cached
+        matches = []
+        for candidate in SYNONYMS.get(token, [token]):
+            if candidate in self.postings:
+                matches.append((candidate, 1.0, True))
+        if not matches and len(token) >= 4 and not token.isdigit():
+            max_distance = 1 if len(token) < 7 else 2
+            grams = trigrams(token)
+            counts: Dict[str, int] = defaultdict(int)
+            for gram in grams:
+                for candidate in self.trigram_index.get(gram, ()):
+                    counts[candidate] += 1
+            for candidate, shared in counts.items():
+                if shared * 2 < len(grams) or candidate.isdigit():
+                    continue
+                distance = edit_distance(token, candidate, max_distance)
+                if distance <= max_distance:
+                    matches.append((candidate, 1.0 - distance / max(len(token), len(candidate)), False))
+        self._expand_cache.put(token, matches)
+        return matches
+
+    def search(self, query: str, limit: int = 20, allowed: Optional[np.ndarray] = None) -> LexicalResult:
+        """`allowed` (mask boolean per baris) membatasi hasil sebelum peringkat dipotong ke `limit`."""
+        tokens = self.query_tokens(query)
+        if not tokens:
+            return LexicalResult([], False)
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched_cause_tokens: Dict[int, Set[str]] = defaultdict(set)
+        all_exact, any_cause = True, False
+        for token in tokens:
+            expansions = self.expand(token)
+            if not expansions or not any(exact for _, _, exact in expansions):
+                all_exact = False
+            for candidate, similarity, _ in expansions:
+                postings = self.postings[candidate]
+                rarity = 1.0 / len(postings) ** 0.5
+                for row, weight in postings.items():
+                    scores[row] += similarity * weight * rarity
+                for row in self.cause_postings.get(candidate, ()):
+                    matched_cause_tokens[row].add(candidate)
+                    any_cause = True
+
+        for row, matched in matched_cause_tokens.items():
+            # Bonus cakupan: "Banjir" lebih cocok ke penyebab "Banjir" daripada "Banjir Bandang dan Tanah Longsor".
+            scores[row] += 2.0 * len(matched) / max(len(self.cause_tokens[row]), 1)
+        name_rows = self.exact_names.get(' '.join(tokens), [])
+        for row in name_rows:
+            scores[row] += 5.0
+
+        if allowed is not None:
+            scores = {row: score for row, score in scores.items() if allowed[row]}
+            name_rows = [row for row in name_rows if allowed[row]]
+            if not scores:
+                return LexicalResult([], False)
+        ranked = sorted(scores.items(), key=lambda item: (item[1], self.years[item[0]]), reverse=True)
+        exact = bool(name_rows) or (all_exact and any_cause)
+        return LexicalResult(ranked[:limit], exact)
+
+    def match_causes(self, query: str) -> List[str]:
+        """Nama penyebab yang memuat semua token penting query (exact atau fuzzy)."""
+        tokens = self.query_tokens(query)
+        if not tokens:
+            return []
+        rows = None
+        for token in tokens:
+            token_rows = set()
+            for candidate, _, _ in self.expand(token):
+                token_rows |= self.cause_postings.get(candidate, set())
+            rows = token_rows if rows is None else rows & token_rows
+            if not rows:
+                return []
+        return list(dict.fromkeys(self.causes[row] for row in sorted(rows)))
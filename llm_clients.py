@@ -0,0 +1,56 @@
+# Berisi klien LLM Gemini yang dibuat sekali per proses dan dipakai bersama
+# oleh agent dan tools, sehingga koneksi HTTP ke API dapat digunakan ulang.
+
+import threading
+from typing import TYPE_CHECKING, Dict, Tuple
+
+from config import get_secret
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+DEFAULT_MODEL = 'gemini-2.0-flash'
+
+_clients: Dict[Tuple[str, float, bool], "ChatGoogleGenerativeAI"] = {}
+_lock = threading.Lock()
+
+
+def _streaming_chat_class():
+    """
+    Turunan ChatGoogleGenerativeAI yang selalu memanggil API streaming Gemini. Hasil akhirnya sama
+    dengan panggilan biasa, tetapi setiap potongan teks diteruskan ke callback `on_llm_new_token`
+    (mis. StreamingChatHandler) tanpa bergantung pada kelas handler internal LangChain.
+    """
+    from langchain_core.language_models.chat_models import generate_from_stream
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    class StreamingChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            chunks = list(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+            if not chunks:
+                # Stream kosong (mis. respons diblokir): ulangi dengan panggilan biasa agar galatnya sama
+                return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return generate_from_stream(iter(chunks))
+
+    return StreamingChatGoogleGenerativeAI
+
+
+def get_chat_llm(temperature: float = 0.2, model: str = DEFAULT_MODEL, streaming: bool = False) -> "ChatGoogleGenerativeAI":
+    """
+    Mengembalikan klien ChatGoogleGenerativeAI bersama untuk kombinasi model, temperature, dan mode;
+    `streaming=True` memakai API streaming sehingga token jawaban bisa ditampilkan bertahap.
+    """
+    key = (model, temperature, streaming)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        if key not in _clients:
+            # SDK Gemini diimpor saat klien pertama dibuat agar impor modul ini tetap ringan
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            google_api_key = get_secret("GOOGLE_API_KEY")
+            if not google_api_key:
+                raise ValueError("GOOGLE_API_KEY tidak ditemukan.")
+            chat_class = _streaming_chat_class() if streaming else ChatGoogleGenerativeAI
+            _clients[key] = chat_class(model=model, google_api_key=google_api_key, temperature=temperature)
+        return _clients[key]
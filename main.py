@@ -1,199 +1,276 @@
 # main.py
 
 import os
+import uuid
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 import streamlit as st
-from langchain.agents import initialize_agent, Tool, AgentType
-from langchain.memory import ConversationBufferMemory
-from langchain_google_genai import ChatGoogleGenerativeAI
-from googlesearch import search
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.chains.summarize import load_summarize_chain
-from langchain_core.messages import SystemMessage
-
-# Import komponen lokal
-from retriever import FaissRetriever
-from medical_document_processor import extract_medical_document
-from callback_handler import GeminiCallbackHandler
-from tools.statistics_tool import find_extremes_in_year, analyze_cause_trend
-from tools.recommendation_tool import recommend_actions
-from tools.medical_info_tool import get_medical_info
-from tools.date_tool import get_current_date
-from tools.translator_tool import translate_medical_terms
+
+# Import komponen lokal. Modul berat (LangChain, pandas, FAISS, klien API) diimpor di fungsi yang
+# memakainya dan dipanaskan di latar oleh warmup.py, sehingga UI tampil tanpa menunggu impor tersebut.
+from session_store import ChatSession, SessionStore
+from telemetry import get_telemetry
+from warmup import get_warmup, start_warmup
+
+if TYPE_CHECKING:
+    from document_index import DocumentIndex
+    from retriever import FaissRetriever
 
 load_dotenv()
 
+# Mode streaming: jawaban ditampilkan token demi token (set AMIA_STREAMING=0 untuk menonaktifkan)
+STREAMING_ENABLED = os.getenv("AMIA_STREAMING", "1") != "0"
+# Panel telemetri di sidebar (latensi, token, biaya); aktifkan dengan AMIA_TELEMETRY_PANEL=1
+TELEMETRY_PANEL_ENABLED = os.getenv("AMIA_TELEMETRY_PANEL", "0") == "1"
+# Jumlah pesan terakhir yang dirender per rerun; pesan lebih lama dimuat per halaman lewat tombol
+HISTORY_WINDOW = int(os.getenv("AMIA_HISTORY_WINDOW", "20"))
+SIDEBAR_QUESTIONS = 10
+
 # --- FUNGSI-FUNGSI UTAMA & TOOLS ---
 @st.cache_resource
 def init_retriever():
     """Menginisialisasi retriever dan menyimpannya di cache Streamlit untuk efisiensi."""
-    return FaissRetriever(
-        csv_path='data/Penyebab Kematian di Indonesia yang Dilaporkan - Clean.csv',
-        index_path='data/faiss_index.idx'
-    )
+    # Menunggu langkah pemanasan yang sedang berjalan, atau membangun retriever langsung jika belum dimulai
+    return get_warmup().result("retriever")
 
-def search_and_summarize_web(query: str) -> str:
-    """
-    Melakukan pencarian Google, membuka link teratas, membaca isinya,
-    dan merangkumnya untuk menjawab pertanyaan pengguna.
-    """
-    try:
-        print(f"Melakukan pencarian Google untuk '{query}'...")
-        search_results = list(search(query, num_results=1, lang="id"))
-        
-        if not search_results:
-            return f"Maaf, tidak ada hasil relevan di Google untuk '{query}'.<<SOURCE:Google Search>>"
-
-        top_url = search_results[0]
-        print(f"Membaca konten dari: {top_url}")
-
-        loader = WebBaseLoader(web_paths=(top_url,), requests_kwargs={"verify": False})
-        docs = loader.load()
-
-        llm_summarizer = ChatGoogleGenerativeAI(
-            model='gemini-2.0-flash',
-            google_api_key=st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY"),
-            temperature=0
-        )
-        chain = load_summarize_chain(llm_summarizer, chain_type="stuff")
-        summary = chain.run(docs)
-        
-        response = (f"Berdasarkan informasi dari {top_url}, berikut adalah rangkumannya:\n\n"
-                    f"{summary}\n\n"
-                    "**Penting**: Informasi ini adalah rangkuman dari sumber eksternal dan bukan pengganti saran medis profesional.")
-        
-        return f"{response}<<SOURCE:Google Search - {top_url}>>"
-    except Exception as e:
-        return f"Terjadi kesalahan saat mencari dan merangkum dari internet: {str(e)}<<SOURCE:Error>>"
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """Store sesi bersama untuk semua pengguna di proses ini (batas jumlah sesi & sesi menganggur)."""
+    return SessionStore()
 
+@st.cache_data(show_spinner=False)
+def load_stylesheet(path: str, mtime: float) -> str:
+    """CSS dibaca sekali per versi file (mtime) lalu dipakai ulang di setiap rerun."""
+    with open(path) as f:
+        return f'<style>{f.read()}</style>'
 
-def run_agent(user_input: str, retriever: FaissRetriever, memory, pdf_content: str = None):
-    """Menginisialisasi dan menjalankan agent dengan instruksi yang disempurnakan."""
-    system_prompt = "Anda adalah AMIA (Asisten Medis AI), asisten AI yang cerdas, teliti, dan komunikatif. Jawab pertanyaan pengguna menggunakan alat yang tersedia atau informasi yang diberikan."
-    
-    # Logika mode dokumen eksklusif
-    if pdf_content:
-        system_prompt += f"\n\nPERHATIAN: Anda sekarang dalam 'Mode Dokumen'. Fokus utama Anda adalah menjawab pertanyaan HANYA berdasarkan 'KONTEKS DOKUMEN' di bawah ini. Jangan gunakan tools lain kecuali diminta secara eksplisit oleh pengguna. Selalu sebutkan nama pasien jika relevan.\n--- KONTEKS DOKUMEN ---\n{pdf_content}\n--- AKHIR KONTEKS ---"
-    
-    system_prompt += "\nPENTING: Jika observasi dari tool mengandung penanda '<<SOURCE:xyz>>', Anda WAJIB menyertakan penanda tersebut persis apa adanya di akhir jawaban final Anda."
+def current_session() -> ChatSession:
+    """State chat milik browser ini; st.session_state hanya menyimpan ID sesinya."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return get_session_store().get(st.session_state.session_id)
 
-    final_input = f"{system_prompt}\n\nPertanyaan: {user_input}"
-    
-    tools = [
-        Tool(name='pencarian_dan_rangkuman_internet', func=search_and_summarize_web, description="Gunakan untuk pertanyaan pengetahuan umum kesehatan, TIPS (seperti 'tips kesehatan kulit'), cara mengobati penyakit, atau berita kesehatan terbaru yang TIDAK ADA di database statistik."),
-        Tool(name='cari_info_dari_database_kesehatan', func=lambda q: get_medical_info(q, retriever), description="Gunakan untuk mencari informasi spesifik tentang PENYEBAB KEMATIAN dari database statistik."),
-        Tool(name='analisis_tren_statistik_penyakit', func=lambda q: analyze_cause_trend(q, retriever), description="Gunakan untuk menganalisis tren statistik dari satu jenis PENYEBAB KEMATIAN."),
-        Tool(name='cari_penyebab_kematian_tertinggi_atau_terendah_per_tahun', func=find_extremes_in_year, description="Gunakan untuk mencari penyebab kematian TERTINGGI atau TERENDAH pada SATU TAHUN spesifik."),
-        Tool(name='beri_rekomendasi_terkait_penyebab_kematian', func=lambda q: recommend_actions(q, retriever), description="Gunakan untuk memberikan rekomendasi kesehatan terkait JENIS PENYEBAB KEMATIAN atau BENCANA dari database."),
-        Tool(name='terjemah_istilah_medis', func=translate_medical_terms, description="Gunakan untuk menerjemahkan istilah medis. Format: 'teks to bahasa_tujuan'."),
-    ]
-    
+def run_agent(user_input: str, retriever: "FaissRetriever", memory, pdf_content: str = None, callbacks: list = None,
+              document_index: "DocumentIndex" = None):
+    """
+    Menjalankan agent untuk satu pertanyaan. Klien LLM, tools, dan agent dibuat sekali per proses
+    (lihat agent_factory.py); di sini hanya memory sesi dan konteks dokumen yang berganti.
+    """
+    from agent_factory import run_agent_turn
     try:
-        google_api_key = st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
-        if not google_api_key: raise ValueError("GOOGLE_API_KEY tidak ditemukan.")
-        llm = ChatGoogleGenerativeAI(model='gemini-2.0-flash', google_api_key=google_api_key, temperature=0.2)
-        agent = initialize_agent(tools, llm, agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION, memory=memory, verbose=True, handle_parsing_errors="Maaf, terjadi sedikit kendala.")
-        response = agent.run(final_input)
+        response, timings = run_agent_turn(user_input, retriever, memory, pdf_content=pdf_content, callbacks=callbacks,
+                                           document_index=document_index)
+        st.session_state.last_turn_timings = timings
         return response
     except Exception as e:
         st.error(f"Terjadi kesalahan saat menjalankan agent: {e}")
         return None
 
+def run_agent_streaming(user_input: str, retriever: "FaissRetriever", session: ChatSession):
+    """
+    Menjalankan agent sambil menampilkan status tool dan token jawaban secara bertahap
+    di bubble chat yang sedang aktif. Mengembalikan teks jawaban lengkap dari agent.
+    """
+    from streaming import StreamingChatHandler, split_source
+    status = st.status("AMIA sedang berpikir...", expanded=False)
+    placeholder = st.empty()
+    handler = StreamingChatHandler(
+        on_status=lambda text: status.update(label=text),
+        on_token=lambda _: placeholder.markdown(handler.text + "▌"),
+    )
+    response_text = run_agent(user_input, retriever, session.memory, pdf_content=session.pdf_content,
+                              callbacks=[handler], document_index=session.document_index)
+
+    metrics = handler.metrics()
+    ttft = f"{metrics['ttft_ms']:.0f} ms" if metrics['ttft_ms'] is not None else "-"
+    print(f"[AMIA] time-to-first-token {ttft}, total {metrics['total_ms']:.0f} ms")
+    if "last_turn_timings" in st.session_state:
+        st.session_state.last_turn_timings.update(metrics)
+
+    status.update(label="Selesai", state="complete" if response_text else "error")
+    # Jawaban final dari agent menjadi acuan (stream hanya untuk tampilan sementara)
+    display_text, _ = split_source(response_text)
+    placeholder.markdown(display_text or handler.text)
+    return response_text
+
+def render_telemetry_panel():
+    """Menampilkan rincian giliran terakhir dan total token/biaya proses di sidebar."""
+    from answer_cache import get_answer_cache
+    from intent_router import get_intent_router
+    with st.expander("📈 Telemetri"):
+        timings = st.session_state.get("last_turn_timings")
+        if not timings:
+            st.write("Belum ada giliran yang tercatat.")
+        else:
+            turn = timings.get('telemetry', {})
+            st.markdown(f"**Giliran terakhir:** {timings['total_ms']:.0f} ms")
+            st.caption(f"Setup {timings['setup_ms']:.0f} ms · LLM {turn.get('llm_ms', 0):.0f} ms "
+                       f"({turn.get('llm_calls', 0)}x) · Tool {turn.get('tool_ms', 0):.0f} ms ({turn.get('tool_calls', 0)}x)")
+            if timings.get('ttft_ms') is not None:
+                st.caption(f"Token pertama {timings['ttft_ms']:.0f} ms")
+            if timings.get('router'):
+                st.caption(f"Dijawab langsung oleh router intent '{timings['router']['intent']}' tanpa LLM")
+            if timings.get('cache'):
+                st.caption(f"Dijawab dari cache (kemiripan {timings['cache']['similarity']:.2f}), hemat ~{timings['cache']['saved_ms']:.0f} ms")
+            st.caption(f"Token {turn.get('input_tokens', 0)} masuk / {turn.get('output_tokens', 0)} keluar · ${turn.get('cost_usd', 0):.5f}")
+        telemetry = get_telemetry()
+        if telemetry is not None:
+            totals = telemetry.summary()
+            st.caption(f"Total proses: {totals.get('amia_llm_input_tokens_total', 0) + totals.get('amia_llm_output_tokens_total', 0):.0f} token, "
+                       f"${totals.get('amia_llm_cost_usd_total', 0):.4f}")
+        router = get_intent_router(init_retriever())
+        if router is not None and router.stats['questions']:
+            router_summary = router.summary()
+            st.caption(f"Router intent: {router_summary['routed_share']:.0%} dari {router_summary['questions']} pertanyaan dijawab tanpa LLM")
+        answer_cache = get_answer_cache(init_retriever())
+        if answer_cache is not None and answer_cache.stats['lookups']:
+            cache_summary = answer_cache.summary()
+            st.caption(f"Cache jawaban: {cache_summary['hit_rate']:.0%} hit dari {cache_summary['lookups']} pertanyaan, "
+                       f"hemat ~{cache_summary['saved_ms'] / 1000:.1f} detik")
+
+def render_message(message: dict):
+    avatar = "🧑‍💻" if message["role"] == "user" else "🩺"
+    with st.chat_message(message["role"], avatar=avatar):
+        st.markdown(message["content"])
+        if message.get("source"):
+            st.caption(f"Sumber Data: {message['source']}")
+
+def show_older_messages(session: ChatSession, limit: int):
+    session.history_limit = limit + HISTORY_WINDOW
+
+def render_history(session: ChatSession):
+    """Hanya jendela pesan terakhir yang dirender; pesan lebih lama disembunyikan sampai diminta."""
+    limit = session.history_limit or HISTORY_WINDOW
+    hidden = max(0, len(session.messages) - limit)
+    if session.dropped_messages:
+        st.caption(f"{session.dropped_messages} pesan terlama sudah dihapus dari sesi ini.")
+    if hidden:
+        # Callback dijalankan sebelum rerun berikutnya, sehingga jendela sudah melebar saat dirender
+        st.button(f"Muat pesan sebelumnya ({hidden} tersembunyi)", key="load_older_messages", type="tertiary",
+                  on_click=show_older_messages, args=(session, limit))
+    for message in session.messages[hidden:]:
+        render_message(message)
+
+def render_question_list(session: ChatSession):
+    # Riwayat hanya menampilkan pertanyaan pengguna terakhir
+    with st.expander("📜 Riwayat Pertanyaan Anda"):
+        user_questions = session.user_questions(SIDEBAR_QUESTIONS)
+        if not user_questions:
+            st.write("Belum ada pertanyaan.")
+        else:
+            for question in user_questions:
+                st.markdown(f"*{question[:50]}...*")
+
 # --- APLIKASI UTAMA STREAMLIT ---
 def main():
     st.set_page_config(page_title="AMIA - Asisten Medis AI", page_icon="🩺", layout="centered")
     try:
-        with open('style.css') as f:
-            st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+        st.markdown(load_stylesheet('style.css', os.path.getmtime('style.css')), unsafe_allow_html=True)
     except FileNotFoundError: st.warning("File 'style.css' tidak ditemukan.")
 
     st.markdown("<header><h1>🩺 AMIA</h1><h2>Asisten Medis AI</h2></header>", unsafe_allow_html=True)
     
-    # Inisialisasi state sesi jika belum ada
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-    if "memory" not in st.session_state:
-        st.session_state.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-    if "pdf_content" not in st.session_state:
-        st.session_state.pdf_content = None
-    if "processed_file_name" not in st.session_state:
-        st.session_state.processed_file_name = None
-
-    retriever = init_retriever()
+    # State percakapan disimpan di SessionStore per proses (lihat session_store.py)
+    session = current_session()
+    # Retriever, agent, dan klien disiapkan di latar; diambil (atau ditunggu) saat pertama dibutuhkan
+    warmup = start_warmup()
 
     # --- Sidebar ---
+    # Semua perubahan state di sidebar terjadi sebelum riwayat dirender, sehingga tidak perlu st.rerun()
     with st.sidebar:
+        if warmup.running:
+            st.caption("⏳ Menyiapkan database dan model di latar belakang...")
         st.header("Analisis Dokumen")
         uploaded_file = st.file_uploader("Upload PDF Rekam Medis", type=['pdf'], key="pdf_uploader")
         
         # Logika untuk memproses file BARU
-        if uploaded_file and uploaded_file.name != st.session_state.processed_file_name:
+        if uploaded_file and uploaded_file.name != session.processed_file_name:
+            from document_index import DocumentIndex
+            from medical_document_processor import extract_medical_document
             with st.spinner("Memproses..."):
                 doc_info = extract_medical_document(uploaded_file)
-                st.session_state.pdf_content = doc_info.get('full_text')
-                st.session_state.processed_file_name = uploaded_file.name
-                st.toast(f"Dokumen '{uploaded_file.name}' berhasil dianalisis.", icon="✅")
-                # Hapus riwayat lama untuk memulai sesi chat dokumen yang baru
-                st.session_state.messages = []
-                st.session_state.memory.clear()
-                st.rerun()
+                content_hash = doc_info.get('content_hash')
+                if doc_info.get('error'):
+                    # Ekstraksi gagal: tetap di mode percakapan umum, tanpa konteks dokumen
+                    st.error(doc_info['error'])
+                    session.pdf_content = None
+                    session.document_index = None
+                    session.document_hash = None
+                    session.processed_file_name = uploaded_file.name
+                # File yang sama diunggah ulang dengan nama lain: indeks dan percakapan dokumen tetap dipakai
+                elif content_hash and content_hash == session.document_hash:
+                    session.processed_file_name = uploaded_file.name
+                    st.toast(f"Dokumen '{uploaded_file.name}' sama dengan dokumen sebelumnya.", icon="✅")
+                else:
+                    session.pdf_content = doc_info.get('full_text')
+                    # Dokumen dipotong dan di-embed sekali; setiap giliran hanya memakai potongan yang relevan
+                    try:
+                        session.document_index = DocumentIndex.from_document(doc_info, init_retriever())
+                    except Exception as e:
+                        print(f"Gagal membangun indeks dokumen, memakai teks lengkap: {e}")
+                        session.document_index = None
+                    session.document_hash = content_hash
+                    session.processed_file_name = uploaded_file.name
+                    st.toast(f"Dokumen '{uploaded_file.name}' berhasil dianalisis.", icon="✅")
+                    # Hapus riwayat lama untuk memulai sesi chat dokumen yang baru
+                    session.clear_chat()
         
         # Logika untuk mendeteksi file dihapus oleh pengguna via tombol 'x'
-        if uploaded_file is None and st.session_state.processed_file_name is not None:
+        if uploaded_file is None and session.processed_file_name is not None:
             st.toast("Dokumen dihapus. Mode kembali ke percakapan umum.", icon="📄")
-            st.session_state.pdf_content = None
-            st.session_state.processed_file_name = None
-            st.rerun()
+            session.pdf_content = None
+            session.document_index = None
+            session.document_hash = None
+            session.processed_file_name = None
 
         st.divider()
 
-        # Riwayat hanya menampilkan pertanyaan pengguna
-        with st.expander("📜 Riwayat Pertanyaan Anda"):
-            user_questions = [msg['content'] for msg in st.session_state.messages if msg.get("role") == "user"]
-            if not user_questions:
-                st.write("Belum ada pertanyaan.")
-            else:
-                for question in reversed(user_questions):
-                    st.markdown(f"*{question[:50]}...*")
+        # Diisi di akhir rerun agar pertanyaan/giliran terbaru langsung terlihat
+        question_list_slot = st.empty()
         
         # Tombol hanya menghapus riwayat chat
         if st.button("Hapus Riwayat Chat", type="secondary"):
-            st.session_state.messages = []
-            st.session_state.memory.clear()
+            session.clear_chat()
             st.toast("Riwayat percakapan dihapus.", icon="🗑️")
-            st.rerun()
+
+        telemetry_slot = st.empty() if TELEMETRY_PANEL_ENABLED else None
 
     # --- Tampilan Chat Utama ---
-    if not st.session_state.messages:
+    if not session.messages:
         initial_greeting = "Halo, saya **AMIA**. Silakan ajukan pertanyaan atau unggah dokumen di sidebar."
         with st.chat_message("assistant", avatar="🩺"):
             st.markdown(initial_greeting)
     
-    for message in st.session_state.messages:
-        avatar = "🧑‍💻" if message["role"] == "user" else "🩺"
-        with st.chat_message(message["role"], avatar=avatar):
-            st.markdown(message["content"])
-            if message.get("source"):
-                st.caption(f"Sumber Data: {message['source']}")
+    render_history(session)
 
     # --- Logika Input dan Respons ---
     if user_input := st.chat_input("Tanyakan sesuatu pada AMIA..."):
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        from streaming import split_source
+        session.add_message({"role": "user", "content": user_input})
         with st.chat_message("user", avatar="🧑‍💻"):
             st.markdown(user_input)
 
         with st.chat_message("assistant", avatar="🩺"):
-            with st.spinner("AMIA sedang berpikir..."):
-                response_text = run_agent(user_input, retriever, st.session_state.memory, pdf_content=st.session_state.pdf_content)
-                display_text, source = response_text, "AI Generative"
-                if response_text and "<<SOURCE:" in response_text:
-                    parts = response_text.split("<<SOURCE:")
-                    display_text = parts[0].strip(); source = parts[1].replace(">>", "").strip()
-                
+            retriever = init_retriever()
+            if STREAMING_ENABLED:
+                response_text = run_agent_streaming(user_input, retriever, session)
+            else:
+                with st.spinner("AMIA sedang berpikir..."):
+                    response_text = run_agent(user_input, retriever, session.memory, pdf_content=session.pdf_content,
+                                              document_index=session.document_index)
+            display_text, source = split_source(response_text)
+
+            if not STREAMING_ENABLED:
                 st.markdown(display_text)
-                st.caption(f"Sumber Data: {source}")
-                st.session_state.messages.append({"role": "assistant", "content": display_text, "source": source})
-        st.rerun()
+            st.caption(f"Sumber Data: {source}")
+            session.add_message({"role": "assistant", "content": display_text, "source": source})
+        # Giliran baru sudah tampil di rerun ini; tidak ada st.rerun() kedua
+
+    with question_list_slot.container():
+        render_question_list(session)
+    if telemetry_slot is not None:
+        with telemetry_slot.container():
+            render_telemetry_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,88 +1,361 @@
 # File ini bertanggung jawab untuk memproses dokumen medis yang diunggah (PDF).
 
+import copy
+import hashlib
+import os
 import re
-from typing import Dict, Any
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Any, Iterator, Tuple
 import PyPDF2
 import io
 
+from cache_utils import LRUCache
+
+# Batas keamanan untuk file yang diunggah
+MAX_PDF_BYTES = 50 * 1024 * 1024
+MAX_PDF_PAGES = 2000
+# Dokumen dengan halaman lebih sedikit dari ini diekstrak serial (biaya start process pool lebih besar)
+PARALLEL_MIN_PAGES = 32
+PAGES_PER_TASK = 16
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Kumpulan pola regex untuk mencari informasi kunci.
+MEDICAL_INFO_PATTERNS = {
+    'diagnosa': r'(?i)diagnos[ai]s?[:\s]+([\w\s,.-]+)',
+    'riwayat_penyakit': r'(?i)riwayat penyakit[:\s]+([\w\s,.-]+)',
+    'obat_obatan': r'(?i)obat(?:-obatan)?[:\s]+([\w\s,.()-]+)',
+    'hasil_lab': r'(?i)hasil lab[:\s]+([\w\s,./<>-]+)',
+    'vital_signs': r'(?i)tanda vital|vital signs[:\s]+([\w\s,./=°]+)',
+    'rekomendasi': r'(?i)rekomendasi|saran[:\s]+([\w\s,.-]+)'
+}
+
+# Pola di atas dikompilasi sekali. Setiap match selalu diawali salah satu judul berikut, sehingga
+# semua posisi judul bisa dicari dalam satu sapuan lalu pola field dicocokkan hanya di posisi itu.
+MEDICAL_INFO_REGEXES = {key: re.compile(pattern) for key, pattern in MEDICAL_INFO_PATTERNS.items()}
+MEDICAL_SECTION_HEADERS = {
+    'diagnosa': r'diagnos[ai]',
+    'riwayat_penyakit': r'riwayat penyakit',
+    'obat_obatan': r'obat',
+    'hasil_lab': r'hasil lab',
+    'vital_signs': r'tanda vital|vital signs',
+    'rekomendasi': r'rekomendasi|saran',
+}
+# Lookahead agar judul yang saling tumpang tindih (mis. "obatanda vital") tetap ditemukan semua;
+# kelas huruf awal di depan mempercepat sapuan karena sebagian besar posisi langsung dilewati.
+MEDICAL_HEADER_SCANNER = re.compile(
+    r'(?i)(?=[dorhtvs])(?=' + '|'.join(f'(?P<{key}>{header})' for key, header in MEDICAL_SECTION_HEADERS.items()) + ')'
+)
+
+
+def _clean_value(found_group: str) -> str:
+    return found_group.strip().replace('\n', ' ').strip() if found_group else ""
+
+
+def iter_medical_matches(text: str, start: int = 0, positions: Dict[str, int] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Satu sapuan atas teks: menghasilkan (field, match) dengan hasil yang sama seperti
+    `re.finditer` per pola. `positions` menyimpan akhir match terakhir per field (tidak tumpang tindih).
+    """
+    positions = positions if positions is not None else {key: start for key in MEDICAL_INFO_REGEXES}
+    for header in MEDICAL_HEADER_SCANNER.finditer(text, start):
+        key = header.lastgroup
+        if header.start() < positions[key]:
+            continue
+        match = MEDICAL_INFO_REGEXES[key].match(text, header.start())
+        if match:
+            positions[key] = match.end()
+            yield key, match
+
+
+# Urutan prioritas jenis dokumen (yang pertama ditemukan menang)
+DOCUMENT_TYPE_PATTERNS = [
+    ("Hasil Laboratorium", re.compile(r'(?i)hasil\s+lab|laboratory\s+result')),
+    ("Resep Obat", re.compile(r'(?i)resep|prescription')),
+    ("Rekam Medis", re.compile(r'(?i)rekam\s+medis|medical\s+record')),
+    ("Surat Rujukan", re.compile(r'(?i)rujukan|referral')),
+]
+DEFAULT_DOCUMENT_TYPE = "Dokumen Medis Umum"
+
+# Cache hasil ekstraksi berdasarkan hash isi file (unggahan identik langsung dikembalikan)
+_extraction_cache = LRUCache(max_size=16)
+
 def extract_medical_info_from_text(text: str) -> Dict[str, Any]:
     """
     Mengekstrak informasi medis terstruktur dari sebuah string teks mentah
     menggunakan serangkaian pola Regular Expression (regex).
     """
-    medical_info = {
-        'diagnosa': [], 'riwayat_penyakit': [], 'obat_obatan': [],
-        'hasil_lab': [], 'vital_signs': [], 'rekomendasi': []
-    }
-    
-    # Kumpulan pola regex untuk mencari informasi kunci.
-    patterns = {
-        'diagnosa': r'(?i)diagnos[ai]s?[:\s]+([\w\s,.-]+)',
-        'riwayat_penyakit': r'(?i)riwayat penyakit[:\s]+([\w\s,.-]+)',
-        'obat_obatan': r'(?i)obat(?:-obatan)?[:\s]+([\w\s,.()-]+)',
-        'hasil_lab': r'(?i)hasil lab[:\s]+([\w\s,./<>-]+)',
-        'vital_signs': r'(?i)tanda vital|vital signs[:\s]+([\w\s,./=°]+)',
-        'rekomendasi': r'(?i)rekomendasi|saran[:\s]+([\w\s,.-]+)'
-    }
+    medical_info = {key: [] for key in MEDICAL_INFO_PATTERNS}
+    for key, match in iter_medical_matches(text):
+        # Grup bisa kosong (None), mis. judul "tanda vital" tanpa isi yang tertangkap
+        clean_text = _clean_value(match.group(1))
+        if clean_text: # Pastikan teks tidak hanya spasi kosong setelah dibersihkan
+            medical_info[key].append(clean_text)
+    return medical_info
 
-    for key, pattern in patterns.items():
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            # 1. Ambil grup yang cocok
-            found_group = match.group(1)
-            
-            # 2. Periksa apakah grup tersebut tidak kosong (bukan None) sebelum diproses
-            if found_group:
-                clean_text = found_group.strip().replace('\n', ' ').strip()
-                if clean_text: # Pastikan teks tidak hanya spasi kosong setelah dibersihkan
-                    medical_info[key].append(clean_text)
-    
+
+def extract_medical_info_with_offsets(text: str) -> Dict[str, Any]:
+    """
+    Sama seperti extract_medical_info_from_text, tetapi setiap nilai disertai posisinya di teks:
+    `start` (awal judul), `value_start`/`value_end` (rentang isi sebelum dibersihkan).
+    """
+    medical_info = {key: [] for key in MEDICAL_INFO_PATTERNS}
+    for key, match in iter_medical_matches(text):
+        clean_text = _clean_value(match.group(1))
+        if clean_text:
+            medical_info[key].append({
+                'text': clean_text,
+                'start': match.start(),
+                'value_start': match.start(1),
+                'value_end': match.end(1),
+            })
     return medical_info
 
 
-def extract_medical_document(uploaded_file) -> Dict[str, Any]:
+class StreamingMedicalInfoExtractor:
+    """
+    Versi bertahap dari extract_medical_info_from_text: teks halaman dimasukkan satu per satu
+    lewat `feed`, dan hasil akhir dari `finish` sama dengan memproses teks lengkap sekaligus.
+
+    Match yang masih bisa berubah karena teks belum lengkap ditunda sampai halaman berikutnya.
+    """
+
+    def __init__(self) -> None:
+        self.medical_info = {key: [] for key in MEDICAL_INFO_PATTERNS}
+        self._buffer = ""
+        self._offset = 0
+        self._positions = {key: 0 for key in MEDICAL_INFO_PATTERNS}
+
+    def feed(self, text: str) -> None:
+        self._buffer += text
+        self._scan(final=False)
+
+    def finish(self) -> Dict[str, Any]:
+        self._scan(final=True)
+        return self.medical_info
+
+    def _scan(self, final: bool) -> None:
+        # Hasil sebuah percobaan match baru bisa berubah jika percobaan itu menyentuh deretan pemisah
+        # [:\s] di ujung buffer (regex mundur karena teks habis). Match yang berakhir sebelum deretan
+        # itu sudah final; percobaan yang gagal sebelum `safe_end` (panjang judul <= 20) juga final.
+        end = len(self._buffer)
+        trailing_start = end
+        while trailing_start > 0 and (self._buffer[trailing_start - 1] == ':' or self._buffer[trailing_start - 1].isspace()):
+            trailing_start -= 1
+        safe_end = max(0, trailing_start - 20)
+
+        positions = {key: pos - self._offset for key, pos in self._positions.items()}
+        deferred = {}
+        for header in MEDICAL_HEADER_SCANNER.finditer(self._buffer, min(positions.values())):
+            key = header.lastgroup
+            if key in deferred or header.start() < positions[key]:
+                continue
+            match = MEDICAL_INFO_REGEXES[key].match(self._buffer, header.start())
+            if not match:
+                continue
+            if not final and match.end() >= trailing_start:
+                deferred[key] = match.start()
+                continue
+            clean_text = _clean_value(match.group(1))
+            if clean_text:
+                self.medical_info[key].append(clean_text)
+            positions[key] = match.end()
+
+        for key, pos in positions.items():
+            resume = min(deferred.get(key, safe_end), safe_end)
+            self._positions[key] = max(pos, resume) + self._offset
+
+        # Buang bagian buffer yang sudah tidak akan dipindai lagi oleh pola mana pun
+        settled = min(self._positions.values()) - self._offset
+        if settled > 0:
+            self._buffer = self._buffer[settled:]
+            self._offset += settled
+
+
+class DocumentTypeClassifier:
+    """Menentukan jenis dokumen secara bertahap per halaman dengan prioritas yang sama seperti sebelumnya."""
+
+    TAIL_CHARS = 64
+
+    def __init__(self) -> None:
+        self._found = set()
+        self._tail = ""
+
+    def feed(self, text: str) -> None:
+        window = self._tail + text
+        for doc_type, pattern in DOCUMENT_TYPE_PATTERNS:
+            if doc_type not in self._found and pattern.search(window):
+                self._found.add(doc_type)
+        # Simpan ekor teks agar kata kunci yang terpotong antarhalaman tetap terdeteksi
+        self._tail = window[-self.TAIL_CHARS:]
+
+    @property
+    def document_type(self) -> str:
+        for doc_type, _ in DOCUMENT_TYPE_PATTERNS:
+            if doc_type in self._found:
+                return doc_type
+        return DEFAULT_DOCUMENT_TYPE
+
+
+# --- Ekstraksi halaman paralel ---
+# Pool dibuat sekali per proses saat dokumen besar pertama diunggah. Worker memakai start method
+# "spawn": fork dari proses Streamlit/warmup yang multi-thread berisiko deadlock.
+_pool = None
+_pool_lock = threading.Lock()
+# (path, PdfReader) terakhir di proses worker; tugas berikutnya untuk file yang sama tidak mem-parse ulang
+# (PdfReader baru harus meratakan pohon halaman lagi). Dilepas setelah gelombang tugas terakhir file itu.
+_worker_pdf = (None, None)
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=get_context("spawn"))
+        return _pool
+
+def _extract_page_range(pdf_path: str, start: int, end: int, release: bool = False) -> list:
+    """
+    Dijalankan di proses worker: PDF dibaca dari file sementara, bukan dikirim sebagai bytes.
+    `release` menandai rentang di gelombang terakhir; setelahnya reader dilepas agar worker yang
+    menganggur tidak menahan PDF (hingga 50 MB) di memori.
+    """
+    global _worker_pdf
+    path, reader = _worker_pdf
+    if path != pdf_path:
+        _worker_pdf = (None, None)
+        reader = PyPDF2.PdfReader(pdf_path)
+        _worker_pdf = (pdf_path, reader)
+    try:
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+    finally:
+        if release:
+            _worker_pdf = (None, None)
+
+def iter_page_texts(pdf_bytes: bytes, pdf_reader: PyPDF2.PdfReader = None, parallel: bool = None) -> Iterator[Tuple[int, str]]:
+    """
+    Menghasilkan (nomor halaman, teks) secara berurutan. Dokumen besar diekstrak paralel
+    dengan process pool bersama; halaman awal sudah bisa diproses sebelum halaman akhir selesai.
+    """
+    pdf_reader = pdf_reader or PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    total_pages = len(pdf_reader.pages)
+    if parallel is None:
+        parallel = total_pages >= PARALLEL_MIN_PAGES and MAX_WORKERS > 1
+
+    futures = None
+    pdf_path = None
+    if parallel:
+        try:
+            # Worker menerima path file sementara dan rentang halaman, bukan salinan PDF hingga 50 MB
+            with tempfile.NamedTemporaryFile(suffix=".pdf", prefix="amia-", delete=False) as f:
+                pdf_path = f.name
+                f.write(pdf_bytes)
+            pool = _get_pool()
+            starts = range(0, total_pages, PAGES_PER_TASK)
+            # Setiap worker yang masih aktif mengambil kira-kira satu rentang dari MAX_WORKERS rentang terakhir
+            final_wave = len(starts) - MAX_WORKERS
+            futures = [pool.submit(_extract_page_range, pdf_path, start, min(start + PAGES_PER_TASK, total_pages),
+                                   index >= final_wave)
+                       for index, start in enumerate(starts)]
+        except Exception as e:
+            print(f"Process pool tidak tersedia, ekstraksi serial: {e}")
+            for future in futures or []:
+                future.cancel()
+            futures = None
+
+    try:
+        if futures is None:
+            for page_number, page in enumerate(pdf_reader.pages, 1):
+                yield page_number, page.extract_text() or ""
+            return
+
+        page_number = 0
+        for future in futures:
+            for page_text in future.result():
+                page_number += 1
+                yield page_number, page_text
+    finally:
+        # Tugas yang belum mulai dibatalkan; pool tetap hidup untuk unggahan berikutnya
+        for future in futures or []:
+            future.cancel()
+        if pdf_path is not None:
+            try:
+                os.remove(pdf_path)
+            except OSError:
+                pass
+
+
+def _read_upload(uploaded_file) -> bytes:
+    if isinstance(uploaded_file, (bytes, bytearray)):
+        return bytes(uploaded_file)
+    if hasattr(uploaded_file, 'getvalue'):
+        return uploaded_file.getvalue()
+    return uploaded_file.read()
+
+
+def _error_result(message: str) -> Dict[str, Any]:
+    return {
+        'error': message,
+        'document_type': "Error",
+        'metadata': {},
+        'medical_info': {},
+        'full_text': "",
+        'pages': []
+    }
+
+
+def extract_medical_document(uploaded_file, parallel: bool = None, use_cache: bool = True) -> Dict[str, Any]:
     """
     Membaca file PDF yang diunggah, mengekstrak metadata dan teks lengkap,
     lalu memproses teks untuk mendapatkan informasi terstruktur.
+
+    Halaman diekstrak sebagai stream (paralel untuk dokumen besar); klasifikasi jenis dokumen
+    dan ekstraksi info medis berjalan bersamaan per halaman. Hasil di-cache berdasarkan hash isi.
     """
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-        
+        pdf_bytes = _read_upload(uploaded_file)
+        if len(pdf_bytes) > MAX_PDF_BYTES:
+            return _error_result(f"Ukuran file ({len(pdf_bytes) / 1024 / 1024:.1f} MB) melebihi batas {MAX_PDF_BYTES // 1024 // 1024} MB.")
+
+        content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        cached = _extraction_cache.get(content_hash) if use_cache else None
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        if len(pdf_reader.pages) > MAX_PDF_PAGES:
+            return _error_result(f"Jumlah halaman ({len(pdf_reader.pages)}) melebihi batas {MAX_PDF_PAGES} halaman.")
+
         metadata = {
             'total_pages': len(pdf_reader.pages),
-            'document_info': pdf_reader.metadata or {},
+            # Dict string biasa (bukan objek PyPDF2 yang merujuk reader) agar aman disalin dari cache
+            'document_info': {str(key): str(value) for key, value in (pdf_reader.metadata or {}).items()},
         }
-        
-        full_text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
+
+        text_parts = []
+        pages = []
+        classifier = DocumentTypeClassifier()
+        info_extractor = StreamingMedicalInfoExtractor()
+        for page_number, page_text in iter_page_texts(pdf_bytes, pdf_reader, parallel=parallel):
             if page_text:
-                full_text += page_text + "\n"
-        
-        doc_type = "Dokumen Medis Umum"
-        if re.search(r'(?i)hasil\s+lab|laboratory\s+result', full_text):
-            doc_type = "Hasil Laboratorium"
-        elif re.search(r'(?i)resep|prescription', full_text):
-            doc_type = "Resep Obat"
-        elif re.search(r'(?i)rekam\s+medis|medical\s+record', full_text):
-            doc_type = "Rekam Medis"
-        elif re.search(r'(?i)rujukan|referral', full_text):
-            doc_type = "Surat Rujukan"
-            
-        medical_info = extract_medical_info_from_text(full_text)
-        
-        return {
-            'document_type': doc_type,
+                text_parts.append(page_text + "\n")
+                pages.append({'page': page_number, 'text': page_text})
+                classifier.feed(page_text + "\n")
+                info_extractor.feed(page_text + "\n")
+        full_text = "".join(text_parts)
+
+        result = {
+            'document_type': classifier.document_type,
             'metadata': metadata,
-            'medical_info': medical_info,
-            'full_text': full_text
+            'medical_info': info_extractor.finish(),
+            'full_text': full_text,
+            'pages': pages,
+            'content_hash': content_hash
         }
+        if use_cache:
+            _extraction_cache.put(content_hash, result)
+        return copy.deepcopy(result)
 
     except Exception as e:
-        return {
-            'error': f"Gagal memproses file PDF: {e}",
-            'document_type': "Error",
-            'metadata': {},
-            'medical_info': {},
-            'full_text': ""
-        }
\ No newline at end of file
+        return _error_result(f"Gagal memproses file PDF: {e}")
@@ -0,0 +1,197 @@
+# Berisi eksekusi tool paralel untuk pertanyaan multi-bagian: agent dapat mengirim beberapa panggilan
+# tool independen dalam satu langkah lewat satu tool gabungan, lalu panggilan dijalankan bersamaan di
+# thread pool dan observasinya digabung kembali. Retrieval dalam satu giliran memakai cache bersama
+# (single-flight), sehingga sub-query yang sama hanya di-embed dan dicari sekali.
+
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from embedding_cache import normalize_query
+
+PARALLEL_TOOLS_ENABLED = os.getenv("AMIA_PARALLEL_TOOLS", "1") != "0"
+PARALLEL_TOOL_NAME = "jalankan_beberapa_tool_paralel"
+DEFAULT_WORKERS = int(os.getenv("AMIA_PARALLEL_TOOL_WORKERS", "4"))
+MAX_CALLS = 6
+PARALLEL_TOOL_DESCRIPTION = (
+    "Gunakan jika pertanyaan terdiri dari BEBERAPA bagian yang tidak saling bergantung (mis. 'bandingkan tren TBC "
+    "dan AIDS lalu beri rekomendasi'), agar semua tool dijalankan sekaligus. Input berupa JSON list, contoh: "
+    # Kurung kurawal digandakan karena deskripsi tool disisipkan ke template prompt agent
+    '[{{"tool": "analisis_tren_statistik_penyakit", "input": "tbc"}}, '
+    '{{"tool": "beri_rekomendasi_terkait_penyebab_kematian", "input": "aids"}}]. '
+    f"Maksimal {MAX_CALLS} panggilan.")
+
+# Panggilan "nama_tool: input" per baris diterima sebagai alternatif JSON
+LINE_CALL_PATTERN = re.compile(r'^\s*[-*]?\s*([a-z_]+)\s*[:=]\s*(.+?)\s*$')
+
+
+class TurnRetrievalCache:
+    """
+    Pembungkus retriever untuk satu giliran. `get_relevant` dan `embed_query` dengan argumen yang sama
+    dihitung sekali walaupun dipanggil bersamaan dari beberapa thread (pemanggil lain menunggu hasil
+    yang sama). Atribut lain (mis. `lexical`) diteruskan ke retriever asli.
+    """
+
+    def __init__(self, retriever) -> None:
+        self.retriever = retriever
+        self._lock = threading.Lock()
+        self._results: Dict[tuple, Future] = {}
+        self.stats = {"requests": 0, "computed": 0, "shared": 0}
+
+    def _single_flight(self, key: tuple, compute: Callable):
+        with self._lock:
+            self.stats["requests"] += 1
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+                self.stats["computed"] += 1
+            else:
+                self.stats["shared"] += 1
+        if owner:
+            try:
+                future.set_result(compute())
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+    def get_relevant(self, query: str, k: int = 5, **filters) -> list:
+        key = ("get_relevant", normalize_query(query), k, tuple(sorted((name, repr(value)) for name, value in filters.items())))
+        results = self._single_flight(key, lambda: self.retriever.get_relevant(query, k, **filters))
+        # Salinan per pemanggil agar tool yang mengubah dict hasil tidak memengaruhi tool lain
+        return [dict(item) for item in results]
+
+    def embed_query(self, query: str) -> list:
+        return self._single_flight(("embed_query", normalize_query(query)), lambda: self.retriever.embed_query(query))
+
+    def __getattr__(self, name: str):
+        return getattr(self.retriever, name)
+
+
+_turn_cache: contextvars.ContextVar = contextvars.ContextVar("amia_turn_retrieval", default=None)
+
+
+@contextmanager
+def turn_retrieval_scope(retriever):
+    """Mengaktifkan TurnRetrievalCache selama satu giliran agent (thread ini dan panggilan paralelnya)."""
+    cache = TurnRetrievalCache(retriever)
+    token = _turn_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _turn_cache.reset(token)
+
+
+def turn_retriever(retriever):
+    """Retriever yang dipakai tool: cache giliran aktif untuk retriever ini, atau retriever itu sendiri."""
+    cache = _turn_cache.get()
+    if cache is not None and cache.retriever is retriever:
+        return cache
+    return retriever
+
+
+def parse_tool_calls(text: str, tool_names) -> List[Tuple[str, str]]:
+    """Membaca daftar (nama_tool, input) dari JSON list atau baris "nama_tool: input"."""
+    text = text.strip().strip('`')
+    if text.startswith('json'):
+        text = text[4:]
+    try:
+        items = json.loads(text)
+        if isinstance(items, dict):
+            items = [items]
+        calls = [(str(item["tool"]).strip(), str(item["input"]).strip()) for item in items]
+    except (ValueError, KeyError, TypeError):
+        calls = [match.groups() for match in map(LINE_CALL_PATTERN.match, text.splitlines()) if match]
+    if not calls:
+        raise ValueError("Format tidak dikenali. Gunakan JSON list berisi objek {\"tool\": ..., \"input\": ...}.")
+    unknown = [name for name, _ in calls if name not in tool_names]
+    if unknown:
+        raise ValueError(f"Tool tidak dikenal: {', '.join(unknown)}. Pilihan: {', '.join(sorted(tool_names))}.")
+    if len(calls) > MAX_CALLS:
+        raise ValueError(f"Terlalu banyak panggilan ({len(calls)}), maksimal {MAX_CALLS}.")
+    # Panggilan identik cukup dijalankan sekali
+    return list(dict.fromkeys(calls))
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="amia-tool")
+    return _pool
+
+
+def _timed_call(func: Callable[[str], str], tool_input: str) -> Tuple[str, float]:
+    started = time.perf_counter()
+    try:
+        observation = func(tool_input)
+    except Exception as e:
+        observation = f"Error: {e!r}"
+    return observation, (time.perf_counter() - started) * 1000
+
+
+def run_tool_calls(calls: List[Tuple[str, str]], tools: Dict[str, Callable[[str], str]],
+                   parallel: bool = True) -> Tuple[List[str], Dict]:
+    """
+    Menjalankan panggilan tool (paralel atau berurutan) dan mengembalikan (observasi, laporan).
+    Laporan berisi waktu dinding, jumlah durasi per panggilan (perkiraan jalur berurutan), dan selisihnya.
+    Setiap panggilan berjalan dalam salinan context pemanggil, sehingga cache retrieval giliran ikut terpakai.
+    """
+    started = time.perf_counter()
+    if parallel and len(calls) > 1:
+        futures = [_get_pool().submit(contextvars.copy_context().run, _timed_call, tools[name], tool_input)
+                   for name, tool_input in calls]
+        outcomes = [future.result() for future in futures]
+    else:
+        outcomes = [_timed_call(tools[name], tool_input) for name, tool_input in calls]
+    wall_ms = (time.perf_counter() - started) * 1000
+    sequential_ms = sum(duration for _, duration in outcomes)
+    report = {
+        'calls': len(calls),
+        'wall_ms': round(wall_ms, 2),
+        'sequential_ms': round(sequential_ms, 2),
+        'saved_ms': round(max(0.0, sequential_ms - wall_ms), 2),
+        'per_call_ms': [round(duration, 2) for _, duration in outcomes],
+    }
+    return [observation for observation, _ in outcomes], report
+
+
+def merge_observations(calls: List[Tuple[str, str]], observations: List[str]) -> str:
+    """Menggabungkan observasi per panggilan dengan judul agar agent tahu asal setiap bagian."""
+    parts = [f"[{number}] {name} ({tool_input}):\n{observation}"
+             for number, ((name, tool_input), observation) in enumerate(zip(calls, observations), 1)]
+    return "\n\n".join(parts)
+
+
+class ParallelToolRunner:
+    """Fungsi tool gabungan untuk agent; `stats` mengakumulasi waktu yang dihemat dibanding jalur berurutan."""
+
+    def __init__(self, tools: Dict[str, Callable[[str], str]]) -> None:
+        self.tools = dict(tools)
+        self._lock = threading.Lock()
+        self.stats = {"batches": 0, "calls": 0, "wall_ms": 0.0, "sequential_ms": 0.0, "saved_ms": 0.0}
+
+    def __call__(self, text: str) -> str:
+        try:
+            calls = parse_tool_calls(text, self.tools)
+        except ValueError as e:
+            return f"Input {PARALLEL_TOOL_NAME} tidak valid: {e}"
+        observations, report = run_tool_calls(calls, self.tools)
+        with self._lock:
+            self.stats["batches"] += 1
+            for key in ("calls", "wall_ms", "sequential_ms", "saved_ms"):
+                self.stats[key] += report[key]
+        print(f"[AMIA] {report['calls']} tool paralel: {report['wall_ms']:.0f} ms "
+              f"(berurutan ~{report['sequential_ms']:.0f} ms, hemat {report['saved_ms']:.0f} ms)")
+        return merge_observations(calls, observations)
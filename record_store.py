@@ -0,0 +1,111 @@
+# Berisi penyimpanan metadata dataset secara kolumnar untuk retriever: kolom teks di-encode
+# sebagai kamus (kode int32 + daftar nilai unik), kolom angka sebagai array NumPy bertipe.
+# Menyediakan pengambilan banyak baris sekaligus (vectorized gather) dan filter tahun/tipe/penyebab.
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+YEAR_PATTERN = re.compile(r'\b(?:19|20)\d{2}\b')
+
+
+class RecordStore:
+    """
+    Pengganti DataFrame untuk akses per hasil pencarian. Kolom angka tanpa nilai kosong disimpan
+    apa adanya; kolom lain di-encode kamus dengan nilai kosong menjadi "" (sama seperti fillna("")).
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.columns: List[str] = list(df.columns)
+        self.num_rows = len(df)
+        self.numeric: Dict[str, np.ndarray] = {}
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, np.ndarray] = {}
+        for column in self.columns:
+            values = df[column]
+            if pd.api.types.is_numeric_dtype(values) and not values.isna().any():
+                self.numeric[column] = values.to_numpy()
+            else:
+                codes, uniques = pd.factorize(values.fillna("").astype(str))
+                self.codes[column] = codes.astype(np.int32)
+                self.categories[column] = np.asarray(uniques, dtype=object)
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> "RecordStore":
+        return cls(pd.read_csv(csv_path))
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def column(self, name: str) -> np.ndarray:
+        if name in self.numeric:
+            return self.numeric[name]
+        return self.categories[name][self.codes[name]]
+
+    def gather(self, rows: Iterable[int], fields: List[str] = None) -> List[dict]:
+        """Mengambil banyak baris sekaligus sebagai daftar dict (urutan sesuai `rows`)."""
+        rows = np.asarray(list(rows), dtype=np.int64)
+        fields = fields or self.columns
+        values = []
+        for field in fields:
+            if field in self.numeric:
+                values.append(self.numeric[field][rows].tolist())
+            else:
+                values.append(self.categories[field][self.codes[field][rows]].tolist())
+        return [dict(zip(fields, row_values)) for row_values in zip(*values)]
+
+    def record(self, row: int) -> dict:
+        return self.gather([row])[0]
+
+    # --- Filter ---
+    def _category_mask(self, column: str, wanted: Iterable[str]) -> np.ndarray:
+        wanted = {str(value).lower() for value in wanted}
+        matched = [code for code, value in enumerate(self.categories[column]) if value.lower() in wanted]
+        return np.isin(self.codes[column], matched)
+
+    def select(self, year_range: Tuple[Optional[int], Optional[int]] = None, types: Iterable[str] = None,
+               causes: Iterable[str] = None) -> Optional[np.ndarray]:
+        """
+        Mask boolean baris yang lolos filter (nama tipe/penyebab tidak peka huruf besar-kecil).
+        Mengembalikan None jika tidak ada filter sama sekali.
+        """
+        if not year_range and not types and not causes:
+            return None
+        mask = np.ones(self.num_rows, dtype=bool)
+        if year_range:
+            years = self.column('Year')
+            low, high = year_range
+            if low is not None:
+                mask &= years >= low
+            if high is not None:
+                mask &= years <= high
+        if types:
+            mask &= self._category_mask('Type', types)
+        if causes:
+            mask &= self._category_mask('Cause', causes)
+        return mask
+
+    def infer_filters(self, query: str) -> dict:
+        """
+        Menebak filter dari teks pertanyaan: tahun yang ada di dataset (mis. "AIDS tahun 2010")
+        dan nama tipe yang disebut utuh (mis. "bencana alam"). Hanya untuk query berbahasa bebas.
+        """
+        filters = {}
+        known_years = set(np.unique(self.column('Year')).tolist())
+        years = sorted({int(year) for year in YEAR_PATTERN.findall(query)} & known_years)
+        if years:
+            filters['year_range'] = (years[0], years[-1])
+        lowered = f" {' '.join(re.findall(r'[a-z0-9]+', query.lower()))} "
+        types = [type_ for type_ in self.categories.get('Type', []) if type_ and f" {type_.lower()} " in lowered]
+        if types:
+            filters['types'] = types
+        return filters
+
+    def memory_bytes(self) -> int:
+        """Perkiraan memori kolom (kode + nilai unik) dalam byte."""
+        total = sum(array.nbytes for array in self.numeric.values()) + sum(array.nbytes for array in self.codes.values())
+        for uniques in self.categories.values():
+            total += uniques.nbytes + sum(len(value.encode("utf-8")) + 49 for value in uniques)
+        return total
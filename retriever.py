@@ -3,50 +3,146 @@
 import os
 import pandas as pd
 import numpy as np
-import faiss
-from langchain_community.embeddings import CohereEmbeddings
 from dotenv import load_dotenv
-import streamlit as st
+
+from config import get_secret
+from embedding_cache import QueryEmbeddingCache
+from index_factory import filtered_search, load_index, manifest_index_spec, prepare_vectors, similarity_to_distance
+from index_manifest import build_combined_texts, load_manifest, manifest_path_for, row_hash
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from record_store import RecordStore
+
+CSV_PATH = 'data/Penyebab Kematian di Indonesia yang Dilaporkan - Clean.csv'
+INDEX_PATH = 'data/faiss_index.idx'
+EMBEDDING_MODEL_NAME = "embed-multilingual-v3.0"
+# Jumlah kandidat dari masing-masing jalur (leksikal & vektor) sebelum digabung dengan RRF
+HYBRID_CANDIDATES = 20
+# Index dimuat dengan memory-map (halaman dibagi antar proses worker); AMIA_INDEX_MMAP=0 memuat penuh ke RAM
+INDEX_MMAP = os.getenv("AMIA_INDEX_MMAP", "1") != "0"
 
 class FaissRetriever:
-    def __init__(self, csv_path: str, index_path: str):
+    def __init__(self, csv_path: str, index_path: str, cache_dir: str = None, embedding_model=None):
+        """
+        `embedding_model` dapat diisi objek Embeddings lain (mis. embedding palsu untuk benchmark);
+        jika kosong dipakai CohereEmbeddings dengan API key dari Secrets/.env.
+        """
         load_dotenv()
-        
-        self.df = pd.read_csv(csv_path).fillna("")
-
-        # Logika baru yang lebih aman untuk mengambil API Key
-        cohere_api_key = None
-        # Cek jika st.secrets ada dan memiliki isi (berjalan di Streamlit Cloud)
-        if hasattr(st, 'secrets') and len(st.secrets) > 0:
-            print("Memuat Cohere API key dari Streamlit Secrets.")
-            cohere_api_key = st.secrets.get('COHERE_API_KEY')
-        # Jika tidak, ambil dari file .env (berjalan di lokal)
+        # Path sumber disimpan agar cache turunan (mis. cache jawaban) tahu kapan data berubah
+        self.csv_path = csv_path
+        self.index_path = index_path
+
+        # DataFrame hanya dipakai saat membangun indeks; metadata baris disimpan kolumnar di RecordStore
+        df = pd.read_csv(csv_path).fillna("")
+        self.records = RecordStore(df)
+        self.lexical = LexicalIndex(df)
+
+        if embedding_model is None:
+            embedding_model = self._create_cohere_embeddings()
+        self.embedding_model = embedding_model
+        model_name = getattr(embedding_model, 'model', None) or EMBEDDING_MODEL_NAME
+
+        # Cache embedding query (memori + disk), disimpan di sebelah file index secara default
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(index_path), 'embedding_cache')
+        self.embedding_cache = QueryEmbeddingCache(model_name=model_name, cache_dir=cache_dir)
+
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"File index FAISS tidak ditemukan di {index_path}. Jalankan create_index.py terlebih dahulu.")
+
+        # Index ber-ID (dibuat create_index.py inkremental) memakai manifest hash baris -> ID vektor.
+        # Index lama tanpa manifest memakai ID = posisi baris. Manifest juga mencatat tipe index & metriknya.
+        self.id_to_row = None
+        manifest = load_manifest(manifest_path_for(index_path))
+        self.index_spec = manifest_index_spec(manifest)
+        self.index = load_index(index_path, self.index_spec, mmap=INDEX_MMAP)
+        if manifest and manifest.get('rows'):
+            row_by_hash = {}
+            for position, text in enumerate(build_combined_texts(df)):
+                row_by_hash.setdefault(row_hash(text), position)
+            self.id_to_row = {vector_id: row_by_hash[h] for h, vector_id in manifest['rows'].items() if h in row_by_hash}
+
+        # Pasangan (ID vektor, baris) untuk menerjemahkan filter baris menjadi filter ID di FAISS
+        if self.id_to_row is not None:
+            self.vector_ids = np.fromiter(self.id_to_row.keys(), dtype='int64', count=len(self.id_to_row))
+            self.vector_rows = np.fromiter(self.id_to_row.values(), dtype='int64', count=len(self.id_to_row))
         else:
-            print("Memuat Cohere API key dari file .env lokal.")
-            cohere_api_key = os.getenv("COHERE_API_KEY")
-        
+            self.vector_ids = self.vector_rows = np.arange(min(self.index.ntotal, len(self.records)), dtype='int64')
+
+    @staticmethod
+    def _create_cohere_embeddings():
+        # Diimpor di sini: langchain_community hanya dimuat jika embedding Cohere benar-benar dipakai
+        from langchain_community.embeddings import CohereEmbeddings
+        # API key dari Streamlit Secrets (Streamlit Cloud) atau .env/environment (lokal & mode service)
+        cohere_api_key = get_secret('COHERE_API_KEY')
         if not cohere_api_key:
             raise ValueError("COHERE_API_KEY harus diset di .env (lokal) atau di Secrets (Streamlit Cloud)")
             
-        self.embedding_model = CohereEmbeddings(
+        return CohereEmbeddings(
             cohere_api_key=cohere_api_key,
-            model="embed-multilingual-v3.0",
+            model=EMBEDDING_MODEL_NAME,
             user_agent="medical-chatbot-agent"
         )
 
-        if os.path.exists(index_path):
-            self.index = faiss.read_index(index_path)
-        else:
-            raise FileNotFoundError(f"File index FAISS tidak ditemukan di {index_path}. Jalankan create_index.py terlebih dahulu.")
+    def embed_query(self, query: str) -> list:
+        """Mengembalikan embedding query, memakai cache sebelum memanggil Cohere."""
+        return self.embedding_cache.get_or_compute(query, self.embedding_model.embed_query)
 
-    def get_relevant(self, query: str, k: int = 5) -> list:
-        q_vec = self.embedding_model.embed_query(query)
-        distances, indices = self.index.search(np.array([q_vec], dtype='float32'), k)
-        results = []
-        for i in range(k):
+    def _vector_search(self, query: str, k: int, mask: np.ndarray = None) -> list:
+        """Mengembalikan daftar (posisi baris, jarak) dari pencarian vektor FAISS, opsional dibatasi `mask` baris."""
+        q_vec = prepare_vectors([self.embed_query(query)], self.index_spec)
+        if mask is None:
+            distances, indices = self.index.search(q_vec, k)
+        else:
+            allowed_ids = self.vector_ids[mask[self.vector_rows]]
+            if not len(allowed_ids):
+                return []
+            distances, indices = filtered_search(self.index, self.index_spec, q_vec, k, allowed_ids)
+        distances = similarity_to_distance(distances, self.index_spec)
+        hits = []
+        for i in range(len(indices[0])):
             idx = indices[0][i]
-            if 0 <= idx < len(self.df):
-                result_dict = self.df.iloc[idx].to_dict()
-                result_dict['distance'] = distances[0][i]
-                results.append(result_dict)
-        return results
\ No newline at end of file
+            if self.id_to_row is not None:
+                idx = self.id_to_row.get(int(idx), -1)
+            if 0 <= idx < len(self.records):
+                hits.append((int(idx), distances[0][i]))
+        return hits
+
+    def _build_results(self, hits: list) -> list:
+        """`hits` berisi (baris, distance, score); semua baris diambil sekaligus dari RecordStore."""
+        results = self.records.gather([row for row, _, _ in hits])
+        for result_dict, (_, distance, score) in zip(results, hits):
+            result_dict['distance'] = distance
+            if score is not None:
+                result_dict['score'] = score
+        return results
+
+    def get_relevant(self, query: str, k: int = 5, year_range: tuple = None, types: list = None,
+                     causes: list = None, infer_filters: bool = False) -> list:
+        """
+        Mencari baris paling relevan. Query yang menyebut nama penyebab secara persis
+        dijawab dari indeks leksikal tanpa embedding; selain itu hasil leksikal dan vektor
+        digabung dengan Reciprocal Rank Fusion.
+        Filter `year_range` (tahun_awal, tahun_akhir), `types`, dan `causes` diterapkan sebelum top-k
+        dipilih (di dalam FAISS untuk jalur vektor). Dengan `infer_filters`, tahun/tipe yang disebut
+        di query (mis. "AIDS tahun 2010") dipakai sebagai filter; jika hasilnya kosong, pencarian diulang tanpa filter itu.
+        """
+        filters = {'year_range': year_range, 'types': types, 'causes': causes}
+        if infer_filters:
+            inferred = {key: value for key, value in self.records.infer_filters(query).items() if not filters[key]}
+            if inferred:
+                results = self.get_relevant(query, k, **{**filters, **inferred})
+                if results:
+                    return results
+
+        mask = self.records.select(**filters)
+        lexical = self.lexical.search(query, limit=max(k, HYBRID_CANDIDATES), allowed=mask)
+        if lexical.exact:
+            return self._build_results([(row, None, score) for row, score in lexical.hits[:k]])
+
+        vector_hits = self._vector_search(query, max(k, HYBRID_CANDIDATES) if lexical.hits else k, mask)
+        if not lexical.hits:
+            return self._build_results([(row, distance, None) for row, distance in vector_hits[:k]])
+
+        distances = dict(vector_hits)
+        fused = reciprocal_rank_fusion([[row for row, _ in lexical.hits], [row for row, _ in vector_hits]])
+        return self._build_results([(row, distances.get(row), score) for row, score in fused[:k]])
@@ -0,0 +1,258 @@
+# Berisi mode service tanpa Streamlit: server HTTP/JSON berbasis asyncio dan mode batch JSONL.
+# Setiap giliran agent (loop ReAct + tools) dijalankan di thread pool berukuran tetap, dengan batas
+# antrean, timeout per request, memory per sesi, dan satu retriever bersama untuk semua request.
+#
+# Contoh:
+#   python service.py serve --port 8080
+#   curl -X POST localhost:8080/ask -d '{"question": "tren tbc", "session_id": "abc"}'
+#   python service.py batch pertanyaan.jsonl --output jawaban.jsonl
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from agent_factory import run_agent_turn
+from session_store import SessionStore
+from token_budget_memory import create_session_memory
+from warmup import get_warmup, start_warmup
+
+DEFAULT_CONCURRENCY = int(os.getenv("AMIA_SERVICE_CONCURRENCY", "4"))
+# Request yang menunggu slot eksekusi; lebih dari ini langsung ditolak (HTTP 503)
+DEFAULT_MAX_QUEUE = int(os.getenv("AMIA_SERVICE_MAX_QUEUE", "32"))
+DEFAULT_TIMEOUT = float(os.getenv("AMIA_SERVICE_TIMEOUT", "60"))
+MAX_SESSIONS = 1000
+MAX_BODY_BYTES = 64 * 1024
+
+HTTP_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+               504: "Gateway Timeout"}
+RESULT_STATUS_CODES = {"ok": 200, "error": 500, "overloaded": 503, "timeout": 504}
+
+
+class AgentService:
+    """
+    Menjalankan giliran agent secara konkuren untuk banyak sesi.
+    - `concurrency` giliran berjalan bersamaan di thread pool; `max_queue` request lain boleh menunggu.
+    - Giliran yang melewati `timeout` dijawab status "timeout". Jika belum mulai, giliran dibatalkan;
+      jika sudah berjalan, thread-nya tetap selesai di belakang (loop ReAct tidak bisa dihentikan di tengah).
+    - Giliran dalam satu sesi dijalankan berurutan karena memory sesi tidak thread-safe.
+    """
+
+    def __init__(self, retriever, concurrency: int = DEFAULT_CONCURRENCY, max_queue: int = DEFAULT_MAX_QUEUE,
+                 timeout: float = DEFAULT_TIMEOUT, memory_factory=create_session_memory) -> None:
+        self.retriever = retriever
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.memory_factory = memory_factory
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="amia-agent")
+        # Sesi dibatasi jumlahnya dan dibuang setelah menganggur (AMIA_SESSION_IDLE_MINUTES)
+        self._sessions = SessionStore(max_sessions=MAX_SESSIONS, factory=lambda: (self.memory_factory(), threading.Lock()))
+        self._admission: Optional[asyncio.Semaphore] = None
+        self.stats = {"requests": 0, "ok": 0, "error": 0, "timeout": 0, "overloaded": 0, "in_flight": 0}
+
+    def _session(self, session_id: str):
+        """(memory, lock) milik sesi; lock dipakai di thread agar giliran satu sesi berurutan."""
+        return self._sessions.get(session_id)
+
+    def _run_turn(self, question: str, session_id: str) -> tuple:
+        memory, lock = self._session(session_id)
+        with lock:
+            return run_agent_turn(question, self.retriever, memory)
+
+    async def ask(self, question: str, session_id: str = None, timeout: float = None) -> Dict:
+        """Menjawab satu pertanyaan; selalu mengembalikan dict berisi `status` (ok/error/timeout/overloaded)."""
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.concurrency + self.max_queue)
+        session_id = session_id or uuid.uuid4().hex
+        result = {"session_id": session_id}
+        self.stats["requests"] += 1
+        if self._admission.locked():
+            self.stats["overloaded"] += 1
+            return dict(result, status="overloaded", error="Antrean penuh, coba lagi nanti.")
+
+        started = time.perf_counter()
+        async with self._admission:
+            self.stats["in_flight"] += 1
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._pool, self._run_turn, question, session_id)
+            try:
+                answer, timings = await asyncio.wait_for(future, timeout or self.timeout)
+                result.update(status="ok", answer=answer, timings=_jsonable(timings))
+            except asyncio.TimeoutError:
+                result.update(status="timeout", error=f"Melebihi batas waktu {timeout or self.timeout:.0f} detik.")
+            except Exception as e:
+                result.update(status="error", error=repr(e))
+            finally:
+                self.stats["in_flight"] -= 1
+        self.stats[result["status"]] += 1
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _jsonable(value):
+    """Mengubah nilai numpy/objek lain di timings menjadi tipe JSON."""
+    return json.loads(json.dumps(value, default=lambda obj: obj.item() if hasattr(obj, "item") else str(obj)))
+
+
+# --- HTTP ---
+async def _read_request(reader: asyncio.StreamReader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    method, path, _ = request_line.split(" ", 2)
+    headers = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        return method, path, None
+    body = await reader.readexactly(length) if length else b""
+    return method, path, body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload: Dict) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+
+
+async def handle_http(service: AgentService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Satu request per koneksi: POST /ask, GET /health, GET /ready, GET /stats."""
+    try:
+        try:
+            method, path, body = await asyncio.wait_for(_read_request(reader), 10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+            _write_response(writer, 400, {"error": "Request HTTP tidak valid."})
+            return
+        if path == "/health":
+            _write_response(writer, 200, {"status": "ok"})
+        elif path == "/ready":
+            # 503 jika pemanasan (retriever, agent, tabel statistik, klien) belum dimulai, masih berjalan,
+            # atau ada langkah yang gagal (peta "errors"), agar load balancer tidak mengirim trafik ke sini
+            warmup = get_warmup().status()
+            _write_response(writer, 200 if warmup["ready"] else 503, warmup)
+        elif path == "/stats":
+            _write_response(writer, 200, service.stats)
+        elif path != "/ask":
+            _write_response(writer, 404, {"error": f"Path {path} tidak dikenal."})
+        elif method != "POST":
+            _write_response(writer, 405, {"error": "Gunakan POST."})
+        elif body is None:
+            _write_response(writer, 413, {"error": "Body terlalu besar."})
+        else:
+            try:
+                payload = json.loads(body or b"{}")
+                question = str(payload["question"]).strip()
+                if not question:
+                    raise ValueError
+            except (ValueError, KeyError, TypeError):
+                _write_response(writer, 400, {"error": "Body harus JSON dengan field 'question'."})
+                return
+            result = await service.ask(question, payload.get("session_id"), payload.get("timeout"))
+            _write_response(writer, RESULT_STATUS_CODES[result["status"]], result)
+    finally:
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def start_server(service: AgentService, host: str, port: int) -> asyncio.AbstractServer:
+    server = await asyncio.start_server(lambda r, w: handle_http(service, r, w), host, port)
+    print(f"[AMIA] service berjalan di http://{host}:{server.sockets[0].getsockname()[1]} "
+          f"(konkurensi {service.concurrency}, antrean {service.max_queue}, timeout {service.timeout:.0f} detik)")
+    return server
+
+
+async def serve(service: AgentService, host: str, port: int) -> None:
+    server = await start_server(service, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+# --- Batch JSONL ---
+async def run_batch(service: AgentService, input_path: str, output_path: str = None) -> Dict:
+    """
+    Membaca baris JSON {"question", "session_id"?, "id"?} dan menulis hasil dengan urutan yang sama.
+    Baris bersesi sama dijalankan berurutan, sesi berbeda (atau baris tanpa sesi) berjalan paralel.
+    """
+    with open(input_path, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    # Batch tidak ditolak karena antrean penuh: semua baris memang sudah menunggu
+    service.max_queue = max(service.max_queue, len(items))
+    # Giliran satu sesi dikirim berurutan agar urutan percakapan sesuai file
+    by_session: Dict[str, list] = {}
+    for position, item in enumerate(items):
+        by_session.setdefault(item.get("session_id") or f"baris-{position}", []).append(position)
+    results = [None] * len(items)
+
+    async def run_session(session_id: str, positions: list) -> None:
+        for position in positions:
+            results[position] = await service.ask(items[position]["question"], session_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(session_id, positions) for session_id, positions in by_session.items()))
+    elapsed = time.perf_counter() - started
+
+    output = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    try:
+        for item, result in zip(items, results):
+            output.write(json.dumps(dict(result, id=item.get("id"), question=item["question"]), ensure_ascii=False) + "\n")
+    finally:
+        if output_path:
+            output.close()
+    summary = {"questions": len(items), "elapsed_s": round(elapsed, 2),
+               "per_second": round(len(items) / elapsed, 2) if elapsed else None,
+               **{status: sum(1 for r in results if r["status"] == status) for status in RESULT_STATUS_CODES}}
+    print(f"[AMIA] batch selesai: {summary}", file=sys.stderr)
+    return summary
+
+
+def create_service(concurrency: int = DEFAULT_CONCURRENCY, max_queue: int = DEFAULT_MAX_QUEUE,
+                   timeout: float = DEFAULT_TIMEOUT) -> AgentService:
+    # Retriever ditunggu dari pemanasan; langkah lainnya (agent, statistik, klien) berlanjut di latar
+    retriever = start_warmup().result("retriever")
+    return AgentService(retriever, concurrency, max_queue, timeout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AMIA tanpa Streamlit: server HTTP/JSON atau batch JSONL.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Menjalankan server HTTP/JSON.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    batch_parser = commands.add_parser("batch", help="Menjawab pertanyaan dari file JSONL.")
+    batch_parser.add_argument("input")
+    batch_parser.add_argument("--output", default=None, help="File JSONL hasil (default: stdout).")
+    args = parser.parse_args()
+
+    service = create_service(args.concurrency, args.max_queue, args.timeout)
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(service, args.host, args.port))
+        else:
+            asyncio.run(run_batch(service, args.input, args.output))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Berisi penyimpanan sesi per proses: state percakapan (pesan, memory, dokumen) disimpan di sini,
+# bukan di st.session_state, dengan batas jumlah sesi (LRU), batas pesan per sesi, dan
+# penghapusan sesi yang menganggur terlalu lama. Dipakai oleh main.py (Streamlit) dan service.py.
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+MAX_SESSIONS = int(os.getenv("AMIA_MAX_SESSIONS", "200"))
+SESSION_IDLE_SECONDS = float(os.getenv("AMIA_SESSION_IDLE_MINUTES", "60")) * 60
+# Pesan tertua dibuang dari tampilan jika melebihi batas ini (memory agent punya batas token sendiri)
+MAX_MESSAGES = int(os.getenv("AMIA_MAX_MESSAGES", "400"))
+
+
+class ChatSession:
+    """State satu sesi chat Streamlit."""
+
+    def __init__(self) -> None:
+        self.messages: List[Dict] = []
+        self._memory = None
+        self.pdf_content: Optional[str] = None
+        self.processed_file_name: Optional[str] = None
+        self.document_index = None
+        self.document_hash: Optional[str] = None
+        self.dropped_messages = 0
+        # Jumlah pesan terakhir yang ditampilkan; bertambah saat pengguna memuat pesan lama
+        self.history_limit: Optional[int] = None
+
+    @property
+    def memory(self):
+        # Dibuat saat giliran pertama agar render awal tidak mengimpor LangChain
+        if self._memory is None:
+            from token_budget_memory import create_session_memory
+            # Riwayat dibatasi anggaran token (AMIA_MEMORY_MODE=buffer untuk perilaku lama)
+            self._memory = create_session_memory()
+        return self._memory
+
+    def add_message(self, message: Dict, max_messages: int = MAX_MESSAGES) -> None:
+        self.messages.append(message)
+        overflow = len(self.messages) - max_messages
+        if overflow > 0:
+            del self.messages[:overflow]
+            self.dropped_messages += overflow
+
+    def clear_chat(self) -> None:
+        self.messages = []
+        self.dropped_messages = 0
+        self.history_limit = None
+        if self._memory is not None:
+            self._memory.clear()
+
+    def user_questions(self, limit: int) -> List[str]:
+        """`limit` pertanyaan pengguna terakhir, terbaru lebih dulu (tanpa memindai seluruh riwayat)."""
+        questions = []
+        for message in reversed(self.messages):
+            if message.get("role") == "user":
+                questions.append(message["content"])
+                if len(questions) >= limit:
+                    break
+        return questions
+
+
+def approx_size_bytes(obj: Any, _seen: set = None) -> int:
+    """
+    Perkiraan memori objek beserta isinya (string, koleksi, array NumPy, atribut objek).
+    Fungsi/method dilewati agar klien bersama (LLM, retriever) tidak ikut terhitung.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen or callable(obj) or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int):
+        # Array NumPy (tanpa mengimpor NumPy di modul ini)
+        return nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(approx_size_bytes(k, seen) + approx_size_bytes(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(approx_size_bytes(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return size + approx_size_bytes(vars(obj), seen)
+    return size
+
+
+class SessionStore:
+    """
+    Sesi per ID dengan urutan LRU. Sesi yang tidak diakses lebih dari `idle_seconds` dibuang saat
+    akses berikutnya ke store; jika jumlah sesi melebihi `max_sessions`, sesi paling lama dibuang.
+    `factory` membuat state sesi baru (default ChatSession).
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: float = SESSION_IDLE_SECONDS,
+                 factory: Callable[[], Any] = ChatSession, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.factory = factory
+        self.clock = clock
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "evicted_idle": 0, "evicted_capacity": 0}
+
+    def _evict_idle(self, now: float) -> None:
+        # Urutan LRU: sesi paling lama diakses ada di depan, sehingga cukup memeriksa dari depan
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.idle_seconds:
+                break
+            del self._sessions[session_id]
+            self.stats["evicted_idle"] += 1
+
+    def get(self, session_id: str):
+        """State sesi `session_id`; dibuat baru jika belum ada atau sudah dibuang."""
+        with self._lock:
+            now = self.clock()
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = [now, self.factory()]
+                self.stats["created"] += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.stats["evicted_capacity"] += 1
+            entry[0] = now
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def pop(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            return entry[1] if entry else None
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            self._evict_idle(self.clock())
+            sessions = [session for _, session in self._sessions.values()]
+            return dict(self.stats, sessions=len(sessions),
+                        messages=sum(len(getattr(session, 'messages', ())) for session in sessions))
@@ -0,0 +1,181 @@
+# Berisi callback handler untuk men-streaming jawaban agent ke UI chat secara bertahap,
+# termasuk filter penanda <<SOURCE:...>> dan pengukuran time-to-first-token.
+
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+SOURCE_OPEN = "<<SOURCE:"
+SOURCE_CLOSE = ">>"
+DEFAULT_SOURCE = "AI Generative"
+
+
+class SourceMarkerFilter:
+    """
+    Menyaring penanda <<SOURCE:...>> dari teks yang datang sepotong-sepotong,
+    sehingga penanda tidak pernah tampil walaupun terpotong di antara token.
+    """
+
+    def __init__(self) -> None:
+        self.source: Optional[str] = None
+        self._pending = ""
+        self._marker = ""
+        self._in_marker = False
+
+    def feed(self, text: str) -> str:
+        """Mengembalikan bagian teks yang sudah aman ditampilkan."""
+        buffer = self._pending + text
+        self._pending = ""
+        visible = []
+        while buffer:
+            if self._in_marker:
+                self._marker += buffer
+                buffer = ""
+                end = self._marker.find(SOURCE_CLOSE)
+                if end < 0:
+                    break
+                if self.source is None:
+                    self.source = self._marker[:end].strip()
+                buffer = self._marker[end + len(SOURCE_CLOSE):]
+                self._marker = ""
+                self._in_marker = False
+                continue
+
+            start = buffer.find(SOURCE_OPEN)
+            if start >= 0:
+                visible.append(buffer[:start])
+                buffer = buffer[start + len(SOURCE_OPEN):]
+                self._in_marker = True
+                continue
+
+            # Tahan ekor teks yang mungkin merupakan awal penanda yang belum lengkap.
+            hold = 0
+            for size in range(min(len(buffer), len(SOURCE_OPEN) - 1), 0, -1):
+                if SOURCE_OPEN.startswith(buffer[-size:]):
+                    hold = size
+                    break
+            visible.append(buffer[:len(buffer) - hold])
+            self._pending = buffer[len(buffer) - hold:]
+            break
+        return "".join(visible)
+
+    def finish(self) -> str:
+        """Mengosongkan sisa buffer di akhir stream."""
+        if self._in_marker:
+            if self.source is None:
+                self.source = self._marker.replace(SOURCE_CLOSE, "").strip()
+            self._marker, self._in_marker = "", False
+        tail, self._pending = self._pending, ""
+        return tail
+
+
+def split_source(response_text: Optional[str]) -> Tuple[Optional[str], str]:
+    """Memisahkan teks jawaban dari penanda sumber; mengembalikan (teks tampilan, sumber)."""
+    if not response_text:
+        return response_text, DEFAULT_SOURCE
+    marker_filter = SourceMarkerFilter()
+    display_text = marker_filter.feed(response_text) + marker_filter.finish()
+    return display_text.strip(), marker_filter.source or DEFAULT_SOURCE
+
+
+class StreamingChatHandler(BaseCallbackHandler):
+    """
+    Callback handler yang meneruskan event agent ke UI:
+    - `on_status(teks)` untuk status antara ("berpikir", "menggunakan tool X"),
+    - `on_token(teks)` untuk potongan jawaban final yang sudah bebas penanda sumber.
+
+    Token datang lewat `on_llm_new_token` dari klien LLM streaming agent (llm_clients.get_chat_llm
+    dengan streaming=True). Jika model tidak mengirim token secara streaming, jawaban final dikirim
+    sekaligus begitu panggilan LLM terakhir selesai.
+    """
+
+    def __init__(self, on_status: Callable[[str], None] = None, on_token: Callable[[str], None] = None, ai_prefix: str = "AI") -> None:
+        super().__init__()
+        self.on_status = on_status or (lambda text: None)
+        self.on_token = on_token or (lambda text: None)
+        self.answer_marker = f"{ai_prefix}:"
+        self.source_filter = SourceMarkerFilter()
+        self.text = ""
+        self.started_at = time.perf_counter()
+        self.first_event_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._call_text = ""
+        self._answer_started = False
+        self._streamed = False
+
+    # --- Event LangChain ---
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, **kwargs: Any) -> None:
+        self._start_call()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, **kwargs: Any) -> None:
+        self._start_call()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self._streamed = True
+        self._consume(token)
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        if not self._streamed and response.generations and response.generations[0]:
+            self._consume(response.generations[0][0].text)
+
+    def on_agent_action(self, action: AgentAction, **kwargs: Any) -> None:
+        self._status(f"Menggunakan tool `{action.tool}`...")
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self._status("Membaca hasil tool...")
+
+    def on_agent_finish(self, finish: AgentFinish, **kwargs: Any) -> None:
+        self._emit_visible(self.source_filter.finish())
+        self.finished_at = time.perf_counter()
+
+    # --- Logika internal ---
+    def _start_call(self) -> None:
+        self._call_text = ""
+        self._answer_started = False
+        self._streamed = False
+        self._status("AMIA sedang berpikir...")
+
+    def _status(self, text: str) -> None:
+        if self.first_event_at is None:
+            self.first_event_at = time.perf_counter()
+        self.on_status(text)
+
+    def _consume(self, text: str) -> None:
+        if self._answer_started:
+            self._emit_visible(self.source_filter.feed(text))
+            return
+        self._call_text += text
+        start = self._call_text.find(self.answer_marker)
+        if start >= 0:
+            self._answer_started = True
+            self._status("Menyusun jawaban...")
+            answer = self._call_text[start + len(self.answer_marker):].lstrip()
+            self._emit_visible(self.source_filter.feed(answer))
+
+    def _emit_visible(self, text: str) -> None:
+        if not self.text:
+            text = text.lstrip()
+        if not text:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.text += text
+        self.on_token(text)
+
+    @property
+    def source(self) -> Optional[str]:
+        return self.source_filter.source
+
+    def metrics(self) -> Dict[str, Optional[float]]:
+        """Latensi (ms) sejak handler dibuat: event pertama, token jawaban pertama, dan total."""
+        def elapsed(moment):
+            return (moment - self.started_at) * 1000 if moment is not None else None
+        return {
+            'first_event_ms': elapsed(self.first_event_at),
+            'ttft_ms': elapsed(self.first_token_at),
+            'total_ms': elapsed(self.finished_at or time.perf_counter()),
+        }
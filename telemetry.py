@@ -0,0 +1,145 @@
+# Berisi pencatat telemetri per proses: span per giliran, per panggilan LLM, dan per tool
+# (latensi, token, biaya), diekspor ke file JSONL bersama dan file teks format Prometheus per proses.
+
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional
+
+from config import get_secret
+from file_utils import append_jsonl, write_atomic
+
+DEFAULT_TELEMETRY_DIR = os.path.join("data", "telemetry")
+SPANS_FILE = "spans.jsonl"
+METRICS_FILE = "metrics.{pid}.prom"
+# Ukuran maksimum spans.jsonl sebelum dirotasi ke spans.jsonl.1
+MAX_SPANS_BYTES = int(os.getenv("AMIA_TELEMETRY_MAX_BYTES", str(50 * 1024 * 1024)))
+# Batas atas bucket histogram latensi (ms)
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+RECENT_SPANS = 500
+
+
+def _label_string(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Telemetry:
+    """
+    Mengumpulkan span dan agregat metrik. Span ditambahkan per baris ke `spans.jsonl` (dipakai bersama
+    oleh semua proses, di bawah kunci file, dirotasi setelah `max_spans_bytes`); agregat (counter +
+    histogram latensi) milik proses ini ditulis ulang ke `metrics.<pid>.prom` dengan label `pid`
+    setelah setiap giliran, sehingga bisa dibaca node_exporter (textfile collector) atau disajikan
+    lewat endpoint /metrics.
+    """
+
+    def __init__(self, export_dir: Optional[str] = DEFAULT_TELEMETRY_DIR, max_spans_bytes: int = MAX_SPANS_BYTES) -> None:
+        self.export_dir = export_dir
+        self.max_spans_bytes = max_spans_bytes
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self._counters: Dict[tuple, float] = defaultdict(float)
+        self._histograms: Dict[tuple, List[float]] = {}
+        self._lock = threading.RLock()
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+
+    def record(self, spans: Iterable[Dict]) -> None:
+        """Mencatat sekumpulan span (biasanya satu giliran lengkap) lalu mengekspornya."""
+        spans = list(spans)
+        with self._lock:
+            for span in spans:
+                self.recent.append(span)
+                self._aggregate(span)
+            if self.export_dir:
+                try:
+                    append_jsonl(os.path.join(self.export_dir, SPANS_FILE), spans, self.max_spans_bytes)
+                    self._write_prometheus()
+                except OSError as e:
+                    print(f"Gagal menulis telemetri: {e}")
+
+    def _aggregate(self, span: Dict) -> None:
+        labels = (("kind", span["kind"]), ("name", span["name"]))
+        self._counters[("amia_spans_total", labels)] += 1
+        if span.get("error"):
+            self._counters[("amia_span_errors_total", labels)] += 1
+        if span["kind"] == "llm":
+            self._counters[("amia_llm_input_tokens_total", labels)] += span.get("input_tokens", 0)
+            self._counters[("amia_llm_output_tokens_total", labels)] += span.get("output_tokens", 0)
+            self._counters[("amia_llm_cost_usd_total", labels)] += span.get("cost_usd", 0.0)
+        buckets = self._histograms.setdefault(labels, [0] * (len(LATENCY_BUCKETS_MS) + 2))
+        duration = span.get("duration_ms", 0.0)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration <= bound:
+                buckets[i] += 1
+        buckets[-2] += 1            # +Inf / count
+        buckets[-1] += duration     # sum
+
+    def render_prometheus(self) -> str:
+        """Agregat metrik dalam format eksposisi teks Prometheus."""
+        with self._lock:
+            return self._render_prometheus()
+
+    def _render_prometheus(self, **extra_labels) -> str:
+        lines = []
+        names = sorted({name for name, _ in self._counters})
+        for name in names:
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(self._counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_label_string(dict(labels, **extra_labels))} {value:g}")
+        lines.append("# TYPE amia_span_duration_ms histogram")
+        for labels, buckets in sorted(self._histograms.items()):
+            labels = dict(labels, **extra_labels)
+            for bound, count in zip(LATENCY_BUCKETS_MS, buckets):
+                lines.append(f"amia_span_duration_ms_bucket{_label_string(dict(labels, le=bound))} {count}")
+            lines.append(f"amia_span_duration_ms_bucket{_label_string(dict(labels, le='+Inf'))} {buckets[-2]}")
+            lines.append(f"amia_span_duration_ms_count{_label_string(labels)} {buckets[-2]}")
+            lines.append(f"amia_span_duration_ms_sum{_label_string(labels)} {buckets[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def _write_prometheus(self) -> None:
+        # Satu file per proses: worker lain tidak saling menimpa, dan label pid mencegah seri ganda di collector
+        pid = os.getpid()
+        write_atomic(os.path.join(self.export_dir, METRICS_FILE.format(pid=pid)), self._render_prometheus(pid=pid))
+
+    def summary(self) -> Dict[str, float]:
+        """Total sejak proses berjalan (untuk panel sidebar)."""
+        with self._lock:
+            totals = defaultdict(float)
+            for (name, labels), value in self._counters.items():
+                totals[name] += value
+            return dict(totals)
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Optional[Telemetry]:
+    """
+    Telemetri bersama per proses. Direktori ekspor diatur lewat AMIA_TELEMETRY_DIR;
+    AMIA_TELEMETRY=0 menonaktifkan telemetri sepenuhnya.
+    """
+    global _telemetry
+    if get_secret("AMIA_TELEMETRY", "1") == "0":
+        return None
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = Telemetry(get_secret("AMIA_TELEMETRY_DIR", DEFAULT_TELEMETRY_DIR) or None)
+    return _telemetry
+
+
+def new_span(kind: str, name: str, turn_id: str, started_at: float, **fields) -> Dict:
+    """Membuat span yang dimulai pada `started_at` (time.perf_counter) dan berakhir sekarang."""
+    duration_ms = (time.perf_counter() - started_at) * 1000
+    span = {"kind": kind, "name": name, "turn_id": turn_id,
+            "timestamp": round(time.time() - duration_ms / 1000, 3), "duration_ms": round(duration_ms, 2)}
+    span.update(fields)
+    return span
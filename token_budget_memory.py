@@ -0,0 +1,182 @@
+# Berisi memory percakapan dengan anggaran token tetap: beberapa giliran terakhir disimpan utuh,
+# giliran lama dilipat ke ringkasan berjalan, dan observasi tool bersumber (<<SOURCE:...>>) disematkan.
+
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.memory import BaseMemory
+
+from token_utils import count_tokens, truncate_tokens
+
+QUESTION_MARKER = "Pertanyaan: "
+SOURCE_MARKER = re.compile(r"<<SOURCE:(.*?)>>")
+
+SUMMARY_PROMPT = (
+    "Perbarui ringkasan percakapan antara pengguna dan AMIA (asisten medis) berikut. Tulis ringkas "
+    "dalam bahasa Indonesia, maksimal {max_words} kata. Pertahankan fakta penting: nama pasien, "
+    "penyakit, angka statistik, tahun, dan sumber data yang disebut.\n\n"
+    "Ringkasan sebelumnya:\n{summary}\n\nPercakapan tambahan:\n{conversation}\n\nRingkasan baru:"
+)
+
+
+def extract_question(text: str) -> str:
+    """Input agent berisi system prompt (dan konteks dokumen); yang disimpan hanya pertanyaannya."""
+    return text.rsplit(QUESTION_MARKER, 1)[-1].strip() if QUESTION_MARKER in text else text.strip()
+
+
+class SourceObservationHandler(BaseCallbackHandler):
+    """Meneruskan output tool yang mengandung penanda sumber ke memory untuk disematkan."""
+
+    def __init__(self, memory: "TokenBudgetMemory") -> None:
+        super().__init__()
+        self.memory = memory
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        text = str(output)
+        if SOURCE_MARKER.search(text):
+            self.memory.pin_observation(text)
+
+
+class TokenBudgetMemory(BaseMemory):
+    """
+    Memory untuk agent percakapan dengan batas token keras pada `chat_history`:
+    - `max_turns` giliran terakhir disimpan apa adanya,
+    - giliran yang keluar dari jendela dilipat ke ringkasan berjalan; ringkasan hanya dihitung
+      ulang saat jendela meluap (per `summarize_every` giliran sekaligus),
+    - observasi tool bersumber disematkan (`max_pinned` terakhir) agar sumbernya tetap bisa dikutip.
+    `last_report` berisi ukuran riwayat yang dikirim dibanding riwayat lengkap ala ConversationBufferMemory.
+    """
+
+    memory_key: str = "chat_history"
+    input_key: str = "input"
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    token_budget: int = 1200
+    max_turns: int = 4
+    summarize_every: int = 2
+    summary_token_budget: int = 300
+    max_pinned: int = 3
+    pinned_token_budget: int = 200
+    summarizer: Optional[Callable[[str, str], str]] = None
+
+    turns: List[Tuple[str, str]] = []
+    summary: str = ""
+    pinned: List[str] = []
+    summarized_turns: int = 0
+    full_history_tokens: int = 0
+    last_report: Dict[str, Any] = {}
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    # --- Penyimpanan ---
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        raw_input = str(inputs.get(self.input_key) or next(iter(inputs.values()), ""))
+        output = str(outputs.get("output") or next(iter(outputs.values()), ""))
+        # Riwayat pembanding: yang akan tersimpan oleh ConversationBufferMemory (input utuh + jawaban)
+        self.full_history_tokens += count_tokens(f"{self.human_prefix}: {raw_input}\n{self.ai_prefix}: {output}")
+        self.turns.append((extract_question(raw_input), output))
+        if len(self.turns) >= self.max_turns + self.summarize_every:
+            overflow = self.turns[:len(self.turns) - self.max_turns]
+            self.turns = self.turns[len(overflow):]
+            self._fold(overflow)
+
+    def pin_observation(self, text: str) -> None:
+        text = truncate_tokens(text.strip(), self.pinned_token_budget)
+        if text in self.pinned:
+            self.pinned.remove(text)
+        self.pinned.append(text)
+        del self.pinned[:-self.max_pinned]
+
+    def observation_handler(self) -> SourceObservationHandler:
+        """Callback yang perlu dipasang ke executor agar observasi tool bisa disematkan."""
+        return SourceObservationHandler(self)
+
+    def clear(self) -> None:
+        self.turns, self.summary, self.pinned = [], "", []
+        self.summarized_turns, self.full_history_tokens, self.last_report = 0, 0, {}
+
+    # --- Ringkasan ---
+    def _format_turns(self, turns: List[Tuple[str, str]]) -> str:
+        return "\n".join(f"{self.human_prefix}: {question}\n{self.ai_prefix}: {answer}" for question, answer in turns)
+
+    def _fold(self, turns: List[Tuple[str, str]]) -> None:
+        conversation = self._format_turns(turns)
+        try:
+            summarize = self.summarizer or _llm_summarizer(self.summary_token_budget)
+            summary = summarize(self.summary, conversation)
+        except Exception as e:
+            print(f"Gagal meringkas riwayat, memakai potongan teks: {e}")
+            summary = f"{self.summary}\n{conversation}".strip()
+        # Ringkasan dipotong dari belakang agar informasi terbaru tetap ada
+        self.summary = truncate_tokens(summary.strip(), self.summary_token_budget, keep_end=True)
+        self.summarized_turns += len(turns)
+
+    # --- Pemuatan ---
+    def render(self) -> str:
+        """Menyusun chat_history dalam batas `token_budget`: ringkasan, observasi tersemat, giliran terbaru."""
+        budget = self.token_budget
+        head = []
+        if self.summary:
+            head.append(f"Ringkasan percakapan sebelumnya: {self.summary}")
+        for observation in reversed(self.pinned):
+            head.append(f"Observasi tool sebelumnya: {observation}")
+        head_tokens = count_tokens("\n".join(head))
+        # Giliran terbaru diprioritaskan; ringkasan/observasi mengisi sisa anggaran
+        recent, used = [], 0
+        for turn in reversed(self.turns):
+            text = self._format_turns([turn])
+            tokens = count_tokens(text)
+            if used + tokens > budget:
+                if not recent:
+                    recent.append(truncate_tokens(text, budget, keep_end=True))
+                    used = budget
+                break
+            recent.append(text)
+            used += tokens
+        kept_head = []
+        for item in head:
+            tokens = count_tokens(item)
+            if used + tokens > budget:
+                continue
+            kept_head.append(item)
+            used += tokens
+        return "\n".join(kept_head + list(reversed(recent)))
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        history = self.render()
+        history_tokens = count_tokens(history)
+        self.last_report = {
+            'history_tokens': history_tokens,
+            'full_history_tokens': self.full_history_tokens,
+            'saved_tokens': max(0, self.full_history_tokens - history_tokens),
+            'saved_pct': 100.0 * max(0, self.full_history_tokens - history_tokens) / self.full_history_tokens if self.full_history_tokens else 0.0,
+            'verbatim_turns': len(self.turns),
+            'summarized_turns': self.summarized_turns,
+            'pinned_observations': len(self.pinned),
+        }
+        return {self.memory_key: history}
+
+
+def _llm_summarizer(max_tokens: int) -> Callable[[str, str], str]:
+    from llm_clients import get_chat_llm
+
+    def summarize(summary: str, conversation: str) -> str:
+        prompt = SUMMARY_PROMPT.format(max_words=max_tokens // 2, summary=summary or "-", conversation=conversation)
+        response = get_chat_llm(temperature=0).invoke(prompt)
+        return getattr(response, "content", str(response))
+    return summarize
+
+
+def create_session_memory():
+    """
+    Memory per sesi sesuai AMIA_MEMORY_MODE: "budget" (default, TokenBudgetMemory)
+    atau "buffer" (ConversationBufferMemory seperti sebelumnya).
+    """
+    if os.getenv("AMIA_MEMORY_MODE", "budget") == "buffer":
+        from langchain.memory import ConversationBufferMemory
+        return ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    return TokenBudgetMemory(memory_key="chat_history")
@@ -0,0 +1,37 @@
+# Berisi fungsi bantu untuk mengestimasi jumlah token teks (untuk anggaran prompt dan metrik).
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_encoder():
+    """Encoder tiktoken dibuat sekali per proses; None jika tiktoken tidak tersedia."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoder = get_encoder()
+    if encoder is None:
+        # Perkiraan kasar: rata-rata ~4 karakter per token
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Memotong teks menjadi paling banyak `max_tokens` token (bagian awal, atau akhir jika keep_end)."""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoder = get_encoder()
+    if encoder is None:
+        max_chars = max_tokens * 4
+        return text[-max_chars:] if keep_end else text[:max_chars]
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoder.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
@@ -9,7 +9,7 @@ def get_medical_info(query: str, retriever) -> str:
     Returns:
         str: String berisi rangkuman informasi yang ditemukan.
     """
-    relevant_data = retriever.get_relevant(query, k=5)
+    relevant_data = retriever.get_relevant(query, k=5, infer_filters=True)
     
     if not relevant_data:
         return f"Informasi tentang '{query}' tidak tersedia dalam database internal."
@@ -9,7 +9,7 @@ def recommend_actions(query: str, retriever) -> str:
     Returns:
         str: String berisi daftar rekomendasi.
     """
-    relevant_data = retriever.get_relevant(query, k=5)
+    relevant_data = retriever.get_relevant(query, k=5, infer_filters=True)
     
     if not relevant_data:
         return "Informasi tidak ditemukan, rekomendasi umum: selalu jaga kesehatan dan konsultasi dengan tenaga medis profesional."
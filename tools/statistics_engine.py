@@ -0,0 +1,147 @@
+# Berisi mesin statistik kolumnar yang memuat CSV sekali dan menyiapkan
+# hasil agregasi (ekstrem per tahun, deret waktu per penyebab, agregat per tipe).
+
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import LRUCache
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'Penyebab Kematian di Indonesia yang Dilaporkan - Clean.csv')
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StatisticsEngine:
+    """
+    Menyimpan dataset sebagai array NumPy per kolom dan menghitung di muka:
+    - indeks baris kematian tertinggi/terendah untuk setiap tahun,
+    - deret tahun -> jumlah kematian untuk setiap penyebab,
+    - total kematian per tipe (keseluruhan dan per tahun).
+    """
+
+    def __init__(self, csv_path: str = DATA_PATH) -> None:
+        self.csv_path = csv_path
+        stat = os.stat(csv_path)
+        self.mtime_ns, self.size = stat.st_mtime_ns, stat.st_size
+        self.content_hash = file_sha256(csv_path)
+
+        df = pd.read_csv(csv_path)
+        self.causes = df['Cause'].fillna("").astype(str).to_numpy(dtype=object)
+        self.types = df['Type'].fillna("").astype(str).to_numpy(dtype=object)
+        self.sources = df['Source'].fillna("").astype(str).to_numpy(dtype=object) if 'Source' in df else np.full(len(df), "", dtype=object)
+        self.years = df['Year'].to_numpy(dtype=np.int64)
+        self.deaths = df['Total Deaths'].to_numpy(dtype=np.float64)
+
+        self._build_year_extremes()
+        self._build_cause_index()
+        self._build_type_aggregates()
+        self._trend_cache = LRUCache(max_size=256)
+
+    def _build_year_extremes(self) -> None:
+        # Sama seperti idxmax/idxmin pandas: ambil baris pertama (urutan CSV) bila ada nilai kembar.
+        self.year_extremes: Dict[int, tuple] = {}
+        for year in np.unique(self.years):
+            rows = np.flatnonzero(self.years == year)
+            values = self.deaths[rows]
+            if np.isnan(values).all():
+                continue
+            self.year_extremes[int(year)] = (int(rows[np.nanargmax(values)]), int(rows[np.nanargmin(values)]))
+
+    def _build_cause_index(self) -> None:
+        self.cause_rows: Dict[str, np.ndarray] = {}
+        for cause in pd.unique(self.causes):
+            self.cause_rows[cause] = np.flatnonzero(self.causes == cause)
+        self.cause_series = {cause: self._series_from_rows(rows) for cause, rows in self.cause_rows.items()}
+        self._causes_lower = [(cause.lower(), cause) for cause in self.cause_rows]
+
+    def _build_type_aggregates(self) -> None:
+        self.type_totals: Dict[str, float] = {}
+        self.type_year_totals: Dict[str, tuple] = {}
+        for type_ in pd.unique(self.types):
+            mask = self.types == type_
+            years, inverse = np.unique(self.years[mask], return_inverse=True)
+            totals = np.bincount(inverse, weights=np.nan_to_num(self.deaths[mask]))
+            self.type_totals[type_] = float(totals.sum())
+            self.type_year_totals[type_] = (years, totals)
+
+    def _series_from_rows(self, rows: np.ndarray) -> dict:
+        """Membuat deret waktu dari baris-baris terpilih, dedup per tahun (baris pertama menang), urut tahun."""
+        rows = np.sort(rows)
+        _, first = np.unique(self.years[rows], return_index=True)
+        rows = rows[first]
+        order = np.argsort(self.years[rows], kind='stable')
+        rows = rows[order]
+        return {'rows': rows, 'years': self.years[rows], 'deaths': self.deaths[rows], 'causes': self.causes[rows]}
+
+    # --- API publik ---
+    def record(self, row: int) -> dict:
+        return {
+            'Cause': self.causes[row], 'Type': self.types[row], 'Year': int(self.years[row]),
+            'Total Deaths': self.deaths[row], 'Source': self.sources[row],
+        }
+
+    def extreme_in_year(self, year: int, highest: bool = True) -> Optional[dict]:
+        rows = self.year_extremes.get(year)
+        if rows is None:
+            return None
+        return self.record(rows[0] if highest else rows[1])
+
+    def trend_for_keyword(self, keyword: str) -> Optional[dict]:
+        """Deret waktu untuk semua penyebab yang namanya mengandung `keyword`."""
+        keyword = keyword.lower()
+        cached = self._trend_cache.get(keyword)
+        if cached is not None:
+            return cached or None
+        matched = [cause for lower, cause in self._causes_lower if keyword in lower]
+        series = self.trend_for_causes(matched) if matched else {}
+        self._trend_cache.put(keyword, series)
+        return series or None
+
+    def trend_for_causes(self, causes) -> Optional[dict]:
+        causes = [cause for cause in causes if cause in self.cause_rows]
+        if not causes:
+            return None
+        if len(causes) == 1:
+            return self.cause_series[causes[0]]
+        return self._series_from_rows(np.concatenate([self.cause_rows[cause] for cause in causes]))
+
+    def is_stale(self) -> bool:
+        """True jika isi CSV sudah berubah sejak engine dibangun (cek mtime dulu, lalu hash)."""
+        try:
+            stat = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == (self.mtime_ns, self.size):
+            return False
+        if stat.st_size == self.size and file_sha256(self.csv_path) == self.content_hash:
+            # Hanya mtime yang berubah (misal file disentuh), isi tetap sama.
+            self.mtime_ns = stat.st_mtime_ns
+            return False
+        return True
+
+
+_engine: Optional[StatisticsEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_statistics_engine(csv_path: str = DATA_PATH) -> StatisticsEngine:
+    """Mengembalikan engine bersama untuk proses ini, dibangun ulang otomatis jika CSV berubah."""
+    global _engine
+    engine = _engine
+    if engine is not None and engine.csv_path == csv_path and not engine.is_stale():
+        return engine
+    with _engine_lock:
+        if _engine is None or _engine.csv_path != csv_path or _engine.is_stale():
+            _engine = StatisticsEngine(csv_path)
+        return _engine
@@ -1,42 +1,230 @@
-# File ini adalah bagian dari aplikasi Streamlit yang menerjemahkan istilah medis
+# File ini adalah bagian dari aplikasi Streamlit yang menerjemahkan istilah medis.
+# Urutan pencarian: glosarium offline -> cache terjemahan (LRU, log JSONL di disk) -> Google Translate API.
+# Klien API baru dibuat saat benar-benar dibutuhkan, dan semua istilah yang belum dikenal
+# dikirim dalam satu request batch.
 
-from google.cloud import translate_v2 as translate
+import json
 import os
+import threading
+from typing import Dict, List, Optional, Tuple
 
-# Inisialisasi klien terjemahan.
-# Otentikasi akan berjalan otomatis di lingkungan Google Cloud seperti Streamlit Cloud
-# jika API-nya sudah diaktifkan.
-try:
-    translate_client = translate.Client()
-except Exception as e:
-    print(f"Peringatan: Gagal menginisialisasi Google Translate Client: {e}")
-    translate_client = None
+from cache_utils import LRUCache
+from embedding_cache import normalize_query
+from file_utils import append_jsonl, file_lock, read_jsonl, write_atomic
 
-def translate_medical_terms(query: str) -> str:
+TRANSLATION_CACHE_PATH = os.path.join("data", "translation_cache.jsonl")
+TRANSLATION_CACHE_SIZE = 5000
+# Log dipadatkan (hanya entri terbaru yang unik, maksimal TRANSLATION_CACHE_SIZE) jika barisnya melebihi kelipatan ini
+COMPACT_FACTOR = 2
+
+# Mapping bahasa umum ke kode bahasa ISO 639-1
+LANG_MAP = {'indonesia': 'id', 'indonesian': 'id', 'inggris': 'en', 'english': 'en', 'jawa': 'jw', 'sunda': 'su'}
+
+# Glosarium istilah medis umum Indonesia -> Inggris (dipakai dua arah tanpa memanggil API)
+MEDICAL_GLOSSARY = {
+    'sakit kepala': 'headache', 'demam': 'fever', 'batuk': 'cough', 'pilek': 'common cold', 'flu': 'flu',
+    'mual': 'nausea', 'muntah': 'vomiting', 'diare': 'diarrhea', 'sembelit': 'constipation', 'pusing': 'dizziness',
+    'sesak napas': 'shortness of breath', 'nyeri dada': 'chest pain', 'sakit perut': 'stomachache',
+    'sakit tenggorokan': 'sore throat', 'kelelahan': 'fatigue', 'ruam': 'rash', 'gatal': 'itching',
+    'tekanan darah tinggi': 'high blood pressure', 'hipertensi': 'hypertension', 'tekanan darah rendah': 'low blood pressure',
+    'kencing manis': 'diabetes', 'diabetes': 'diabetes', 'serangan jantung': 'heart attack', 'gagal jantung': 'heart failure',
+    'penyakit jantung': 'heart disease', 'stroke': 'stroke', 'kanker': 'cancer', 'tumor': 'tumor',
+    'tuberkulosis': 'tuberculosis', 'radang paru-paru': 'pneumonia', 'pneumonia': 'pneumonia', 'asma': 'asthma',
+    'demam berdarah': 'dengue fever', 'demam berdarah dengue': 'dengue hemorrhagic fever', 'malaria': 'malaria',
+    'tifus': 'typhoid fever', 'demam tifoid': 'typhoid fever', 'campak': 'measles', 'cacar air': 'chickenpox',
+    'hepatitis': 'hepatitis', 'gagal ginjal': 'kidney failure', 'batu ginjal': 'kidney stone', 'patah tulang': 'fracture',
+    'luka bakar': 'burn', 'keracunan makanan': 'food poisoning', 'gizi buruk': 'malnutrition', 'kurang darah': 'anemia',
+    'anemia': 'anemia', 'radang usus buntu': 'appendicitis', 'maag': 'gastritis', 'infeksi': 'infection',
+    'peradangan': 'inflammation', 'alergi': 'allergy', 'obat': 'medicine', 'resep': 'prescription',
+    'dosis': 'dose', 'antibiotik': 'antibiotic', 'vaksin': 'vaccine', 'imunisasi': 'immunization',
+    'rumah sakit': 'hospital', 'dokter': 'doctor', 'perawat': 'nurse', 'pasien': 'patient',
+    'rawat inap': 'inpatient care', 'rawat jalan': 'outpatient care', 'gawat darurat': 'emergency',
+    'pemeriksaan darah': 'blood test', 'rontgen': 'x-ray', 'kematian': 'death', 'angka kematian': 'mortality rate',
+    'penyebab kematian': 'cause of death', 'kecelakaan lalu lintas': 'traffic accident', 'bunuh diri': 'suicide',
+}
+
+
+# Istilah Inggris dengan beberapa padanan yang tidak sama persis: arah Inggris -> Indonesia memakai istilah baku
+PREFERRED_INDONESIAN = {'typhoid fever': 'demam tifoid'}
+
+
+def _build_glossary_lookup() -> Dict[Tuple[str, str], str]:
+    lookup = {}
+    for indonesian, english in MEDICAL_GLOSSARY.items():
+        lookup[(indonesian, 'en')] = english
+        # Padanan yang sama persis ('diabetes') diutamakan daripada sebutan awam ('kencing manis')
+        if (english, 'id') not in lookup or indonesian == english:
+            lookup[(english, 'id')] = indonesian
+    for english, indonesian in PREFERRED_INDONESIAN.items():
+        lookup[(english, 'id')] = indonesian
+    return lookup
+
+
+class TranslationCache:
+    """
+    Cache (teks, bahasa tujuan) -> terjemahan dengan batas LRU di memori. Terjemahan baru ditambahkan
+    ke log JSONL append-only di bawah kunci file, sehingga beberapa proses dapat berbagi file yang sama
+    tanpa saling menimpa. Jika log melebihi `COMPACT_FACTOR * max_size` baris, log dipadatkan menjadi
+    `max_size` entri terbaru.
+    """
+
+    def __init__(self, path: Optional[str] = TRANSLATION_CACHE_PATH, max_size: int = TRANSLATION_CACHE_SIZE) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.memory = LRUCache(max_size=max_size)
+        self._lock = threading.Lock()
+        self._lines = 0
+        if path and os.path.exists(path):
+            try:
+                with file_lock(path, exclusive=False):
+                    for entry in read_jsonl(path):
+                        self.memory.put((entry["text"], entry["target"]), entry["translation"])
+                        self._lines += 1
+            except (OSError, KeyError, TypeError) as e:
+                print(f"Cache terjemahan diabaikan (tidak dapat dibaca): {e}")
+
+    def get(self, text: str, target: str) -> Optional[str]:
+        return self.memory.get((text, target))
+
+    def put_many(self, items: Dict[Tuple[str, str], str]) -> None:
+        for key, translation in items.items():
+            self.memory.put(key, translation)
+        if not self.path or not items:
+            return
+        records = [{"text": text, "target": target, "translation": translation}
+                   for (text, target), translation in items.items()]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            append_jsonl(self.path, records)
+            with self._lock:
+                self._lines += len(records)
+                compact = self._lines > COMPACT_FACTOR * self.max_size
+            if compact:
+                self.compact()
+        except OSError as e:
+            print(f"Gagal menyimpan cache terjemahan: {e}")
+
+    def compact(self) -> None:
+        """Menulis ulang log dengan `max_size` entri unik terbaru (termasuk milik proses lain)."""
+        with self._lock, file_lock(self.path):
+            entries: Dict[Tuple[str, str], str] = {}
+            lines = 0
+            for entry in read_jsonl(self.path):
+                key = (entry["text"], entry["target"])
+                entries.pop(key, None)
+                entries[key] = entry["translation"]
+                lines += 1
+            kept = list(entries.items())[-self.max_size:]
+            if len(kept) < lines:
+                write_atomic(self.path, "".join(
+                    json.dumps({"text": text, "target": target, "translation": translation}, ensure_ascii=False) + "\n"
+                    for (text, target), translation in kept))
+            self._lines = len(kept)
+
+
+def _create_google_client():
+    from google.cloud import translate_v2 as translate
+    return translate.Client()
+
+
+class MedicalTranslator:
     """
-    Menerjemahkan istilah medis menggunakan Google Cloud Translation API.
+    Penerjemah dengan glosarium offline, cache persisten, dan klien API yang dibuat malas.
+    `client` dapat diganti dengan klien palsu yang memiliki method `translate(values, target_language=...)`.
+    """
+
+    def __init__(self, client=None, cache: TranslationCache = None, client_factory=_create_google_client) -> None:
+        self._client = client
+        self._client_factory = client_factory
+        self._client_error: Optional[str] = None
+        self._client_lock = threading.Lock()
+        self.cache = cache if cache is not None else TranslationCache()
+        self.glossary = _build_glossary_lookup()
+        self.stats = {"glossary_hits": 0, "cache_hits": 0, "api_requests": 0, "api_terms": 0}
+
+    @property
+    def client(self):
+        # Otentikasi berjalan otomatis di lingkungan Google Cloud seperti Streamlit Cloud jika API-nya aktif.
+        if self._client is None and self._client_error is None:
+            with self._client_lock:
+                if self._client is None and self._client_error is None:
+                    try:
+                        self._client = self._client_factory()
+                    except Exception as e:
+                        print(f"Peringatan: Gagal menginisialisasi Google Translate Client: {e}")
+                        self._client_error = str(e)
+        return self._client
+
+    def translate_batch(self, texts: List[str], target: str) -> List[str]:
+        """Menerjemahkan banyak teks; yang tidak ada di glosarium/cache dikirim dalam satu request API."""
+        keys = [normalize_query(text) for text in texts]
+        results: Dict[str, str] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            translation = self.glossary.get((key, target))
+            if translation is not None:
+                self.stats["glossary_hits"] += 1
+            else:
+                translation = self.cache.get(key, target)
+                if translation is not None:
+                    self.stats["cache_hits"] += 1
+            if translation is None:
+                missing.append(key)
+            else:
+                results[key] = translation
+
+        if missing:
+            if self.client is None:
+                raise RuntimeError("Klien terjemahan tidak berhasil diinisialisasi")
+            response = self.client.translate(missing, target_language=target, format_="text")
+            if isinstance(response, dict):
+                response = [response]
+            self.stats["api_requests"] += 1
+            self.stats["api_terms"] += len(missing)
+            translated = {(key, target): item['translatedText'] for key, item in zip(missing, response)}
+            self.cache.put_many(translated)
+            results.update({key: translation for (key, _), translation in translated.items()})
+        return [results[key] for key in keys]
+
+    def translate(self, text: str, target: str) -> str:
+        return self.translate_batch([text], target)[0]
+
+
+_translator: Optional[MedicalTranslator] = None
+_translator_lock = threading.Lock()
+
+
+def get_translator() -> MedicalTranslator:
+    global _translator
+    if _translator is None:
+        with _translator_lock:
+            if _translator is None:
+                _translator = MedicalTranslator()
+    return _translator
+
+
+def translate_medical_terms(query: str, translator: MedicalTranslator = None) -> str:
+    """
+    Menerjemahkan istilah medis menggunakan glosarium, cache, atau Google Cloud Translation API.
     Format input: 'teks yang akan diterjemahkan to bahasa tujuan'.
+    Beberapa istilah dapat dipisah titik koma: 'demam; batuk; sakit kepala to en'.
     Contoh: 'headache to indonesia' atau 'sakit kepala to en'.
     """
-    if not translate_client:
-        return "Error: Klien terjemahan tidak berhasil diinisialisasi. Pastikan Cloud Translation API sudah aktif di proyek Google Cloud Anda."
-
     try:
         parts = query.lower().split(' to ')
         if len(parts) != 2:
             return "Format tidak valid. Gunakan format: 'teks to bahasa_tujuan' (contoh: 'fever to indonesia')."
-        
+
         text_to_translate = parts[0].strip()
         dest_lang = parts[1].strip()
-        
-        # Mapping bahasa umum ke kode bahasa ISO 639-1
-        lang_map = {'indonesia': 'id', 'inggris': 'en', 'jawa': 'jw', 'sunda': 'su'}
-        dest_code = lang_map.get(dest_lang, dest_lang)
-        
-        # Panggil API terjemahan
-        result = translate_client.translate(text_to_translate, target_language=dest_code)
-        
-        return f"Hasil terjemahan '{text_to_translate}' adalah: {result['translatedText']}"
+        dest_code = LANG_MAP.get(dest_lang, dest_lang)
+
+        terms = [term.strip() for term in text_to_translate.split(';') if term.strip()]
+        translations = (translator or get_translator()).translate_batch(terms, dest_code)
+
+        if len(terms) == 1:
+            return f"Hasil terjemahan '{terms[0]}' adalah: {translations[0]}"
+        return "Hasil terjemahan:\n" + "\n".join(f"- '{term}' adalah: {translation}" for term, translation in zip(terms, translations))
 
     except Exception as e:
-        return f"Gagal menerjemahkan: {e}. Pastikan Cloud Translation API sudah diaktifkan."
\ No newline at end of file
+        return f"Gagal menerjemahkan: {e}. Pastikan Cloud Translation API sudah diaktifkan."
@@ -0,0 +1,230 @@
+# Berisi fungsi untuk mencari di Google dan merangkum isi halaman teratas.
+# Pipeline: cache per query -> pencarian -> unduh beberapa hasil teratas secara paralel
+# (session bersama, timeout, batas ukuran, cache per URL) -> HTML dipangkas jadi teks -> rangkuman.
+
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+from langchain.chains.summarize import load_summarize_chain, map_reduce_prompt
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from requests.adapters import HTTPAdapter
+
+from cache_utils import TTLCache
+from embedding_cache import normalize_query
+from llm_clients import get_chat_llm
+from token_utils import count_tokens
+
+SEARCH_NUM_RESULTS = 3
+SEARCH_TIMEOUT = 5
+# Batas waktu (connect, read) per request dan batas total menunggu hasil unduhan
+FETCH_TIMEOUT = (3.05, 6)
+FETCH_DEADLINE = 10
+# Jika hasil peringkat lebih rendah sudah siap, hasil peringkat atas hanya ditunggu selama ini
+FALLBACK_GRACE = 1.0
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+# Teks halaman dipangkas sebelum dirangkum agar token LLM tidak membengkak
+MAX_PAGE_CHARS = 20000
+# Di atas batas ini rangkuman memakai map_reduce (potongan dirangkum terpisah lalu digabung)
+STUFF_TOKEN_LIMIT = 3000
+MAP_CHUNK_CHARS = 6000
+MAP_CONCURRENCY = 4
+QUERY_CACHE_TTL = 6 * 60 * 60
+URL_CACHE_TTL = 24 * 60 * 60
+USER_AGENT = "Mozilla/5.0 (compatible; AMIA/1.0)"
+
+NOISE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'iframe', 'svg', 'button']
+DISCLAIMER = "**Penting**: Informasi ini adalah rangkuman dari sumber eksternal dan bukan pengganti saran medis profesional."
+
+
+def google_search(query: str, num_results: int = SEARCH_NUM_RESULTS) -> List[str]:
+    from googlesearch import search
+    return list(search(query, num_results=num_results, lang="id", timeout=SEARCH_TIMEOUT))
+
+
+def create_session(pool_size: int = 8) -> requests.Session:
+    """Session HTTP dengan connection pool agar koneksi ke host yang sama dipakai ulang."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain"})
+    return session
+
+
+def html_to_text(html: str, max_chars: int = MAX_PAGE_CHARS) -> str:
+    """Mengambil teks utama halaman (tanpa skrip, menu, footer) dan memangkasnya ke `max_chars`."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+    lines = (re.sub(r"\s+", " ", line).strip() for line in root.get_text("\n").splitlines())
+    # Baris sangat pendek biasanya sisa menu/tombol
+    text = "\n".join(line for line in lines if len(line) > 2)
+    if len(text) > max_chars:
+        cut = text.rfind("\n", 0, max_chars)
+        text = text[:cut if cut > max_chars // 2 else max_chars]
+    return text
+
+
+class WebSearchPipeline:
+    """
+    Pencarian + rangkuman web dengan cache TTL per query dan per URL.
+    `search_fn`, `session`, dan `llm` bisa diganti (mis. server HTTP lokal dan model palsu untuk pengujian).
+    """
+
+    def __init__(self, search_fn: Callable[[str, int], List[str]] = None, session: requests.Session = None,
+                 llm=None, top_n: int = SEARCH_NUM_RESULTS, verify: bool = True,
+                 fetch_timeout=FETCH_TIMEOUT, max_page_bytes: int = MAX_PAGE_BYTES) -> None:
+        self.search_fn = search_fn or google_search
+        self.session = session or create_session()
+        self._llm = llm
+        self.top_n = top_n
+        self.verify = verify
+        self.fetch_timeout = fetch_timeout
+        self.max_page_bytes = max_page_bytes
+        self.query_cache = TTLCache(max_size=256, ttl_seconds=QUERY_CACHE_TTL)
+        self.url_cache = TTLCache(max_size=512, ttl_seconds=URL_CACHE_TTL)
+        self.stats = {"query_hits": 0, "url_hits": 0, "fetches": 0, "llm_input_tokens": 0}
+
+    @property
+    def llm(self):
+        # Klien LLM dipakai bersama (lihat llm_clients.py), tidak dibuat ulang setiap panggilan
+        return self._llm or get_chat_llm(temperature=0)
+
+    def fetch_text(self, url: str) -> Optional[str]:
+        """Mengunduh satu halaman (dengan batas ukuran) dan mengembalikan teksnya; None jika gagal."""
+        cached = self.url_cache.get(url)
+        if cached is not None:
+            self.stats["url_hits"] += 1
+            return cached
+        self.stats["fetches"] += 1
+        with self.session.get(url, timeout=self.fetch_timeout, verify=self.verify, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "text/html")
+            if "html" not in content_type and "text" not in content_type:
+                return None
+            body = bytearray()
+            for block in response.iter_content(chunk_size=64 * 1024):
+                body += block
+                if len(body) >= self.max_page_bytes:
+                    break
+            html = bytes(body[:self.max_page_bytes]).decode(response.encoding or "utf-8", errors="replace")
+        text = html_to_text(html) if "html" in content_type else html[:MAX_PAGE_CHARS]
+        if text:
+            self.url_cache.put(url, text)
+        return text or None
+
+    def _fetch_safe(self, url: str) -> Optional[str]:
+        try:
+            return self.fetch_text(url)
+        except Exception as e:
+            print(f"Gagal membaca {url}: {e}")
+            return None
+
+    def fetch_first(self, urls: List[str]):
+        """
+        Mengunduh semua URL secara paralel dan mengembalikan (url, teks) peringkat tertinggi yang
+        berhasil. Halaman peringkat atas yang lambat tidak menahan jawaban: jika hasil peringkat
+        lebih rendah sudah siap, peringkat atas hanya ditunggu selama FALLBACK_GRACE detik.
+        """
+        if not urls:
+            return None, None
+        deadline = time.monotonic() + FETCH_DEADLINE
+        fallback, fallback_since = None, None
+        executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="web-fetch")
+        try:
+            futures = [executor.submit(self._fetch_safe, url) for url in urls]
+            while True:
+                higher_pending = False
+                for url, future in zip(urls, futures):
+                    if not future.done():
+                        higher_pending = True
+                    elif future.result():
+                        if not higher_pending:
+                            return url, future.result()
+                        if fallback is None:
+                            fallback, fallback_since = (url, future.result()), time.monotonic()
+                        break
+                if not higher_pending:
+                    return None, None
+                wait_until = min(deadline, fallback_since + FALLBACK_GRACE) if fallback else deadline
+                if time.monotonic() >= wait_until:
+                    print("Batas waktu unduh terlampaui, memakai hasil yang sudah tersedia.")
+                    return fallback or (None, None)
+                wait([f for f in futures if not f.done()], timeout=wait_until - time.monotonic(), return_when=FIRST_COMPLETED)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def summarize(self, text: str, url: str) -> str:
+        tokens = count_tokens(text)
+        self.stats["llm_input_tokens"] += tokens
+        chain = load_summarize_chain(self.llm, chain_type="stuff")
+        if tokens <= STUFF_TOKEN_LIMIT:
+            print(f"Merangkum {tokens} token dari {url}")
+            return chain.run([Document(page_content=text, metadata={"source": url})])
+
+        # Map-reduce: setiap potongan dirangkum paralel, lalu rangkuman parsial digabung dengan chain "stuff"
+        chunks = RecursiveCharacterTextSplitter(chunk_size=MAP_CHUNK_CHARS, chunk_overlap=200).split_text(text)
+        print(f"Merangkum {tokens} token dari {url} dengan map_reduce ({len(chunks)} potongan)")
+        prompts = [map_reduce_prompt.PROMPT.format(text=chunk) for chunk in chunks]
+        partials = self.llm.batch(prompts, config={"max_concurrency": MAP_CONCURRENCY})
+        docs = [Document(page_content=getattr(partial, "content", partial), metadata={"source": url}) for partial in partials]
+        self.stats["llm_input_tokens"] += sum(count_tokens(doc.page_content) for doc in docs)
+        return chain.run(docs)
+
+    def run(self, query: str) -> str:
+        cache_key = normalize_query(query)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            self.stats["query_hits"] += 1
+            return cached
+        try:
+            print(f"Melakukan pencarian Google untuk '{query}'...")
+            search_results = list(self.search_fn(query, self.top_n))[:self.top_n]
+
+            if not search_results:
+                return f"Maaf, tidak ada hasil relevan di Google untuk '{query}'.<<SOURCE:Google Search>>"
+
+            top_url, page_text = self.fetch_first(search_results)
+            if not page_text:
+                return f"Maaf, halaman hasil pencarian untuk '{query}' tidak dapat dibaca.<<SOURCE:Google Search>>"
+            print(f"Membaca konten dari: {top_url}")
+
+            summary = self.summarize(page_text, top_url)
+            response = (f"Berdasarkan informasi dari {top_url}, berikut adalah rangkumannya:\n\n"
+                        f"{summary}\n\n"
+                        f"{DISCLAIMER}")
+
+            result = f"{response}<<SOURCE:Google Search - {top_url}>>"
+            self.query_cache.put(cache_key, result)
+            return result
+        except Exception as e:
+            return f"Terjadi kesalahan saat mencari dan merangkum dari internet: {str(e)}<<SOURCE:Error>>"
+
+
+_pipeline: Optional[WebSearchPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_web_pipeline() -> WebSearchPipeline:
+    """Pipeline bersama per proses (session HTTP dan cache dipakai semua sesi)."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = WebSearchPipeline()
+    return _pipeline
+
+
+def search_and_summarize_web(query: str) -> str:
+    """
+    Melakukan pencarian Google, membuka link teratas, membaca isinya,
+    dan merangkumnya untuk menjawab pertanyaan pengguna.
+    """
+    return get_web_pipeline().run(query)
@@ -0,0 +1,178 @@
+# Berisi tahap pemanasan (warm-up) proses AMIA: retriever & indeks FAISS, tabel statistik, klien LLM,
+# agent, dan tools disiapkan di thread latar sementara UI sudah tampil, sehingga pertanyaan pertama tidak
+# menanggung biaya impor dan inisialisasi. Modul ini sengaja ringan (tanpa impor berat di level modul).
+
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Pemanasan latar otomatis saat aplikasi/service dimulai (set AMIA_WARMUP=0 untuk menonaktifkan)
+WARMUP_ENABLED = os.getenv("AMIA_WARMUP", "1") != "0"
+
+# Modul yang diimpor malas oleh main.py/agent_factory; dimuat di latar agar giliran pertama tidak menunggu
+LAZY_MODULES = ("streaming", "token_budget_memory", "document_index", "medical_document_processor")
+
+
+def _load_retriever(warmup: "Warmup"):
+    from retriever import CSV_PATH, INDEX_PATH, FaissRetriever
+    return FaissRetriever(csv_path=CSV_PATH, index_path=INDEX_PATH)
+
+
+def _load_statistics(warmup: "Warmup"):
+    from tools.statistics_engine import get_statistics_engine
+    return get_statistics_engine()
+
+
+def _load_agent(warmup: "Warmup"):
+    # Klien LLM, registry tools, dan agent ReAct; router intent & cache jawaban ikut dibangun untuk retriever yang sama
+    from agent_factory import get_agent_factory
+    from answer_cache import get_answer_cache
+    from intent_router import get_intent_router
+    retriever = warmup.result("retriever")
+    get_intent_router(retriever)
+    get_answer_cache(retriever)
+    return get_agent_factory(retriever)
+
+
+def _load_clients(warmup: "Warmup"):
+    from tools.translator_tool import get_translator
+    from tools.web_search_tool import get_web_pipeline
+    for module_name in LAZY_MODULES:
+        importlib.import_module(module_name)
+    return get_web_pipeline(), get_translator()
+
+
+DEFAULT_STEPS: List[Tuple[str, Callable[["Warmup"], Any]]] = [
+    ("retriever", _load_retriever),
+    ("statistics", _load_statistics),
+    ("agent", _load_agent),
+    ("clients", _load_clients),
+]
+
+
+class Warmup:
+    """
+    Langkah pemanasan bernama yang masing-masing dijalankan sekali per proses. `start()` menjalankan
+    semua langkah berurutan di thread latar; `result(name)` menunggu langkah yang sedang berjalan, atau
+    menjalankannya langsung jika pemanasan tidak dimulai, sehingga hasilnya sama dengan inisialisasi biasa.
+    Langkah yang gagal tidak disimpan: pemanggil berikutnya mencoba lagi.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[["Warmup"], Any]]] = None) -> None:
+        self.steps = OrderedDict(steps if steps is not None else DEFAULT_STEPS)
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.timings_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.total_ms: Optional[float] = None
+
+    def _step(self, name: str) -> Future:
+        with self._lock:
+            future = self._futures.get(name)
+            owner = future is None
+            if owner:
+                future = self._futures[name] = Future()
+        if owner:
+            started = time.perf_counter()
+            try:
+                value = self.steps[name](self)
+            except BaseException as e:
+                with self._lock:
+                    del self._futures[name]
+                self.errors[name] = repr(e)
+                future.set_exception(e)
+            else:
+                self.errors.pop(name, None)
+                future.set_result(value)
+            self.timings_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+        return future
+
+    def result(self, name: str) -> Any:
+        """Hasil langkah `name` (dihitung sekali; pemanggil lain menunggu hasil yang sama)."""
+        return self._step(name).result()
+
+    def start(self) -> bool:
+        """Memulai pemanasan di thread latar; False jika sudah pernah dimulai."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._run_all, name="amia-warmup", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run_all(self) -> None:
+        started = time.perf_counter()
+        for name in self.steps:
+            # Langkah gagal (mis. API key belum diset) dicatat; langkah lain tetap dijalankan
+            self._step(name).exception()
+        self.total_ms = round((time.perf_counter() - started) * 1000, 2)
+        steps = ", ".join(f"{name} {self.timings_ms.get(name, 0):.0f} ms" for name in self.steps)
+        print(f"[AMIA] pemanasan selesai dalam {self.total_ms:.0f} ms ({steps})")
+        for name, error in self.errors.items():
+            print(f"[AMIA] pemanasan '{name}' gagal: {error}")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Menunggu pemanasan latar selesai; True jika sudah siap."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def ready(self) -> bool:
+        """Siap hanya jika pemanasan sudah dimulai, selesai, dan tidak ada langkah yang gagal."""
+        return self.started and not self.running and not self.errors
+
+    def step_state(self, name: str) -> str:
+        with self._lock:
+            future = self._futures.get(name)
+        if name in self.errors and future is None:
+            return "failed"
+        if future is None:
+            return "pending"
+        return "done" if future.done() else "running"
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "started": self.started,
+            "running": self.running,
+            "steps": {name: self.step_state(name) for name in self.steps},
+            "timings_ms": dict(self.timings_ms),
+            "total_ms": self.total_ms,
+            "errors": dict(self.errors),
+        }
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    """Pemanasan bersama untuk proses ini (langkah default: retriever, statistik, agent, klien)."""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup()
+    return _warmup
+
+
+def start_warmup() -> Warmup:
+    """Memulai pemanasan latar (sekali per proses) jika AMIA_WARMUP aktif."""
+    warmup = get_warmup()
+    if WARMUP_ENABLED and warmup.start():
+        print("[AMIA] pemanasan dimulai di latar belakang")
+    return warmup